@@ -58,7 +58,7 @@ class OSFBasicAuthentication(BasicAuthentication):
         """
         Authenticate the userid and password against username and password.
         """
-        user = get_user(email=userid, password=password)
+        user = get_user(email=userid, password=password, cache_password=True)
 
         if userid and not user:
             raise exceptions.AuthenticationFailed(_('Invalid username/password.'))
@@ -77,16 +77,15 @@ class OSFCASAuthentication(authentication.BaseAuthentication):
     """Check whether the user provides a valid OAuth2 bearer token"""
 
     def authenticate(self, request):
-        client = cas.get_client()  # Returns a CAS server client
         try:
             auth_header_field = request.META["HTTP_AUTHORIZATION"]
             auth_token = cas.parse_auth_header(auth_header_field)
         except (cas.CasTokenError, KeyError):
             return None  # If no token in header, then this method is not applicable
 
-        # Found a token; query CAS for the associated user id
+        # Found a token; query CAS (or its recent answer) for the associated user id
         try:
-            cas_auth_response = client.profile(auth_token)
+            cas_auth_response = cas.get_profile(auth_token)
         except cas.CasHTTPError:
             raise exceptions.NotAuthenticated('User provided an invalid OAuth2 access token')
 
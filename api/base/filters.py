@@ -11,15 +11,29 @@ from api.base import utils
 
 
 class ODMOrderingFilter(OrderingFilter):
-    """Adaptation of rest_framework.filters.OrderingFilter to work with modular-odm."""
+    """Adaptation of rest_framework.filters.OrderingFilter to work with modular-odm.
+
+    Only fields stored on the queried model can be sorted by the database; orderings on
+    other fields (e.g. Python properties) are dropped.
+    """
 
     # override
     def filter_queryset(self, request, queryset, view):
         ordering = self.get_ordering(request, queryset, view)
+        if ordering:
+            ordering = self.remove_unstored_fields(queryset, ordering)
         if ordering:
             return queryset.sort(*ordering)
         return queryset
 
+    def remove_unstored_fields(self, queryset, ordering):
+        schema = getattr(queryset, 'schema', None)
+        stored_fields = getattr(schema, '_fields', None)
+        if stored_fields is None:
+            # Not an ODM queryset; nothing can be sorted in the database
+            return []
+        return [term for term in ordering if term.lstrip('-') in stored_fields]
+
 query_pattern = re.compile(r'filter\[\s*(?P<field>\S*)\s*\]\s*')
 
 
@@ -142,12 +156,24 @@ class ListFilterMixin(FilterMixin):
     """View mixin that adds a get_queryset_from_request method which uses query params
     of the form `filter[field_name]=value` to filter a list of objects.
 
-    Subclasses must define `get_default_queryset()`.
+    Subclasses must define `get_default_queryset()`. Subclasses whose result set comes from
+    the database may also define `model_class` and `get_default_odm_query()`; filters on fields
+    stored on `model_class` are then compiled into the ODM query, and only the remaining fields
+    are evaluated in memory.
 
     Serializers that want to restrict which fields are used for filtering need to have a variable called
     filterable_fields which is a frozenset of strings representing the field names as they appear in the serialization.
     """
 
+    #: Serializer field types that can be compiled into an ODM query, mapped to the comparison
+    #: operator matching their in-memory semantics
+    odm_comparison_operators = {
+        ser.CharField: 'icontains',
+        ser.BooleanField: 'eq',
+    }
+
+    model_class = None
+
     def __init__(self, *args, **kwargs):
         super(FilterMixin, self).__init__(*args, **kwargs)
         if not self.serializer_class:
@@ -156,42 +182,118 @@ class ListFilterMixin(FilterMixin):
     def get_default_queryset(self):
         raise NotImplementedError('Must define get_default_queryset')
 
+    def get_default_odm_query(self):
+        """Return the ODM query for the default result set, or None if the result set
+        cannot be queried from `model_class`.
+        """
+        return None
+
+    def get_odm_queryset(self, query):
+        return self.model_class.find(query)
+
+    def get_odm_result_class(self):
+        """The class of the objects `get_odm_queryset` returns. Fields it computes with a property
+        are filtered in memory even if `model_class` stores a field of the same name.
+        """
+        return self.model_class
+
     def get_queryset_from_request(self):
-        default_queryset = self.get_default_queryset()
-        if self.request.QUERY_PARAMS:
-            param_queryset = self.param_queryset(self.request.QUERY_PARAMS, default_queryset)
-            return param_queryset
+        fields_dict = query_params_to_fields(self.request.QUERY_PARAMS)
+        for field_name in fields_dict:
+            if not self.is_filterable_field(key=field_name):
+                raise InvalidFilterError
+
+        default_query = self.get_default_odm_query() if self.model_class else None
+        if default_query is not None:
+            odm_fields = {
+                field_name: value
+                for field_name, value in fields_dict.items()
+                if self.is_stored_field(field_name)
+            }
+            query = functools.reduce(operator.and_, [default_query] + [
+                self.field_to_odm_query(field_name, value)
+                for field_name, value in odm_fields.items()
+            ])
+            queryset = self.get_odm_queryset(query)
+            fields_dict = {
+                field_name: value
+                for field_name, value in fields_dict.items()
+                if field_name not in odm_fields
+            }
+            if not fields_dict:
+                # Left lazy so that pagination is applied by the database
+                return queryset
+            default_queryset = list(queryset)
         else:
-            return default_queryset
+            default_queryset = self.get_default_queryset()
+
+        if fields_dict:
+            return self.filter_queryset_in_memory(fields_dict, default_queryset)
+        return default_queryset
+
+    def is_stored_field(self, field_name):
+        """Whether filtering on `field_name` can be done by the database"""
+        field = self.serializer_class._declared_fields.get(field_name)
+        if field is None or isinstance(field, ser.SerializerMethodField):
+            return False
+        if not any(isinstance(field, field_type) for field_type in self.odm_comparison_operators):
+            return False
+        source = field.source or field_name
+        if isinstance(getattr(self.get_odm_result_class(), source, None), property):
+            return False
+        return source in self.model_class._fields
+
+    def field_to_odm_query(self, field_name, value):
+        field = self.serializer_class._declared_fields[field_name]
+        for field_type, comparison_operator in self.odm_comparison_operators.items():
+            if isinstance(field, field_type):
+                break
+        if comparison_operator != 'icontains':
+            value = self.convert_value(value, field_name)
+        return Q(field.source or field_name, comparison_operator, value)
 
     def param_queryset(self, query_params, default_queryset):
         """filters default queryset based on query parameters"""
         fields_dict = query_params_to_fields(query_params)
-        queryset = set(default_queryset)
-        if fields_dict:
-            for field_name, value in fields_dict.items():
-                if self.is_filterable_field(key=field_name):
-                    queryset = queryset.intersection(set(self.get_filtered_queryset(field_name, value, default_queryset)))
-                else:
-                    raise InvalidFilterError
-        return list(queryset)
+        for field_name in fields_dict:
+            if not self.is_filterable_field(key=field_name):
+                raise InvalidFilterError
+        return self.filter_queryset_in_memory(fields_dict, default_queryset)
+
+    def filter_queryset_in_memory(self, fields_dict, default_queryset):
+        """Filters default queryset in a single pass, preserving its order"""
+        matchers = [
+            self.get_item_matcher(field_name, value)
+            for field_name, value in fields_dict.items()
+        ]
+        return [
+            item for item in default_queryset
+            if all(matcher(item) for matcher in matchers)
+        ]
 
     def get_filtered_queryset(self, field_name, value, default_queryset):
         """filters default queryset based on the serializer field type"""
+        matcher = self.get_item_matcher(field_name, value)
+        return [item for item in default_queryset if matcher(item)]
+
+    def get_item_matcher(self, field_name, value):
+        """Return a predicate testing a single item against the filter on `field_name`"""
         field = self.serializer_class._declared_fields[field_name]
         field_source = field.source or field_name
 
         if isinstance(field, ser.SerializerMethodField):
-            return_val = [item for item in default_queryset if self.get_serializer_method(field_name)(item) == self.convert_value(value, field_name)]
+            serializer_method = self.get_serializer_method(field_name)
+            converted = self.convert_value(value, field_name)
+            return lambda item: serializer_method(item) == converted
         elif isinstance(field, ser.BooleanField):
-            return_val = [item for item in default_queryset if getattr(item, field_source, None) == self.convert_value(value, field_name)]
+            converted = self.convert_value(value, field_name)
+            return lambda item: getattr(item, field_source, None) == converted
         elif isinstance(field, ser.CharField):
-            return_val = [item for item in default_queryset if value.lower() in getattr(item, field_source, None).lower()]
+            lowered = value.lower()
+            return lambda item: lowered in getattr(item, field_source, None).lower()
         else:
             # TODO Ensure that if you try to filter on an invalid field, it returns a useful error.
-            return_val = [item for item in default_queryset if value in getattr(item, field_source, None)]
-
-        return return_val
+            return lambda item: value in getattr(item, field_source, None)
 
     def get_serializer_method(self, field_name):
         """
@@ -13,6 +13,7 @@ class TokuTransactionsMiddleware(object):
 
     def process_request(self, request):
         """Begin a transaction if one doesn't already exist."""
+        commands.connect()
         try:
             commands.begin()
         except OperationFailure as err:
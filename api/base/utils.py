@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import collections
 
 from modularodm import Q
 from modularodm.exceptions import NoResultsFound
@@ -110,3 +111,28 @@ def add_dev_only_items(items, dev_only_items):
     if website_settings.DEV_MODE:
         items.update(dev_only_items)
     return items
+
+
+class LazySequence(collections.Sequence):
+    """A sequence of raw ``items`` that are only turned into the objects a
+    view returns when they are accessed. Slicing it, as the paginator does,
+    materializes just the slice.
+
+    :param list items: Raw items
+    :param materialize: Callable taking a list of raw items and returning the
+        list of objects for them
+    """
+    def __init__(self, items, materialize):
+        self.items = items
+        self.materialize = materialize
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.materialize(self.items[index])
+        return self.materialize([self.items[index]])[0]
+
+    def __iter__(self):
+        return iter(self.materialize(self.items))
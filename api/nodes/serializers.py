@@ -7,6 +7,7 @@ from framework.exceptions import PermissionsError
 
 from website.models import Node, User
 from website.exceptions import NodeStateError
+from website.project import access
 from website.util import permissions as osf_permissions
 
 from api.base.utils import get_object_or_error, absolute_reverse, add_dev_only_items
@@ -110,16 +111,15 @@ class NodeSerializer(JSONAPISerializer):
 
     def get_node_count(self, obj):
         auth = self.get_user_auth(self.context['request'])
-        nodes = [node for node in obj.nodes if node.can_view(auth) and node.primary and not node.is_deleted]
-        return len(nodes)
+        nodes = [node for node in obj.nodes if node.primary and not node.is_deleted]
+        return len(access.filter_viewable(nodes, auth))
 
     def get_contrib_count(self, obj):
         return len(obj.contributors)
 
     def get_registration_count(self, obj):
         auth = self.get_user_auth(self.context['request'])
-        registrations = [node for node in obj.node__registrations if node.can_view(auth)]
-        return len(registrations)
+        return len(access.filter_viewable(obj.node__registrations, auth))
 
     def get_pointers_count(self, obj):
         return len(obj.nodes_pointer)
@@ -10,7 +10,7 @@ from framework.auth.oauth_scopes import CoreScopes
 
 from api.base import permissions as base_permissions
 from api.base.filters import ODMFilterMixin, ListFilterMixin
-from api.base.utils import get_object_or_error
+from api.base.utils import get_object_or_error, LazySequence
 from api.files.serializers import FileSerializer
 from api.users.views import UserMixin
 from api.nodes.serializers import (
@@ -33,8 +33,10 @@ from api.base.exceptions import ServiceUnavailableError
 
 from website.exceptions import NodeStateError
 from website.files.models import FileNode
+from website.files.models import StoredFileNode
 from website.files.models import OsfStorageFileNode
 from website.models import Node, Pointer
+from website.project import access
 from website.util import waterbutler_api_url_for
 
 
@@ -81,6 +83,18 @@ class WaterButlerMixin(object):
 
         return file_node
 
+    def get_file_items(self, items):
+        file_nodes = FileNode.reconcile(
+            self.get_node(check_object_permissions=False),
+            [item['attributes'] for item in items],
+            user=self.request.user,
+        )
+
+        for file_node in file_nodes:
+            self.check_object_permissions(self.request, file_node)
+
+        return file_nodes
+
     def fetch_from_waterbutler(self):
         node = self.get_node(check_object_permissions=False)
         path = self.kwargs[self.path_lookup_url_kwarg]
@@ -726,8 +740,7 @@ class NodeChildrenList(generics.ListCreateAPIView, NodeMixin, ODMFilterMixin):
             auth = Auth(None)
         else:
             auth = Auth(user)
-        children = [each for each in nodes if each.can_view(auth)]
-        return children
+        return access.filter_viewable(nodes, auth)
 
     # overrides ListCreateAPIView
     def perform_create(self, serializer):
@@ -1074,16 +1087,37 @@ class NodeFilesList(generics.ListAPIView, WaterButlerMixin, ListFilterMixin, Nod
     )
 
     serializer_class = FileSerializer
+    model_class = StoredFileNode
 
     required_read_scopes = [CoreScopes.NODE_FILE_READ]
     required_write_scopes = [CoreScopes.NODE_FILE_WRITE]
 
+    # overrides ListFilterMixin
+    def get_default_odm_query(self):
+        # Only osfstorage folders are stored in the database; listings from
+        # other providers come from waterbutler
+        if self.kwargs[self.provider_lookup_url_kwarg] != 'osfstorage':
+            return None
+        folder = self.fetch_from_waterbutler()
+        if getattr(folder, 'is_file', True):
+            return None
+        return Q('parent', 'eq', folder._id)
+
+    # overrides ListFilterMixin
+    def get_odm_queryset(self, query):
+        return FileNode.find(query)
+
+    # overrides ListFilterMixin
+    def get_odm_result_class(self):
+        return FileNode.resolve_class('osfstorage', FileNode.ANY)
+
     def get_default_queryset(self):
         # Don't bother going to waterbutler for osfstorage
         files_list = self.fetch_from_waterbutler()
 
         if isinstance(files_list, list):
-            return [self.get_file_item(file) for file in files_list]
+            # Only the requested page is matched with stored files
+            return LazySequence(files_list, self.get_file_items)
 
         if isinstance(files_list, dict) or getattr(files_list, 'is_file', False):
             # We should not have gotten a file here
@@ -6,6 +6,7 @@ from datetime import datetime
 
 from framework.mongo import database
 from framework.sessions import session
+from framework.analytics import counters
 
 from flask import request
 
@@ -72,8 +73,28 @@ def build_page(rex, kwargs):
         return None
 
 
+def get_visited(date):
+    """Return Bloom filters of the pages visited in this session, overall and
+    on ``date``, and whether page lists kept by older sessions were folded
+    into them.
+    """
+    visited = counters.BloomFilter(data=session.data.get('visited_filter'))
+    today = session.data.get('visited_today') or {}
+    visited_today = counters.BloomFilter(data=today.get('filter') if today.get('date') == date else None)
+
+    legacy = session.data.pop('visited', None)
+    legacy_by_date = session.data.pop('visited_by_date', None)
+    for page in legacy or []:
+        visited.add(page)
+    if legacy_by_date and legacy_by_date.get('date') == date:
+        for page in legacy_by_date.get('pages', []):
+            visited_today.add(page)
+    return visited, visited_today, legacy is not None or legacy_by_date is not None
+
+
 def update_counter(page, db=None):
-    """Update counters for page.
+    """Update counters for page. Increments are buffered and written in
+    bulk; see `framework.analytics.counters`.
 
     :param str page: Colon-delimited page key in analytics collection
     :param db: MongoDB database or `None`
@@ -86,35 +107,23 @@ def update_counter(page, db=None):
 
     page = clean_page(page)
 
-    d = {'$inc': {}}
-
-    visited_by_date = session.data.get('visited_by_date')
-    if not visited_by_date:
-        visited_by_date = {'date': date, 'pages': []}
-
-    if date == visited_by_date['date']:
-        if page not in visited_by_date['pages']:
-            d['$inc']['date.%s.unique' % date] = 1
-            visited_by_date['pages'].append(page)
-            session.data['visited_by_date'] = visited_by_date
-    else:
-        visited_by_date['date'] = date
-        visited_by_date['pages'] = []
-        d['$inc']['date.%s.unique' % date] = 1
-        visited_by_date['pages'].append(page)
-        session.data['visited_by_date'] = visited_by_date
-
-    d['$inc']['date.%s.total' % date] = 1
-
-    visited = session.data.get('visited')  # '/project/x/, project/y/'
-    if not visited:
-        visited = []
-    if page not in visited:
-        d['$inc']['unique'] = 1
-        visited.append(page)
-        session.data['visited'] = visited
-    d['$inc']['total'] = 1
-    collection.update({'_id': page}, d, True, False)
+    increments = {
+        'total': 1,
+        'date.%s.total' % date: 1,
+    }
+
+    visited, visited_today, migrated = get_visited(date)
+    new_page = visited.add(page)
+    if new_page:
+        increments['unique'] = 1
+    new_page_today = visited_today.add(page)
+    if new_page_today:
+        increments['date.%s.unique' % date] = 1
+    if new_page or new_page_today or migrated:
+        session.data['visited_filter'] = visited.dumps()
+        session.data['visited_today'] = {'date': date, 'filter': visited_today.dumps()}
+
+    counters.page_counters.increment(collection, page, increments)
 
 
 def update_counters(rex, db=None):
@@ -137,20 +146,20 @@ def update_counters(rex, db=None):
 
 
 def get_basic_counters(page, db=None):
+    """Return the unique and total views of a page, including views not yet
+    flushed by this process, or ``(None, None)`` if it has no views.
+    """
     db = db or database
     collection = db['pagecounters']
-    unique = 0
-    total = 0
-    collection = database['pagecounters']
+    page = clean_page(page)
+    pending = counters.page_counters.pending(collection, page)
     result = collection.find_one(
-        {'_id': clean_page(page)},
+        {'_id': page},
         {'total': 1, 'unique': 1}
     )
-    if result:
-        if 'unique' in result:
-            unique = result['unique']
-        if 'total' in result:
-            total = result['total']
-        return unique, total
-    else:
+    if not result and not pending:
         return None, None
+    result = result or {}
+    unique = result.get('unique', 0) + pending.get('unique', 0)
+    total = result.get('total', 0) + pending.get('total', 0)
+    return unique, total
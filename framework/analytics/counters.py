@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""In-process aggregation of counter increments, and compact per-session
+tracking of visited pages.
+
+Increments are summed in memory and written with one ``$inc`` upsert per
+document by a background thread every ANALYTICS_FLUSH_INTERVAL seconds,
+rather than one write per page view. Readers add the increments
+still pending in this process to what is stored.
+"""
+
+import os
+import base64
+import atexit
+import hashlib
+import logging
+import threading
+import collections
+
+from website import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer(object):
+    """Thread-safe buffer of pending ``$inc`` updates, keyed by collection
+    and document id. A background thread writes them, so that increments
+    buffered by one request are never written inside another request's
+    transaction and lost if it rolls back.
+
+    :param float interval: Seconds between flushes; falsy to write every
+        increment through
+    :param int max_pending: Flush early when this many documents have
+        pending increments
+    """
+    def __init__(self, interval=None, max_pending=None):
+        self._interval = interval
+        self.max_pending = max_pending or settings.ANALYTICS_MAX_PENDING
+        self._pending = collections.defaultdict(collections.Counter)
+        self._collections = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+        self._pid = None
+
+    @property
+    def interval(self):
+        # Read the setting on use, so that it can be changed after import
+        if self._interval is None:
+            return settings.ANALYTICS_FLUSH_INTERVAL
+        return self._interval
+
+    def increment(self, collection, _id, fields):
+        """Add ``fields``, a mapping of field names to increments, to the
+        document ``_id`` in ``collection``.
+        """
+        with self._lock:
+            self._collections[collection.full_name] = collection
+            self._pending[(collection.full_name, _id)].update(fields)
+            full = len(self._pending) >= self.max_pending
+        if not self.interval:
+            self.flush()
+            return
+        self._ensure_worker()
+        if full:
+            self._wake.set()
+
+    def _ensure_worker(self):
+        with self._lock:
+            # Threads do not survive a fork; start one in each worker process
+            if self._worker is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name='counter-flush')
+            self._worker.daemon = True
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def pending(self, collection, _id):
+        """Return the increments not yet written to ``_id``."""
+        with self._lock:
+            return dict(self._pending.get((collection.full_name, _id), {}))
+
+    def flush(self):
+        """Write all pending increments, one upsert per document. Increments
+        that fail to be written are kept for the next flush.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, collections.defaultdict(collections.Counter)
+        for (name, _id), fields in pending.items():
+            try:
+                self._collections[name].update(
+                    {'_id': _id},
+                    {'$inc': dict(fields)},
+                    upsert=True,
+                    manipulate=False,
+                )
+            except Exception:
+                logger.exception('Failed to flush counters for {0}'.format(_id))
+                with self._lock:
+                    self._pending[(name, _id)].update(fields)
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+
+
+class BloomFilter(object):
+    """Fixed-size set membership test with no false negatives and a small,
+    tunable rate of false positives. Serializes to a short string so that it
+    can be kept in a session.
+
+    :param int bits: Size of the filter in bits; a multiple of 8
+    :param int hashes: Number of bits set per key, at most 4
+    :param str data: Output of `dumps` to start from
+    """
+    def __init__(self, bits=None, hashes=None, data=None):
+        self.bits = bits or settings.ANALYTICS_UNIQUE_FILTER_BITS
+        self.hashes = hashes or settings.ANALYTICS_UNIQUE_FILTER_HASHES
+        self.array = bytearray(base64.b64decode(data)) if data else bytearray(self.bits // 8)
+        if len(self.array) * 8 != self.bits:
+            # Filter was stored with other settings; start over
+            self.array = bytearray(self.bits // 8)
+
+    def _positions(self, key):
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        digest = hashlib.md5(key).digest()
+        for index in range(self.hashes):
+            chunk = digest[index * 4:(index + 1) * 4]
+            yield int(chunk.encode('hex'), 16) % self.bits
+
+    def __contains__(self, key):
+        return all(self.array[pos // 8] & (1 << pos % 8) for pos in self._positions(key))
+
+    def add(self, key):
+        """Add ``key``; return whether it was (probably) not present."""
+        added = False
+        for pos in self._positions(key):
+            if not self.array[pos // 8] & (1 << pos % 8):
+                self.array[pos // 8] |= 1 << pos % 8
+                added = True
+        return added
+
+    def dumps(self):
+        return base64.b64encode(bytes(self.array))
+
+
+page_counters = CounterBuffer()
+atexit.register(page_counters.flush)
@@ -3,6 +3,7 @@
 from datetime import datetime
 
 from framework.sessions import session, create_session, Session
+from framework.sessions.utils import forget_session
 from modularodm import Q
 from framework import bcrypt
 from framework.auth import signals
@@ -54,7 +55,10 @@ def logout():
             del session.data[key]
         except KeyError:
             pass
-    Session.remove(Q('_id', 'eq', session._id))
+    # Requests authenticated with HTTP Basic auth have no stored session
+    if session._id is not None:
+        Session.remove(Q('_id', 'eq', session._id))
+        forget_session(session._id)
     return True
 
 
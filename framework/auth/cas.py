@@ -9,6 +9,7 @@ from website import settings
 
 from framework.auth import User
 from framework.auth import authenticate
+from framework.auth.token_cache import token_cache
 from framework.flask import redirect
 from framework.exceptions import HTTPError
 
@@ -166,6 +167,8 @@ class CasClient(object):
 
         resp = requests.post(url, data=data)
         if resp.status_code == 204:
+            # Cached profiles don't say which application issued their token
+            token_cache.revoke()
             return True
         else:
             self._handle_error(resp)
@@ -208,6 +211,41 @@ def get_profile_url():
     """
     return get_client().get_profile_url()
 
+def get_profile(access_token):
+    """Like `CasClient.profile`, but reuse CAS's recent answer for the same
+    access token from `token_cache` when there is one.
+
+    :param str access_token: CAS access_token.
+    :rtype: CasResponse
+    :raises: CasHTTPError if CAS rejected the token.
+    """
+    entry = token_cache.get(access_token)
+    if entry is None:
+        try:
+            resp = get_client().profile(access_token)
+        except CasHTTPError as error:
+            # Only remember rejections, not CAS being unavailable
+            if error.code < 500:
+                token_cache.set(access_token, {'authenticated': False, 'code': error.code})
+            raise
+        entry = {
+            'authenticated': bool(resp.authenticated),
+            'user': resp.user,
+            'attributes': dict(
+                (key, value) for key, value in resp.attributes.items()
+                if key not in ('accessToken', 'accessTokenScope')
+            ),
+            'scopes': sorted(resp.attributes.get('accessTokenScope', [])),
+        }
+        token_cache.set(access_token, entry)
+        return resp
+    if 'code' in entry:
+        raise CasHTTPError(code=entry['code'], message='CAS server rejected this token', headers={}, content='')
+    resp = CasResponse(authenticated=entry['authenticated'], user=entry['user'], attributes=dict(entry['attributes']))
+    resp.attributes['accessToken'] = access_token
+    resp.attributes['accessTokenScope'] = set(entry['scopes'])
+    return resp
+
 def make_response_from_ticket(ticket, service_url):
     """Given a CAS ticket and service URL, attempt to the user and return a proper
     redirect response.
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
 import datetime as dt
+import hashlib
+import heapq
+import hmac
 import itertools
 import logging
 import re
@@ -7,6 +10,7 @@ import urlparse
 
 import bson
 import pytz
+import pymongo
 import itsdangerous
 
 from modularodm import fields, Q
@@ -21,6 +25,7 @@ from framework.auth import signals, utils
 from framework.auth.exceptions import (ChangePasswordError, ExpiredTokenError, InvalidTokenError,
                                        MergeConfirmedRequiredError, MergeConflictError)
 from framework.bcrypt import generate_password_hash, check_password_hash
+from framework.cache import TTLCache
 from framework.exceptions import PermissionsError
 from framework.guid.model import GuidStoredObject
 from framework.mongo.validators import string_required
@@ -43,6 +48,13 @@ name_formatters = {
 
 logger = logging.getLogger(__name__)
 
+#: Keyed hashes of recently verified (username, password, password hash)
+#: triples; see `User.check_password`
+verified_passwords = TTLCache(
+    maxsize=settings.PASSWORD_CACHE_SIZE,
+    ttl=settings.PASSWORD_CACHE_TTL,
+)
+
 # Hide implementation of token generation
 def generate_confirm_token():
     return security.random_string(30)
@@ -104,9 +116,11 @@ def _get_current_user():
 
 
 # TODO: This should be a class method of User?
-def get_user(email=None, password=None, verification_key=None):
+def get_user(email=None, password=None, verification_key=None, cache_password=False):
     """Get an instance of User matching the provided params.
 
+    :param bool cache_password: Remember a correct password for a short while,
+        for credentials sent with every request (HTTP Basic auth)
     :return: The instance of User requested
     :rtype: User or None
     """
@@ -129,7 +143,7 @@ def get_user(email=None, password=None, verification_key=None):
         except Exception as err:
             logger.error(err)
             user = None
-        if user and not user.check_password(password):
+        if user and not user.check_password(password, cache=cache_password):
             return False
         return user
     if verification_key:
@@ -624,11 +638,29 @@ class User(GuidStoredObject, AddonModelMixin):
         """Set the password for this user to the hash of ``raw_password``."""
         self.password = generate_password_hash(raw_password)
 
-    def check_password(self, raw_password):
-        """Return a boolean of whether ``raw_password`` was correct."""
+    def check_password(self, raw_password, cache=False):
+        """Return a boolean of whether ``raw_password`` was correct.
+
+        :param bool cache: Skip bcrypt if the same password was found correct
+            in the last PASSWORD_CACHE_TTL seconds, and remember it if it is.
+            Entries are HMACs that cover the current password hash, so they
+            stop matching once the password changes.
+        """
         if not self.password or not raw_password:
             return False
-        return check_password_hash(self.password, raw_password)
+        if not cache:
+            return check_password_hash(self.password, raw_password)
+        key = hmac.new(
+            settings.SECRET_KEY,
+            u'\0'.join([self.username or u'', raw_password, self.password]).encode('utf-8'),
+            hashlib.sha256,
+        ).hexdigest()
+        if verified_passwords.get(key):
+            return True
+        if check_password_hash(self.password, raw_password):
+            verified_passwords.set(key, True)
+            return True
+        return False
 
     @property
     def csl_given_name(self):
@@ -1101,31 +1133,59 @@ class User(GuidStoredObject, AddonModelMixin):
         watched_node_ids = set([config.node._id for config in self.watched])
         return node._id in watched_node_ids
 
-    def get_recent_log_ids(self, since=None):
-        '''Return a generator of recent logs' ids.
+    def _recent_logs_query(self, since=None, before=None):
+        # Default since to 60 days before today if since is None
+        # timezone aware utcnow
+        utcnow = dt.datetime.utcnow().replace(tzinfo=pytz.utc)
+        since_date = since or (utcnow - dt.timedelta(days=60))
+        # The first 4 bytes of Mongo's ObjectId encode time, so a date range
+        # is an _id range and the (node, _id) index covers the whole query
+        id_range = {'$gt': str(bson.ObjectId.from_datetime(since_date))}
+        if before:
+            id_range['$lt'] = before
+        return {'_id': id_range}
+
+    def _watched_node_ids(self):
+        # Node keys straight from the configs; loading each node would pull
+        # in its entire list of logs
+        return sorted(set(config.to_storage()['node'] for config in self.watched))
+
+    def get_recent_log_ids(self, since=None, before=None, limit=None):
+        '''Return a generator of recent logs' ids, newest first.
+
+        Each watched node's logs are read from an index, newest first and only
+        as far as the generator is consumed, and merged.
 
         :param since: A datetime specifying the oldest time to retrieve logs
         from. If ``None``, defaults to 60 days before today. Must be a tz-aware
         datetime because PyMongo's generation times are tz-aware.
+        :param before: A log id; only older logs are returned. Pass the last
+        id of one page to get the next one.
+        :param limit: Maximum number of ids to return
 
         :rtype: generator of log ids (strings)
         '''
-        log_ids = []
-        # Default since to 60 days before today if since is None
-        # timezone aware utcnow
-        utcnow = dt.datetime.utcnow().replace(tzinfo=pytz.utc)
-        since_date = since or (utcnow - dt.timedelta(days=60))
-        for config in self.watched:
-            # Extract the timestamps for each log from the log_id (fast!)
-            # The first 4 bytes of Mongo's ObjectId encodes time
-            # This prevents having to load each Log Object and access their
-            # date fields
-            node_log_ids = [log_id for log_id in config.node.logs._to_primary_keys()
-                                   if bson.ObjectId(log_id).generation_time > since_date and
-                                   log_id not in log_ids]
-            # Log ids in reverse chronological order
-            log_ids = _merge_into_reversed(log_ids, node_log_ids)
-        return (l_id for l_id in log_ids)
+        from website.project.model import NodeLog
+        collection = NodeLog._storage[0].store
+        query = self._recent_logs_query(since=since, before=before)
+        streams = []
+        for node_id in self._watched_node_ids():
+            cursor = collection.find(
+                dict(query, **{'__backrefs.logged.node.logs': node_id}),
+                fields=['_id'],
+            ).sort('_id', pymongo.DESCENDING)
+            if limit:
+                # No node can contribute more than the whole page
+                cursor = cursor.limit(limit)
+            streams.append(document['_id'] for document in cursor)
+        return itertools.islice(_merge_into_reversed(*streams), limit)
+
+    def get_recent_log_count(self, since=None):
+        '''Return the number of logs `get_recent_log_ids` would yield.'''
+        from website.project.model import NodeLog
+        query = self._recent_logs_query(since=since)
+        query['__backrefs.logged.node.logs'] = {'$in': self._watched_node_ids()}
+        return NodeLog._storage[0].store.find(query).count()
 
     def get_daily_digest_log_ids(self):
         '''Return a generator of log ids generated in the past day
@@ -1301,7 +1361,39 @@ class User(GuidStoredObject, AddonModelMixin):
         return len(self.get_projects_in_common(other_user, primary_keys=True))
 
 
+class _Descending(object):
+    '''Heap entry that sorts ``value`` in reverse.'''
+    __slots__ = ('value', )
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+
 def _merge_into_reversed(*iterables):
-    '''Merge multiple sorted inputs into a single output in reverse order.
+    '''Lazily merge inputs, each sorted in reverse order, into a single
+    output in reverse order, dropping duplicates.
     '''
-    return sorted(itertools.chain(*iterables), reverse=True)
+    heap = []
+    for index, iterable in enumerate(iterables):
+        iterator = iter(iterable)
+        for value in iterator:
+            heap.append((_Descending(value), index, iterator))
+            break
+    heapq.heapify(heap)
+    last = None
+    while heap:
+        key, index, iterator = heap[0]
+        if key.value != last:
+            last = key.value
+            yield last
+        for value in iterator:
+            heapq.heapreplace(heap, (_Descending(value), index, iterator))
+            break
+        else:
+            heapq.heappop(heap)
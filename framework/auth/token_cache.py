@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Cache of what CAS answered for API bearer tokens, so that a client
+making many requests with one token costs one round trip to CAS per
+CAS_TOKEN_CACHE_TTL seconds rather than one per request. Tokens CAS rejected
+are remembered for CAS_TOKEN_CACHE_NEGATIVE_TTL seconds.
+
+Entries are keyed by a hash of the token and hold only the user id, scopes
+and other profile attributes; never the token itself. Each entry records the
+revocation epoch it was stored under; revoking tokens bumps the epoch shared
+by all processes, so entries cached in other processes stop being used once
+they next read it.
+"""
+
+import time
+import hashlib
+import datetime
+import threading
+
+from framework.cache import TTLCache
+from framework.mongo import database
+from website import settings
+
+
+class MemoryBackend(object):
+    """Least recently used entries in this process."""
+
+    def __init__(self, maxsize=None, timer=time.time):
+        self.cache = TTLCache(
+            maxsize=maxsize or settings.CAS_TOKEN_CACHE_SIZE,
+            ttl=settings.CAS_TOKEN_CACHE_TTL,
+            timer=timer,
+        )
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, ttl):
+        self.cache.set(key, value, ttl=ttl)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        return self.cache.stats()
+
+
+class MongoBackend(object):
+    """Entries shared by all processes, in a collection whose documents
+    MongoDB removes once they expire.
+    """
+    collection_name = 'castokencache'
+
+    def __init__(self, **kwargs):
+        self._indexed = False
+
+    @property
+    def collection(self):
+        collection = database[self.collection_name]
+        if not self._indexed:
+            collection.ensure_index('expires', expireAfterSeconds=0)
+            self._indexed = True
+        return collection
+
+    def get(self, key):
+        # Expired documents may outlive their expiry until MongoDB's next pass
+        document = self.collection.find_one({
+            '_id': key,
+            'expires': {'$gt': datetime.datetime.utcnow()},
+        })
+        return document['value'] if document else None
+
+    def set(self, key, value, ttl):
+        self.collection.update(
+            {'_id': key},
+            {'_id': key, 'value': value, 'expires': datetime.datetime.utcnow() + datetime.timedelta(seconds=ttl)},
+            upsert=True,
+        )
+
+    def delete(self, key):
+        self.collection.remove({'_id': key})
+
+    def clear(self):
+        self.collection.remove({})
+
+    def stats(self):
+        return {'size': self.collection.count()}
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'mongo': MongoBackend,
+}
+
+
+class RevocationEpoch(object):
+    """Counter shared by all processes, bumped whenever tokens are revoked.
+    Each process rereads it at most every ``check_interval`` seconds.
+    """
+    collection_name = 'castokenrevocation'
+    document_id = 'epoch'
+
+    def __init__(self, check_interval=None, timer=time.time):
+        self.check_interval = (
+            settings.CAS_TOKEN_REVOCATION_CHECK_INTERVAL if check_interval is None else check_interval
+        )
+        self.timer = timer
+        self._value = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        return database[self.collection_name]
+
+    def current(self):
+        now = self.timer()
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.check_interval:
+                return self._value
+        document = self.collection.find_one({'_id': self.document_id})
+        value = document['value'] if document else 0
+        with self._lock:
+            self._value, self._checked = value, now
+        return value
+
+    def forget(self):
+        """Reread the epoch on next use."""
+        with self._lock:
+            self._checked = None
+
+    def bump(self):
+        document = self.collection.find_and_modify(
+            {'_id': self.document_id},
+            {'$inc': {'value': 1}},
+            upsert=True,
+            new=True,
+        )
+        with self._lock:
+            self._value, self._checked = document['value'], self.timer()
+
+
+class TokenCache(object):
+    """Cache of CAS profile lookups by access token, counting hits and
+    misses.
+
+    :param backend: Backend instance; defaults to the one named by the
+        CAS_TOKEN_CACHE_BACKEND setting
+    :param RevocationEpoch revocations: Shared epoch entries are checked against
+    """
+    def __init__(self, backend=None, ttl=None, negative_ttl=None, revocations=None):
+        self.backend = backend or BACKENDS[settings.CAS_TOKEN_CACHE_BACKEND]()
+        self.ttl = settings.CAS_TOKEN_CACHE_TTL if ttl is None else ttl
+        self.negative_ttl = settings.CAS_TOKEN_CACHE_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.revocations = revocations or RevocationEpoch()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(access_token):
+        if isinstance(access_token, unicode):
+            access_token = access_token.encode('utf-8')
+        return hashlib.sha256(access_token).hexdigest()
+
+    def get(self, access_token):
+        """Return the entry stored for ``access_token``, or None if there is
+        none or it was stored before tokens were last revoked.
+        """
+        stored = self.backend.get(self.make_key(access_token)) if self.ttl else None
+        if stored is not None and stored['epoch'] != self.revocations.current():
+            stored = None
+        with self._lock:
+            if stored is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return stored['entry'] if stored else None
+
+    def set(self, access_token, entry):
+        """Store ``entry``, a dict whose ``authenticated`` key tells whether
+        CAS accepted the token.
+        """
+        ttl = self.ttl if entry['authenticated'] else min(self.ttl, self.negative_ttl)
+        if ttl:
+            stored = {'epoch': self.revocations.current(), 'entry': entry}
+            self.backend.set(self.make_key(access_token), stored, ttl)
+
+    def delete(self, access_token):
+        self.backend.delete(self.make_key(access_token))
+
+    def clear(self):
+        self.backend.clear()
+        self.revocations.forget()
+
+    def revoke(self):
+        """Stop using every cached entry, in all processes."""
+        self.revocations.bump()
+        self.backend.clear()
+
+    def stats(self):
+        stats = dict(self.backend.stats())
+        stats.update({'hits': self.hits, 'misses': self.misses})
+        return stats
+
+
+token_cache = TokenCache()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Small in-process caches shared by the framework and website modules."""
+
+import time
+import threading
+import collections
+
+
+_missing = object()
+
+
+class TTLCache(object):
+    """Thread-safe, bounded mapping whose entries expire ``ttl`` seconds
+    after they are set. When full, the least recently used entry is evicted.
+
+    :param int maxsize: Maximum number of entries to keep
+    :param float ttl: Seconds an entry stays valid; falsy disables the cache
+    """
+    def __init__(self, maxsize=1024, ttl=60, timer=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.ttl) and self.maxsize > 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            value, expires = self._data.pop(key, (_missing, None))
+            if value is _missing or expires <= self.timer():
+                self.misses += 1
+                return default
+            # Re-insert to mark as most recently used
+            self._data[key] = (value, expires)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        if not self.enabled:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, self.timer() + ttl)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Remove every entry whose key satisfies ``predicate``."""
+        with self._lock:
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+        }
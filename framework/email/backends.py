@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""Mail delivery backends. The SMTP backend reuses authenticated connections
+from a per-process pool instead of connecting, negotiating TLS and logging in
+for every message. The file and memory backends deliver nowhere and are meant
+for development, tests and measuring throughput without a mail server.
+
+Each backend's ``send_messages`` takes ``(from_addr, to_addrs, msg)`` tuples,
+``msg`` being the message as a string, and returns the number sent.
+"""
+
+import os
+import time
+import Queue
+import socket
+import smtplib
+import logging
+import threading
+import contextlib
+
+from website import settings
+
+logger = logging.getLogger(__name__)
+
+# Errors after which a connection is dropped rather than returned to the pool
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, socket.error)
+
+
+class SMTPPool(object):
+    """Pool of up to ``size`` connections to one server, logged in as one
+    user. Connections left idle for over ``max_idle`` seconds are checked
+    with a NOOP before reuse and replaced if the server has gone away.
+    Thread-safe.
+    """
+    def __init__(self, host, username=None, password=None, ttls=True, login=True,
+                 size=None, max_idle=None, connect=smtplib.SMTP, timer=time.time):
+        self.host = host
+        self.username = username
+        self.password = password
+        self.ttls = ttls
+        self.login = login
+        self.size = size or settings.MAIL_POOL_SIZE
+        self.max_idle = settings.MAIL_POOL_MAX_IDLE if max_idle is None else max_idle
+        self.connect = connect
+        self.timer = timer
+        self.pid = os.getpid()
+        self._idle = Queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def open(self):
+        conn = self.connect(self.host)
+        conn.ehlo()
+        if self.ttls:
+            conn.starttls()
+            conn.ehlo()
+        if self.login:
+            conn.login(self.username, self.password)
+        return conn
+
+    def is_healthy(self, conn):
+        try:
+            return conn.noop()[0] == 250
+        except CONNECTION_ERRORS + (smtplib.SMTPException, ):
+            return False
+
+    def discard(self, conn):
+        try:
+            conn.quit()
+        except CONNECTION_ERRORS + (smtplib.SMTPException, ):
+            conn.close()
+
+    def acquire(self):
+        """Take an idle, healthy connection, or open a new one."""
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except Queue.Empty:
+                    return self.open()
+                if self.timer() - last_used <= self.max_idle or self.is_healthy(conn):
+                    return conn
+                self.discard(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        if broken:
+            self.discard(conn)
+        else:
+            self._idle.put((conn, self.timer()))
+        self._slots.release()
+
+    @contextlib.contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except CONNECTION_ERRORS:
+            self.release(conn, broken=True)
+            raise
+        except Exception:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except Queue.Empty:
+                return
+            self.discard(conn)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(host, username=None, password=None, ttls=True, login=True):
+    """Return this process's pool for the given server and credentials.
+    Pools inherited from a parent process are not reused, as their sockets
+    are shared with it.
+    """
+    key = (host, username, password, ttls, login)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = SMTPPool(host, username, password, ttls=ttls, login=login)
+        return pool
+
+
+class SMTPBackend(object):
+
+    def __init__(self, host=None, username=None, password=None, ttls=True, login=True, pool=None):
+        self.pool = pool or get_pool(
+            host or settings.MAIL_SERVER,
+            username=username or settings.MAIL_USERNAME,
+            password=password or settings.MAIL_PASSWORD,
+            ttls=ttls,
+            login=login,
+        )
+
+    def send_messages(self, messages):
+        """Send ``messages`` over one connection. If the server drops the
+        connection, the unsent messages are retried once on a new one.
+        Messages whose recipients are all refused are logged and skipped.
+        """
+        messages = list(messages)
+        position = sent = 0
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as conn:
+                    while position < len(messages):
+                        from_addr, to_addrs, msg = messages[position]
+                        try:
+                            conn.sendmail(from_addr, to_addrs, msg)
+                            sent += 1
+                        except smtplib.SMTPRecipientsRefused:
+                            logger.error('Recipients refused: {0}'.format(', '.join(to_addrs)))
+                        position += 1
+                return sent
+            except CONNECTION_ERRORS:
+                if attempt:
+                    raise
+                logger.warning('Lost connection to {0}; reconnecting'.format(self.pool.host))
+                # Other idle connections have likely been dropped as well
+                self.pool.close()
+
+
+class FileBackend(object):
+    """Append messages to a file, separated by blank lines."""
+
+    def __init__(self, path=None, **kwargs):
+        self.path = path or settings.MAIL_FILE_PATH
+        self._lock = threading.Lock()
+
+    def send_messages(self, messages):
+        sent = 0
+        with self._lock:
+            with open(self.path, 'a') as fp:
+                for from_addr, to_addrs, msg in messages:
+                    fp.write('From: {0}\nTo: {1}\n{2}\n\n'.format(from_addr, ', '.join(to_addrs), msg))
+                    sent += 1
+        return sent
+
+
+class MemoryBackend(object):
+    """Keep messages in `outbox`, shared by all instances in the process."""
+
+    outbox = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def send_messages(self, messages):
+        messages = list(messages)
+        self.outbox.extend(messages)
+        return len(messages)
+
+
+BACKENDS = {
+    'smtp': SMTPBackend,
+    'file': FileBackend,
+    'memory': MemoryBackend,
+}
+
+
+def get_backend(**kwargs):
+    """Instantiate the backend named by the MAIL_BACKEND setting."""
+    return BACKENDS[settings.MAIL_BACKEND](**kwargs)
@@ -1,13 +1,42 @@
-import smtplib
 import logging
 from email.mime.text import MIMEText
 
 from framework.tasks import app
+from framework.email import backends
 from website import settings
 
 logger = logging.getLogger(__name__)
 
 
+def build_message(from_addr, to_addr, subject, message, mimetype='html'):
+    """Return the message to send, as a string."""
+    msg = MIMEText(message, mimetype, _charset='utf-8')
+    msg['Subject'] = subject
+    msg['From'] = from_addr
+    msg['To'] = to_addr
+    return msg.as_string()
+
+
+def get_backend(ttls=True, login=True, username=None, password=None, mail_server=None):
+    """Return the configured backend, or None if sending should be skipped."""
+    username = username or settings.MAIL_USERNAME
+    password = password or settings.MAIL_PASSWORD
+    mail_server = mail_server or settings.MAIL_SERVER
+
+    if not settings.USE_EMAIL:
+        return None
+    if login and (username is None or password is None):
+        logger.error('Mail username and password not set; skipping send.')
+        return None
+    return backends.get_backend(
+        host=mail_server,
+        username=username,
+        password=password,
+        ttls=ttls,
+        login=login,
+    )
+
+
 @app.task
 def send_email(from_addr, to_addr, subject, message, mimetype='html', ttls=True, login=True,
                 username=None, password=None, mail_server=None):
@@ -22,32 +51,30 @@ def send_email(from_addr, to_addr, subject, message, mimetype='html', ttls=True,
 
     :return: True if successful
     """
-    username = username or settings.MAIL_USERNAME
-    password = password or settings.MAIL_PASSWORD
-    mail_server = mail_server or settings.MAIL_SERVER
-
-    if not settings.USE_EMAIL:
-        return
-    if login and (username is None or password is None):
-        logger.error('Mail username and password not set; skipping send.')
+    backend = get_backend(ttls=ttls, login=login, username=username, password=password,
+                          mail_server=mail_server)
+    if backend is None:
         return
+    sent = backend.send_messages([
+        (from_addr, [to_addr], build_message(from_addr, to_addr, subject, message, mimetype)),
+    ])
+    return sent == 1
 
-    msg = MIMEText(message, mimetype, _charset='utf-8')
-    msg['Subject'] = subject
-    msg['From'] = from_addr
-    msg['To'] = to_addr
 
-    s = smtplib.SMTP(mail_server)
-    s.ehlo()
-    if ttls:
-        s.starttls()
-        s.ehlo()
-    if login:
-        s.login(username, password)
-    s.sendmail(
-        from_addr=from_addr,
-        to_addrs=[to_addr],
-        msg=msg.as_string()
+@app.task
+def send_emails(messages, ttls=True, login=True, username=None, password=None, mail_server=None):
+    """Send many emails over one connection.
+
+    :param messages: List of dicts with the ``from_addr``, ``to_addr``,
+        ``subject``, ``message`` and optionally ``mimetype`` arguments of
+        `send_email`
+    :return: Number of emails sent
+    """
+    backend = get_backend(ttls=ttls, login=login, username=username, password=password,
+                          mail_server=mail_server)
+    if backend is None:
+        return 0
+    return backend.send_messages(
+        (each['from_addr'], [each['to_addr']], build_message(**each))
+        for each in messages
     )
-    s.quit()
-    return True
@@ -1,15 +1,50 @@
 # -*- coding: utf-8 -*-
+import os
 import random
+import logging
+import threading
 
 import pymongo
+from pymongo.errors import DuplicateKeyError
 from modularodm import fields
 
 from framework.mongo import StoredObject
+from website import settings
 
 from modularodm.storage.base import KeyExistsException
 
 ALPHABET = '23456789abcdefghjkmnpqrstuvwxyz'
 
+logger = logging.getLogger(__name__)
+
+# Drawn from the OS rather than a seeded generator, which forked workers
+# would share and step through in lockstep
+_random = random.SystemRandom()
+
+
+def random_guid():
+    return ''.join(_random.sample(ALPHABET, 5))
+
+
+def _resolve_referent(guid_id, referent):
+    # A ``(None, name)`` pair stands for an object yet to be saved with the
+    # Guid's own id as its primary key
+    if isinstance(referent, tuple) and referent[0] is None:
+        return (guid_id, referent[1])
+    return referent
+
+
+def _duplicate_position(error, documents):
+    """Index in ``documents`` of the one whose id ``error``, raised by a bulk
+    insert, reports as a duplicate; None if the message names none of them.
+    """
+    # e.g. 'E11000 duplicate key error index: osf.guid.$_id_  dup key: { : "abcde" }'
+    duplicate = str(error).split('dup key:', 1)[-1]
+    for position, document in enumerate(documents):
+        if '"{0}"'.format(document['_id']) in duplicate:
+            return position
+    return None
+
 
 class BlacklistGuid(StoredObject):
 
@@ -27,29 +62,158 @@ class Guid(StoredObject):
     referent = fields.AbstractForeignField()
 
     @classmethod
-    def generate(self, referent=None):
+    def generate(cls, referent=None):
+        return cls._generate(lambda guid_id: referent)
+
+    @classmethod
+    def _generate(cls, make_referent):
+        """Save a new Guid with an id from the pool, pointing at
+        ``make_referent(guid_id)``, in a single write.
+        """
         while True:
-            # Create GUID
-            guid_id = ''.join(random.sample(ALPHABET, 5))
-
-            # Check GUID against blacklist
-            blacklist_guid = BlacklistGuid.load(guid_id)
-            if not blacklist_guid:
-                try:
-                    guid = Guid(_id=guid_id)
-                    guid.save()
-                    break
-                except KeyExistsException:
-                    pass
-        if referent:
-            guid.referent = referent
-            guid.save()
-        return guid
+            guid_id = guid_pool.take()
+            guid = cls(_id=guid_id, referent=make_referent(guid_id))
+            try:
+                guid.save()
+                return guid
+            except KeyExistsException:
+                # Taken since the pool checked it
+                guid_pool.record_collisions(1)
+
+    @classmethod
+    def generate_many(cls, referents):
+        """Create a Guid for each of ``referents`` (objects, ``(key, name)``
+        pairs or None) with a single insert, for bulk imports and forks.
+        A ``(None, name)`` pair reserves the Guid for an object of that name
+        to be saved later with the Guid's id as its primary key. Returns the
+        Guids in the order of ``referents``.
+        """
+        referents = list(referents)
+        guids = [
+            cls(_id=guid_id, referent=_resolve_referent(guid_id, referent))
+            for guid_id, referent in zip(guid_pool.take_many(len(referents)), referents)
+        ]
+        if not guids:
+            return guids
+        collection = cls._storage[0].store
+        documents = [guid.to_storage() for guid in guids]
+        try:
+            collection.insert(documents)
+            written = set(guid._id for guid in guids)
+        except DuplicateKeyError as error:
+            # Inserts stop at the first duplicate; keep the documents before
+            # it and generate the rest one at a time. A stored referent
+            # matching ours proves nothing, as another process saving a new
+            # object under the same id would store the same pair.
+            position = _duplicate_position(error, documents)
+            if position is None:
+                logger.warning('Could not tell which GUID collided: {0}'.format(error))
+                position = 0
+            written = set(document['_id'] for document in documents[:position])
+            guid_pool.record_collisions(1)
+        result = []
+        for guid, document, referent in zip(guids, documents, referents):
+            if guid._id in written:
+                guid._is_loaded = True
+                guid._stored_key = guid._id
+                cls._set_cache(guid._id, guid, document)
+            else:
+                guid = cls._generate(lambda guid_id: _resolve_referent(guid_id, referent))
+            result.append(guid)
+        return result
 
     def __repr__(self):
         return '<id:{0}, referent:({1}, {2})>'.format(self._id, self.referent._primary_key, self.referent._name)
 
 
+class GuidPool(object):
+    """Ids checked against existing and blacklisted Guids in bulk and handed
+    out from memory, so that creating a Guid rarely costs more than the
+    insert itself. When the pool runs dry it reserves ``size`` more with one
+    query per collection.
+
+    Ids are not held in the database while pooled; another process may take
+    one first, in which case the insert fails and the caller records a
+    collision and asks again.
+
+    :param int size: Ids to reserve per refill
+    """
+    def __init__(self, size=None):
+        self.size = size
+        self.reserved = 0
+        self.rejected = 0
+        self.collisions = 0
+        self.refills = 0
+        self._ids = []
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def take(self):
+        return self.take_many(1)[0]
+
+    def take_many(self, count):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked workers would otherwise hand out the same ids
+                self._ids, self._pid = [], os.getpid()
+            while len(self._ids) < count:
+                self._refill(count - len(self._ids))
+            taken, self._ids = self._ids[:count], self._ids[count:]
+            return taken
+
+    def _refill(self, needed):
+        size = max(needed, self.size or settings.GUID_POOL_SIZE, 1)
+        candidates = set(self._ids)
+        while len(candidates) < len(self._ids) + size:
+            candidates.add(random_guid())
+        candidates = list(candidates.difference(self._ids))
+        unavailable = set()
+        for model in (Guid, BlacklistGuid):
+            unavailable.update(
+                document['_id']
+                for document in model._storage[0].store.find(
+                    {'_id': {'$in': candidates}}, fields=['_id']
+                )
+            )
+        self._ids.extend(guid_id for guid_id in candidates if guid_id not in unavailable)
+        self.reserved += len(candidates) - len(unavailable)
+        self.rejected += len(unavailable)
+        self.refills += 1
+        logger.info('Refilled GUID pool: {0}'.format(self._stats()))
+
+    def record_collisions(self, count):
+        with self._lock:
+            self.collisions += count
+
+    def clear(self):
+        with self._lock:
+            self._ids = []
+
+    def stats(self):
+        """Counts since startup, also logged on each refill. ``rejected``
+        ids were already taken or blacklisted when checked; ``collisions``
+        were taken after being handed out. Both rates grow as the id space
+        fills.
+        """
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        checked = self.reserved + self.rejected
+        return {
+            'pooled': len(self._ids),
+            'reserved': self.reserved,
+            'rejected': self.rejected,
+            'collisions': self.collisions,
+            'refills': self.refills,
+            'rejection_rate': float(self.rejected) / checked if checked else 0.0,
+            'collision_rate': float(self.collisions) / self.reserved if self.reserved else 0.0,
+        }
+
+
+guid_pool = GuidPool()
+
+
 class GuidStoredObject(StoredObject):
     """Subclass of `StoredObject` that provisions a `Guid` for each new instance
     on save. When saving a `GuidStoredObject` for the first time, creates a new
@@ -83,9 +247,7 @@ class GuidStoredObject(StoredObject):
 
         # Else create GUID optimistically
         else:
-            guid = Guid.generate()
-            guid.referent = (guid._primary_key, self._name)
-            guid.save()
+            guid = Guid._generate(lambda guid_id: (guid_id, self._name))
             # Set primary key to GUID key
             self._primary_key = guid._primary_key
 
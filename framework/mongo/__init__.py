@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import threading
+import contextlib
 
 from flask import request
 from modularodm.storedobject import StoredObject as GenericStoredObject
@@ -31,13 +33,54 @@ def get_cache_key():
             return dummy_request
 
 
+class ReadOnlyError(Exception):
+    """Raised when saving or removing stored objects where writes are
+    forbidden; see `read_only`.
+    """
+
+
+_write_state = threading.local()
+
+
+@contextlib.contextmanager
+def read_only():
+    """Forbid saving and removing stored objects in the current thread, e.g.
+    in worker threads that run outside the request's transaction.
+    """
+    _write_state.read_only = True
+    try:
+        yield
+    finally:
+        _write_state.read_only = False
+
+
+def _check_writable():
+    if getattr(_write_state, 'read_only', False):
+        raise ReadOnlyError('Stored objects are read-only in this thread')
+
+
 @with_proxies(proxied_members, get_cache_key)
 class StoredObject(GenericStoredObject):
-    pass
+
+    def save(self, *args, **kwargs):
+        _check_writable()
+        return super(StoredObject, self).save(*args, **kwargs)
+
+    @classmethod
+    def remove_one(cls, *args, **kwargs):
+        _check_writable()
+        return super(StoredObject, cls).remove_one(*args, **kwargs)
+
+    @classmethod
+    def remove(cls, *args, **kwargs):
+        _check_writable()
+        return super(StoredObject, cls).remove(*args, **kwargs)
 
 
 __all__ = [
     'StoredObject',
+    'ReadOnlyError',
+    'read_only',
     'ObjectId',
     'client',
     'database',
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
+import os
 import logging
+import threading
 
 import pymongo
 from flask import g
@@ -12,10 +14,18 @@ from website import settings
 logger = logging.getLogger(__name__)
 
 
-def get_mongo_client():
+def get_mongo_client(pooled=False):
     """Create MongoDB client and authenticate database.
+
+    :param bool pooled: Configure the client's connection pool from settings
     """
-    client = pymongo.MongoClient(settings.DB_HOST, settings.DB_PORT)
+    kwargs = {}
+    if pooled:
+        kwargs['max_pool_size'] = settings.DB_POOL_SIZE
+        kwargs['connectTimeoutMS'] = settings.DB_CONNECT_TIMEOUT_MS
+        if settings.DB_SOCKET_TIMEOUT_MS is not None:
+            kwargs['socketTimeoutMS'] = settings.DB_SOCKET_TIMEOUT_MS
+    client = pymongo.MongoClient(settings.DB_HOST, settings.DB_PORT, **kwargs)
 
     db = client[settings.DB_NAME]
 
@@ -25,20 +35,122 @@ def get_mongo_client():
     return client
 
 
+class ClientPool(object):
+    """Process-wide holder for a pooled MongoDB client. The client is rebuilt
+    lazily after a fork so that worker processes never share sockets with
+    their parent.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._client = None
+        self._pid = None
+        self.stats = {
+            'created': 0,
+            'resets': 0,
+            'checkouts': 0,
+            'active': 0,
+        }
+
+    def get_client(self):
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    if self._client is not None:
+                        self.stats['resets'] += 1
+                    self._client = get_mongo_client(pooled=True)
+                    self._pid = os.getpid()
+                    self.stats['created'] += 1
+                    self.stats['active'] = 0
+        return self._client
+
+    def reset(self):
+        """Drop the current client; the next checkout creates a new one."""
+        with self._lock:
+            if self._client is not None:
+                self._client.close()
+                self.stats['resets'] += 1
+            self._client = None
+            self._pid = None
+            self.stats['active'] = 0
+
+    def checkout(self):
+        """Pin a socket to the current thread until :meth:`release` is called,
+        so that every operation in a request uses the same connection.
+        """
+        client = self.get_client()
+        if getattr(self._local, 'pinned', False):
+            return client
+        client.start_request()
+        self._local.pinned = True
+        with self._lock:
+            self.stats['checkouts'] += 1
+            self.stats['active'] += 1
+        return client
+
+    def release(self, client):
+        if not getattr(self._local, 'pinned', False):
+            return
+        client.end_request()
+        self._local.pinned = False
+        with self._lock:
+            self.stats['active'] = max(self.stats['active'] - 1, 0)
+
+    def status(self):
+        return dict(
+            self.stats,
+            enabled=settings.DB_POOL_ENABLED,
+            pid=self._pid,
+            max_pool_size=settings.DB_POOL_SIZE,
+            connect_timeout_ms=settings.DB_CONNECT_TIMEOUT_MS,
+            socket_timeout_ms=settings.DB_SOCKET_TIMEOUT_MS,
+        )
+
+
+client_pool = ClientPool()
+
+
 def connection_before_request():
     """Attach MongoDB client to `g`.
     """
-    g._mongo_client = get_mongo_client()
+    if settings.DB_POOL_ENABLED:
+        g._mongo_client = client_pool.checkout()
+    else:
+        g._mongo_client = get_mongo_client()
 
 
 def connection_teardown_request(error=None):
-    """Close MongoDB client if attached to `g`.
+    """Release the pinned socket of the pooled client, or close the
+    per-request MongoDB client if attached to `g`.
     """
     try:
-        g._mongo_client.close()
+        client = g._mongo_client
     except AttributeError:
         if not settings.DEBUG_MODE:
             logger.error('MongoDB client not attached to request.')
+        return
+    if settings.DB_POOL_ENABLED:
+        client_pool.release(client)
+    else:
+        client.close()
+
+
+def acquire_connection():
+    """Pin a pooled socket to the current thread for a unit of work outside of
+    a Flask request, e.g. a Django API request. No-op in unpooled mode.
+    """
+    if settings.DB_POOL_ENABLED:
+        client_pool.checkout()
+
+
+def release_connection(database):
+    """Release the connection used by ``database`` at the end of a unit of
+    work: return the socket to the pool in pooled mode, else close the client.
+    """
+    if settings.DB_POOL_ENABLED:
+        client_pool.release(database.connection)
+    else:
+        database.connection.close()
 
 
 handlers = {
@@ -48,7 +160,7 @@ handlers = {
 
 
 # Set up getters for `LocalProxy` objects
-_mongo_client = get_mongo_client()
+_mongo_client = None if settings.DB_POOL_ENABLED else get_mongo_client()
 
 
 def _get_current_client():
@@ -58,6 +170,8 @@ def _get_current_client():
     try:
         return g._mongo_client
     except (AttributeError, RuntimeError):
+        if settings.DB_POOL_ENABLED:
+            return client_pool.get_client()
         return _mongo_client
 
 
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import os
+import re
 import logging
 import copy
 import json
@@ -24,12 +25,98 @@ logger = logging.getLogger(__name__)
 
 TEMPLATE_DIR = settings.TEMPLATES_PATH
 
+# Comments placed around the elements with `mod-meta` attributes in Mako
+# templates as they are compiled. Rendered pages are split at these markers to
+# find the embeds, rather than parsed as HTML on every request.
+EMBED_START = '<!--mod-meta-->'
+EMBED_END = '<!--/mod-meta-->'
+
+_EMBED_TAG = re.compile(r'<([a-zA-Z][\w-]*)\s[^<>]*?\bmod-meta\s*=\s*([\'"])')
+
+
+def _skip_expression(source, pos):
+    """Return the position after the Mako expression starting at ``pos``."""
+    depth = 0
+    while pos < len(source):
+        if source[pos] == '{':
+            depth += 1
+        elif source[pos] == '}':
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+    return -1
+
+
+def _find_attribute_end(source, pos, quote):
+    """Return the position of the quote closing the attribute value starting
+    at ``pos``, skipping over Mako expressions, which may contain quotes.
+    """
+    while 0 <= pos < len(source):
+        if source.startswith('${', pos):
+            pos = _skip_expression(source, pos + 1)
+        elif source[pos] == quote:
+            return pos
+        else:
+            pos += 1
+    return -1
+
+
+def _find_element_end(source, tag, pos):
+    """Return the position after the tag closing the element ``tag`` whose
+    start tag ends at ``pos``, or -1.
+    """
+    depth = 1
+    for match in re.compile(r'<(/?){0}\b[^<>]*?(/?)>'.format(re.escape(tag))).finditer(source, pos):
+        if match.group(1):
+            depth -= 1
+        elif not match.group(2):
+            depth += 1
+        if depth == 0:
+            return match.end()
+    return -1
+
+
+def mark_embeds(source):
+    """Mako preprocessor wrapping each element with a `mod-meta` attribute in
+    `EMBED_START` and `EMBED_END`. Templates whose embeds cannot all be
+    located, e.g. because they are nested, are left as they are; their
+    output is then parsed as before.
+    """
+    if 'mod-meta' not in source:
+        return source
+    pieces = []
+    pos = 0
+    for match in _EMBED_TAG.finditer(source):
+        if match.start() < pos:
+            return source
+        tag, quote = match.groups()
+        value_end = _find_attribute_end(source, match.end(), quote)
+        tag_end = source.find('>', value_end) if value_end != -1 else -1
+        if tag_end == -1:
+            return source
+        if source[tag_end - 1] == '/':
+            end = tag_end + 1
+        else:
+            end = _find_element_end(source, tag, tag_end + 1)
+            if end == -1:
+                return source
+        pieces.extend([source[pos:match.start()], EMBED_START, source[match.start():end], EMBED_END])
+        pos = end
+    # Leave templates mentioning `mod-meta` other than in embeds alone
+    if len(pieces) // 4 != source.count('mod-meta'):
+        return source
+    pieces.append(source[pos:])
+    return ''.join(pieces)
+
+
 _TPL_LOOKUP = TemplateLookup(
     directories=[
         TEMPLATE_DIR,
         os.path.join(settings.BASE_PATH, 'addons/'),
     ],
-    module_directory='/tmp/mako_modules'
+    module_directory='/tmp/mako_modules',
+    preprocessor=mark_embeds,
 )
 
 _TPL_LOOKUP_SAFE = TemplateLookup(
@@ -44,6 +131,7 @@ _TPL_LOOKUP_SAFE = TemplateLookup(
         os.path.join(settings.BASE_PATH, 'addons/'),
     ],
     module_directory='/tmp/mako_modules',
+    preprocessor=mark_embeds,
 )
 
 REDIRECT_CODES = [
@@ -229,7 +317,8 @@ def render_mako_string(tpldir, tplname, data, trust=True):
             input_encoding='utf-8',
             output_encoding='utf-8',
             default_filters=lookup_obj.template_args['default_filters'],
-            imports=lookup_obj.template_args['imports']  # FIXME: Temporary workaround for data stored in wrong format in DB. Unescape it before it gets re-escaped by Markupsafe.
+            imports=lookup_obj.template_args['imports'],  # FIXME: Temporary workaround for data stored in wrong format in DB. Unescape it before it gets re-escaped by Markupsafe.
+            preprocessor=mark_embeds,
         )
     # Don't cache in debug mode
     if not app.debug:
@@ -522,6 +611,19 @@ class WebRenderer(Renderer):
 
         return template_rendered, is_replace
 
+    def render_embed(self, element_html, data):
+        """Render an embedded template from the HTML of its element.
+
+        :param element_html: HTML of the element with a `mod-meta` attribute
+        :param data: Dictionary to be passed to the template as context
+        :return: HTML to put in place of the element
+        """
+        element = lxml.html.fragment_fromstring(element_html)
+        template_rendered, is_replace = self.render_element(element, data)
+        if is_replace:
+            return template_rendered
+        return lxml.html.tostring(element).replace('><', '>' + template_rendered + '<')
+
     def _render(self, data, template_name=None):
         """Render output of view function to HTML.
 
@@ -549,6 +651,26 @@ class WebRenderer(Renderer):
         except IOError:
             return '<div>Template {} not found.</div>'.format(template_name)
 
+        if EMBED_START in rendered:
+            segments = rendered.split(EMBED_START)
+            texts = [segments[0]]
+            elements = []
+            for segment in segments[1:]:
+                element, _, text = segment.partition(EMBED_END)
+                elements.append(element)
+                texts.append(text)
+            if (not any('mod-meta' in text for text in texts) and
+                    all(element.count('mod-meta') == 1 for element in elements)):
+                output = [texts[0]]
+                for element, text in zip(elements, texts[1:]):
+                    output.append(self.render_embed(element, data))
+                    output.append(text)
+                return ''.join(output)
+            # Embeds from unmarked templates or from data; parse everything
+            rendered = rendered.replace(EMBED_START, '').replace(EMBED_END, '')
+        elif 'mod-meta' not in rendered:
+            return rendered
+
         html = lxml.html.fragment_fromstring(rendered, create_parent='remove')
 
         for element in html.findall('.//*[@mod-meta]'):
@@ -18,7 +18,8 @@ from framework.mongo import database
 
 from website import settings
 
-from .model import Session
+from .model import Session, BasicAuthSession
+from .utils import load_session, cache_session, forget_session, should_update_last_login, touch_session
 
 
 def add_key_to_url(url, scheme, key):
@@ -96,9 +97,10 @@ def set_session(session):
 
 def create_session(response, data=None):
     current_session = get_session()
-    if current_session:
+    if current_session and current_session._id is not None:
         current_session.data.update(data or {})
         current_session.save()
+        forget_session(current_session._id)
         cookie_value = itsdangerous.Signer(settings.SECRET_KEY).sign(current_session._id)
     else:
         session_id = str(bson.objectid.ObjectId())
@@ -142,18 +144,17 @@ def before_request():
         from framework.auth.core import get_user
         user = get_user(
             email=request.authorization.username,
-            password=request.authorization.password
+            password=request.authorization.password,
+            cache_password=True,
         )
-        # Create empty session
-        # TODO: Shoudn't need to create a session for Basic Auth
-        session = Session()
+        session = BasicAuthSession()
 
         if user:
             session.data['auth_user_username'] = user.username
             session.data['auth_user_id'] = user._primary_key
             session.data['auth_user_fullname'] = user.fullname
-            user.date_last_login = datetime.utcnow()
-            user.save()
+            if should_update_last_login(user._primary_key):
+                database['user'].update({'_id': user._primary_key}, {'$set': {'date_last_login': datetime.utcnow()}}, w=0)
         else:
             # Invalid key: Not found in database
             session.data['auth_error_code'] = http.FORBIDDEN
@@ -165,15 +166,25 @@ def before_request():
     if cookie:
         try:
             session_id = itsdangerous.Signer(settings.SECRET_KEY).unsign(cookie)
-            session = Session.load(session_id) or Session(_id=session_id)
+            session = load_session(cookie, session_id)
         except itsdangerous.BadData:
             return
-        if session.data.get('auth_user_id'):
-            database['user'].update({'_id': session.data.get('auth_user_id')}, {'$set': {'date_last_login': datetime.utcnow()}}, w=0)
+        if session is None:
+            session = Session(_id=session_id)
+        elif session.is_authenticated:
+            # Unchanged sessions are not saved; keep them from looking stale
+            touch_session(session_id)
+        user_id = session.data.get('auth_user_id')
+        if user_id and should_update_last_login(user_id):
+            database['user'].update({'_id': user_id}, {'$set': {'date_last_login': datetime.utcnow()}}, w=0)
         set_session(session)
 
 def after_request(response):
-    if session.data.get('auth_user_id'):
+    if session.data.get('auth_user_id') and session.is_dirty:
         session.save()
+        forget_session(session._id)
+        cookie = request.cookies.get(settings.COOKIE_NAME)
+        if cookie and cookie.startswith(session._id + '.'):
+            cache_session(cookie, session._get_current_object())
 
     return response
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+import copy
+
 from bson import ObjectId
 from modularodm import fields
 
@@ -13,6 +15,42 @@ class Session(StoredObject):
     date_modified = fields.DateTimeField(auto_now=True)
     data = fields.DictionaryField()
 
+    def __init__(self, *args, **kwargs):
+        super(Session, self).__init__(*args, **kwargs)
+        # Snapshot of `data` as last read from or written to the database
+        self._clean_data = copy.deepcopy(self.data) if kwargs.get('_is_loaded', False) else None
+
     @property
     def is_authenticated(self):
         return 'auth_user_id' in self.data
+
+    @property
+    def is_dirty(self):
+        """Whether `data` differs from what is stored, or the session has
+        never been saved.
+        """
+        return self._clean_data is None or self.data != self._clean_data
+
+    def save(self, *args, **kwargs):
+        saved_fields = super(Session, self).save(*args, **kwargs)
+        self._clean_data = copy.deepcopy(self.data)
+        return saved_fields
+
+
+class BasicAuthSession(object):
+    """Stands in for a `Session` on requests authenticated with HTTP Basic
+    auth, which send their credentials every time. Holds the auth data for
+    the request only, and is never stored.
+    """
+    _id = None
+    is_dirty = False
+
+    def __init__(self, data=None):
+        self.data = data or {}
+
+    @property
+    def is_authenticated(self):
+        return 'auth_user_id' in self.data
+
+    def save(self, *args, **kwargs):
+        pass
@@ -1,11 +1,87 @@
+import copy
+import datetime
+
 from modularodm import Q
 
+from framework.cache import TTLCache
+from website import settings
+
 from .model import Session
 
 
+#: Recently verified signed cookies => stored session documents
+session_cache = TTLCache(
+    maxsize=settings.SESSION_CACHE_SIZE,
+    ttl=settings.SESSION_CACHE_TTL,
+)
+
+#: Users whose last login date was written recently
+last_login_cache = TTLCache(
+    maxsize=settings.LAST_LOGIN_CACHE_SIZE,
+    ttl=settings.LAST_LOGIN_UPDATE_INTERVAL,
+)
+
+#: Sessions whose date_modified was refreshed recently
+session_touch_cache = TTLCache(
+    maxsize=settings.SESSION_CACHE_SIZE,
+    ttl=settings.SESSION_TOUCH_INTERVAL,
+)
+
+
+def load_session(cookie, session_id):
+    """Load the session for a verified cookie, using the copy of its stored
+    document cached by a recent request when there is one.
+    """
+    document = session_cache.get(cookie)
+    if document is not None:
+        return Session.load(data=copy.deepcopy(document))
+    session = Session.load(session_id)
+    if session is not None:
+        cache_session(cookie, session)
+    return session
+
+
+def cache_session(cookie, session):
+    session_cache.set(cookie, copy.deepcopy(session.to_storage()))
+
+
+def forget_session(session_id):
+    """Drop cached copies of a session, e.g. after it is removed."""
+    # Signed cookies take the form "<session_id>.<signature>"
+    session_cache.delete_where(lambda cookie: cookie.startswith(session_id + '.'))
+
+
+def should_update_last_login(user_id):
+    """Whether the last login date of a user is due to be written. Returns
+    True at most once per `LAST_LOGIN_UPDATE_INTERVAL` for each user in this
+    process.
+    """
+    if last_login_cache.get(user_id) is not None:
+        return False
+    last_login_cache.set(user_id, True)
+    return True
+
+
+def touch_session(session_id):
+    """Refresh the date_modified of a stored session that is in use but
+    unchanged, at most once per `SESSION_TOUCH_INTERVAL` in this process, so
+    that `scripts/clear_sessions.py` keeps it.
+    """
+    if session_touch_cache.get(session_id) is not None:
+        return False
+    session_touch_cache.set(session_id, True)
+    Session._storage[0].store.update(
+        {'_id': session_id},
+        {'$set': {'date_modified': datetime.datetime.utcnow()}},
+        w=0,
+    )
+    return True
+
+
 def remove_sessions_for_user(user):
     """Permanently remove all stored sessions for the user from the DB.
 
     :param User user:
     """
     Session.remove(Q('data.auth_user_id', 'eq', user._id))
+    session_cache.clear()
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import logging
 from framework.mongo import database as proxy_database
+from framework.mongo.handlers import acquire_connection, release_connection
 from website import settings as osfsettings
 
 logger = logging.getLogger(__name__)
@@ -26,10 +27,14 @@ def show_live(database=None):
     return database.command('showLiveTransactions')
 
 
+def connect():
+    acquire_connection()
+
+
 def disconnect(database=None):
     database = database or proxy_database
     try:
-        database.connection.close()
+        release_connection(database)
     except AttributeError:
         if not osfsettings.DEBUG_MODE:
             logger.error('MongoDB client not attached to request.')
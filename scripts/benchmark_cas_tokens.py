@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Time bearer token lookups against a local stub CAS server, with and
+without the token cache:
+
+    python -m scripts.benchmark_cas_tokens --requests 1000 --tokens 20 --latency 0.02
+"""
+from __future__ import absolute_import
+
+import time
+import argparse
+
+from framework.auth import cas
+from framework.auth.token_cache import TokenCache, MemoryBackend
+from website import settings
+
+from tests.fake_cas import FakeCAS
+
+
+def run(cache, requests, tokens):
+    original = cas.token_cache
+    cas.token_cache = cache
+    try:
+        start = time.time()
+        for index in range(requests):
+            cas.get_profile('token{0}'.format(index % tokens))
+        return time.time() - start
+    finally:
+        cas.token_cache = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--tokens', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds CAS takes to answer')
+    args = parser.parse_args()
+
+    users = dict(('token{0}'.format(index), 'user{0}'.format(index)) for index in range(args.tokens))
+    with FakeCAS(users, latency=args.latency) as fake:
+        settings.CAS_SERVER_URL = fake.url
+        for label, cache in (
+            ('uncached', TokenCache(backend=MemoryBackend(), ttl=0)),
+            ('cached', TokenCache(backend=MemoryBackend(), ttl=60)),
+        ):
+            del fake.requests[:]
+            elapsed = run(cache, args.requests, args.tokens)
+            print('{0}: {1:.3f}s, {2:.2f}ms per lookup, {3} CAS requests, {4}'.format(
+                label, elapsed, elapsed * 1000 / args.requests, len(fake.requests), cache.stats()
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Backfill the stored, indexed `date_modified` field on nodes, which replaces
+the property computed from the most recent log. Every node is checked, and
+those whose stored date differs from their latest log, e.g. nodes saved before
+the backfill ran, are updated. Reads and writes the raw
+collections so that saving nodes does not trigger search or Piwik updates.
+
+Usage:
+
+    python -m scripts.migrate_node_date_modified dry
+    python -m scripts.migrate_node_date_modified
+"""
+import sys
+import logging
+
+from framework.mongo import database
+from website.app import init_app
+from scripts import utils as script_utils
+
+logger = logging.getLogger(__name__)
+
+
+def get_targets():
+    return database['node'].find(
+        {},
+        {'logs': {'$slice': -1}, 'date_created': 1, 'date_modified': 1},
+    )
+
+
+def get_date_modified(node):
+    if node.get('logs'):
+        log = database['nodelog'].find_one({'_id': node['logs'][-1]}, {'date': 1})
+        if log and log.get('date'):
+            return log['date']
+    return node.get('date_created')
+
+
+def do_migration(targets, dry=False):
+    count = 0
+    for node in targets:
+        date_modified = get_date_modified(node)
+        if date_modified is None:
+            logger.warn('Could not determine date_modified for node {}'.format(node['_id']))
+            continue
+        if node.get('date_modified') == date_modified:
+            continue
+        logger.info('Setting date_modified of node {} to {}'.format(node['_id'], date_modified))
+        if not dry:
+            database['node'].update(
+                {'_id': node['_id']},
+                {'$set': {'date_modified': date_modified}},
+            )
+        count += 1
+    logger.info('{} {} nodes'.format('Would migrate' if dry else 'Migrated', count))
+    return count
+
+
+def main():
+    init_app(routes=False)  # Sets the storage backends on all models
+    dry = 'dry' in sys.argv
+    if not dry:
+        script_utils.add_file_logger(logger, __file__)
+    do_migration(get_targets(), dry)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Rebuild the materialized `ancestor_ids` and `root_id` fields of every node
+from the `parent` back-references. Safe to run repeatedly; only nodes whose
+stored path differs are written. Reads and writes the raw collection so that
+saving nodes does not trigger search or Piwik updates.
+
+Usage:
+
+    python -m scripts.rebuild_node_ancestry dry
+    python -m scripts.rebuild_node_ancestry
+"""
+import sys
+import logging
+
+from framework.mongo import database
+from website.app import init_app
+from scripts import utils as script_utils
+
+logger = logging.getLogger(__name__)
+
+PARENT_BACKREF = '__backrefs.parent.node.nodes'
+
+
+def get_parent_ids():
+    """Map the id of every node to the id of its primary parent, or None."""
+    parent_ids = {}
+    for node in database['node'].find({}, {PARENT_BACKREF: 1}):
+        refs = node.get('__backrefs', {}).get('parent', {}).get('node', {}).get('nodes')
+        parent_ids[node['_id']] = refs[0] if refs else None
+    return parent_ids
+
+
+def get_ancestry(node_id, parent_ids):
+    """Return the ancestor ids of a node, root first, and the id of its root."""
+    ancestor_ids = []
+    parent_id = parent_ids.get(node_id)
+    while parent_id is not None and parent_id not in ancestor_ids:
+        ancestor_ids.insert(0, parent_id)
+        parent_id = parent_ids.get(parent_id)
+    return ancestor_ids, ancestor_ids[0] if ancestor_ids else node_id
+
+
+def do_migration(dry=False):
+    parent_ids = get_parent_ids()
+    count = 0
+    for node in database['node'].find({}, {'ancestor_ids': 1, 'root_id': 1}):
+        ancestor_ids, root_id = get_ancestry(node['_id'], parent_ids)
+        if node.get('ancestor_ids') == ancestor_ids and node.get('root_id') == root_id:
+            continue
+        logger.info('Setting ancestry of node {} to {}'.format(node['_id'], ancestor_ids))
+        if not dry:
+            database['node'].update(
+                {'_id': node['_id']},
+                {'$set': {'ancestor_ids': ancestor_ids, 'root_id': root_id}},
+            )
+        count += 1
+    logger.info('{} {} nodes'.format('Would rebuild' if dry else 'Rebuilt', count))
+    return count
+
+
+def main():
+    init_app(routes=False)  # Sets the storage backends on all models
+    dry = 'dry' in sys.argv
+    if not dry:
+        script_utils.add_file_logger(logger, __file__)
+    do_migration(dry)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Recompute the /explore/activity snapshot now rather than waiting for the
+periodic task:
+
+    python -m scripts.refresh_activity_snapshot
+"""
+
+import logging
+
+from website.app import init_app
+from website.discovery.tasks import refresh_activity_snapshot
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def main():
+    snapshot = refresh_activity_snapshot()
+    logger.info('Refreshed activity snapshot at {0}'.format(snapshot['computed'].isoformat()))
+
+
+if __name__ == '__main__':
+    init_app(set_backends=True, routes=False)
+    main()
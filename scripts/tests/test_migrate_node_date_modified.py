@@ -0,0 +1,64 @@
+import datetime
+
+from nose.tools import *  # noqa
+
+from framework.auth import Auth
+from framework.mongo import database
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory
+from website.models import Node, NodeLog
+
+from scripts.migrate_node_date_modified import do_migration, get_targets
+
+
+class TestMigrateNodeDateModified(OsfTestCase):
+
+    def setUp(self):
+        super(TestMigrateNodeDateModified, self).setUp()
+        self.project = ProjectFactory()
+        self.log_date = datetime.datetime(2015, 1, 1)
+        self.project.add_log(
+            NodeLog.EDITED_TITLE,
+            params={'node': self.project._id},
+            auth=Auth(self.project.creator),
+            log_date=self.log_date,
+        )
+        self.empty = ProjectFactory()
+        database['node'].update(
+            {'_id': {'$in': [self.project._id, self.empty._id]}},
+            {'$unset': {'date_modified': True}},
+            multi=True,
+        )
+        database['node'].update({'_id': self.empty._id}, {'$set': {'logs': []}})
+        Node._clear_caches()
+
+    def test_get_targets(self):
+        ids = [each['_id'] for each in get_targets()]
+        assert_in(self.project._id, ids)
+        assert_in(self.empty._id, ids)
+
+    def test_do_migration(self):
+        assert_equal(do_migration(get_targets()), 2)
+        Node._clear_caches()
+        assert_equal(Node.load(self.project._id).date_modified, self.log_date)
+        empty = Node.load(self.empty._id)
+        assert_equal(empty.date_modified, empty.date_created)
+        assert_equal(do_migration(get_targets()), 0)
+
+    def test_node_saved_before_backfill_is_recomputed(self):
+        database['node'].update(
+            {'_id': self.project._id},
+            {'$set': {'date_modified': self.project.date_created}},
+        )
+        assert_equal(do_migration(get_targets()), 2)
+        Node._clear_caches()
+        assert_equal(Node.load(self.project._id).date_modified, self.log_date)
+
+    def test_dry_run(self):
+        assert_equal(do_migration(get_targets(), dry=True), 2)
+        assert_equal(do_migration(get_targets(), dry=True), 2)
+
+    def test_save_before_backfill_uses_latest_log(self):
+        project = Node.load(self.project._id)
+        project.save()
+        assert_equal(project.date_modified, self.log_date)
@@ -0,0 +1,51 @@
+from nose.tools import *  # noqa
+
+from framework.mongo import database
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory, NodeFactory
+from website.models import Node
+
+from scripts.rebuild_node_ancestry import do_migration, get_ancestry, get_parent_ids
+
+
+class TestRebuildNodeAncestry(OsfTestCase):
+
+    def setUp(self):
+        super(TestRebuildNodeAncestry, self).setUp()
+        self.project = ProjectFactory()
+        self.component = NodeFactory(parent=self.project)
+        self.subcomponent = NodeFactory(parent=self.component)
+        self.ids = [self.project._id, self.component._id, self.subcomponent._id]
+        database['node'].update(
+            {'_id': {'$in': self.ids}},
+            {'$unset': {'ancestor_ids': True, 'root_id': True}},
+            multi=True,
+        )
+        Node._clear_caches()
+
+    def test_get_ancestry(self):
+        parent_ids = get_parent_ids()
+        assert_equal(
+            get_ancestry(self.subcomponent._id, parent_ids),
+            ([self.project._id, self.component._id], self.project._id)
+        )
+        assert_equal(get_ancestry(self.project._id, parent_ids), ([], self.project._id))
+
+    def test_do_migration(self):
+        assert_equal(do_migration(), 3)
+        Node._clear_caches()
+        for node in Node.find():
+            ancestor_ids = []
+            parent = node.parent_node
+            while parent is not None:
+                ancestor_ids.insert(0, parent._id)
+                parent = parent.parent_node
+            assert_equal(node.ancestor_ids, ancestor_ids)
+        subcomponent = Node.load(self.subcomponent._id)
+        assert_equal(subcomponent.root_id, self.project._id)
+        assert_equal(do_migration(), 0)
+
+    def test_dry_run(self):
+        assert_equal(do_migration(dry=True), 3)
+        Node._clear_caches()
+        assert_is_none(Node.load(self.subcomponent._id).root_id)
@@ -2,10 +2,12 @@ import json
 
 from nose.tools import *  # flake8: noqa
 import httpretty
+from modularodm import Q
 
 from framework.auth.core import Auth
 
 from website.addons.github import model
+from website.files.models import StoredFileNode
 from website.models import Node
 from website.util import waterbutler_api_url_for
 from api.base.settings.defaults import API_BASE
@@ -174,6 +176,19 @@ class TestNodeFilesList(ApiTestCase):
         assert_equal(res.json['data'][0]['attributes']['name'], 'NewFile')
         assert_equal(res.json['data'][0]['attributes']['provider'], 'github')
 
+    def test_node_files_list_is_paginated_before_files_are_stored(self):
+        self._prepare_mock_wb_response(provider='github', files=[
+            {'name': name, 'path': '/' + name, 'materialized': '/' + name, 'etag': name}
+            for name in ['a', 'b', 'c', 'd', 'e']
+        ])
+        url = '/{}nodes/{}/files/github/?page[size]=2&page=2'.format(API_BASE, self.project._id)
+        res = self.app.get(url, auth=self.user.auth)
+        assert_equal(res.status_code, 200)
+        assert_equal([each['attributes']['name'] for each in res.json['data']], ['c', 'd'])
+        assert_equal(res.json['links']['meta']['total'], 5)
+        stored = StoredFileNode.find(Q('node', 'eq', self.project) & Q('provider', 'eq', 'github'))
+        assert_equal(sorted(each.name for each in stored), ['c', 'd'])
+
     def test_returns_node_file(self):
         self._prepare_mock_wb_response(provider='github', files=[{'name': 'NewFile'}], folder=False, path='/file')
         url = '/{}nodes/{}/files/github/file'.format(API_BASE, self.project._id)
@@ -298,3 +313,44 @@ class TestNodeFilesListFiltering(ApiTestCase):
 
 
 
+
+
+class TestNodeOsfStorageFilesListFiltering(ApiTestCase):
+
+    def setUp(self):
+        super(TestNodeOsfStorageFilesListFiltering, self).setUp()
+        self.user = AuthUserFactory()
+        self.project = ProjectFactory(creator=self.user)
+        root = self.project.get_addon('osfstorage').get_root()
+        self.notes = root.append_file('notes.txt')
+        root.append_file('Results.csv')
+        root.append_folder('results')
+        self.url = '/{}nodes/{}/files/osfstorage/'.format(API_BASE, self.project._id)
+
+    def test_filter_on_stored_field(self):
+        res = self.app.get(self.url + '?filter[name]=result', auth=self.user.auth)
+        assert_equal(res.status_code, 200)
+        names = sorted(each['attributes']['name'] for each in res.json['data'])
+        assert_equal(names, ['Results.csv', 'results'])
+        assert_equal(res.json['links']['meta']['total'], 2)
+
+    def test_filter_on_stored_and_computed_fields(self):
+        res = self.app.get(self.url + '?filter[name]=result&filter[kind]=folder', auth=self.user.auth)
+        assert_equal(res.status_code, 200)
+        assert_equal([each['attributes']['name'] for each in res.json['data']], ['results'])
+
+    def test_filter_on_computed_path(self):
+        # osfstorage stores an empty path and computes the real one
+        res = self.app.get(self.url + '?filter[path]=' + self.notes._id, auth=self.user.auth)
+        assert_equal(res.status_code, 200)
+        assert_equal([each['attributes']['name'] for each in res.json['data']], ['notes.txt'])
+
+    def test_unfiltered_list_is_paginated(self):
+        res = self.app.get(self.url + '?page[size]=2', auth=self.user.auth)
+        assert_equal(res.status_code, 200)
+        assert_equal(len(res.json['data']), 2)
+        assert_equal(res.json['links']['meta']['total'], 3)
+
+    def test_invalid_filter(self):
+        res = self.app.get(self.url + '?filter[notafield]=bogus', auth=self.user.auth, expect_errors=True)
+        assert_equal(res.status_code, 400)
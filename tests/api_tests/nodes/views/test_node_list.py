@@ -76,6 +76,31 @@ class TestNodeList(ApiTestCase):
         assert_in(self.public._id, ids)
         assert_not_in(self.private._id, ids)
 
+    def test_node_list_ordered_by_date_modified(self):
+        self.public.add_log(
+            NodeLog.EDITED_TITLE,
+            params={'node': self.public._id},
+            auth=Auth(self.user),
+        )
+        newer = ProjectFactory(is_public=True, creator=self.user)
+        res = self.app.get(self.url)
+        ids = [each['id'] for each in res.json['data']]
+        assert_equal(ids[:2], [newer._id, self.public._id])
+
+        self.public.add_log(
+            NodeLog.EDITED_TITLE,
+            params={'node': self.public._id},
+            auth=Auth(self.user),
+        )
+        res = self.app.get(self.url)
+        ids = [each['id'] for each in res.json['data']]
+        assert_equal(ids[:2], [self.public._id, newer._id])
+
+    def test_node_list_ignores_sort_on_unstored_field(self):
+        res = self.app.get(self.url + '?sort=-absolute_url')
+        assert_equal(res.status_code, 200)
+        assert_in(self.public._id, [each['id'] for each in res.json['data']])
+
 
 class TestNodeFiltering(ApiTestCase):
 
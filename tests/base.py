@@ -25,6 +25,7 @@ from modularodm import storage
 from api.base.wsgi import application as django_app
 from framework.mongo import set_up_storage
 from framework.auth import User
+from framework.auth.token_cache import token_cache
 from framework.sessions.model import Session
 from framework.guid.model import Guid
 from framework.mongo import client as client_proxy
@@ -119,6 +120,10 @@ class DbTestCase(unittest.TestCase):
 
         cls._original_bcrypt_log_rounds = settings.BCRYPT_LOG_ROUNDS
         settings.BCRYPT_LOG_ROUNDS = 1
+        # Write page counters through rather than from a background thread,
+        # which could write into the database outside each test's cleanup
+        cls._original_analytics_flush_interval = settings.ANALYTICS_FLUSH_INTERVAL
+        settings.ANALYTICS_FLUSH_INTERVAL = 0
 
         teardown_database(database=database_proxy._get_current_object())
         # TODO: With `database` as a `LocalProxy`, we should be able to simply
@@ -142,6 +147,7 @@ class DbTestCase(unittest.TestCase):
         settings.PIWIK_HOST = cls._original_piwik_host
         settings.ENABLE_EMAIL_SUBSCRIPTIONS = cls._original_enable_email_subscriptions
         settings.BCRYPT_LOG_ROUNDS = cls._original_bcrypt_log_rounds
+        settings.ANALYTICS_FLUSH_INTERVAL = cls._original_analytics_flush_interval
 
 
 class AppTestCase(unittest.TestCase):
@@ -295,6 +301,8 @@ class ApiTestCase(DbTestCase, ApiAppTestCase, UploadTestCase, MockRequestTestCas
     def setUp(self):
         super(ApiTestCase, self).setUp()
         settings.USE_EMAIL = False
+        # Tests reuse tokens with different mocked CAS responses
+        token_cache.clear()
         
 
 # From Flask-Security: https://github.com/mattupstate/flask-security/blob/develop/flask_security/utils.py
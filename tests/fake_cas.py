@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""A local, in-process stand-in for CAS's OAuth2 profile endpoint. Useful for
+exercising and benchmarking bearer token lookups without a CAS server:
+
+    with FakeCAS({'token': 'abc12'}, latency=0.05) as fake:
+        client = cas.CasClient(fake.url)
+        client.profile('token')
+"""
+
+import json
+import time
+import threading
+import BaseHTTPServer
+import SocketServer
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class FakeCAS(object):
+    """Answer profile requests for the access tokens in ``tokens``, a mapping
+    of tokens to user ids, on a random local port. Other tokens get a 401.
+
+    :param dict scopes: Scopes granted to each token; none by default
+    :param float latency: Seconds to wait before answering each request
+    """
+    def __init__(self, tokens=None, scopes=None, latency=0):
+        self.tokens = tokens or {}
+        self.scopes = scopes or {}
+        self.latency = latency
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = _Server(('127.0.0.1', 0), self._make_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{0}'.format(self.server.server_address[1])
+
+    def _respond(self, header):
+        token = header.split(' ', 1)[-1]
+        with self._lock:
+            self.requests.append(token)
+        if self.latency:
+            time.sleep(self.latency)
+        if token not in self.tokens:
+            return 401, {'error': 'expired_accessToken'}
+        return 200, {'id': self.tokens[token], 'scope': self.scopes.get(token, [])}
+
+    def _make_handler(self):
+        cas = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, body = cas._respond(self.headers.get('Authorization', ''))
+                payload = json.dumps(body)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""A local, in-process stand-in for WaterButler's metadata endpoint, serving a
+generated folder tree. Useful for exercising and benchmarking file tree
+crawling without network access:
+
+    with FakeWaterButler(depth=3, fanout=10) as waterbutler:
+        crawler = FileTreeCrawler('dropbox', waterbutler.url, parse)
+        crawler.crawl({'path': '/', 'kind': 'folder', 'name': ''})
+"""
+
+import json
+import time
+import urlparse
+import threading
+import BaseHTTPServer
+import SocketServer
+
+
+class _Server(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class FakeWaterButler(object):
+    """Serve a tree of ``depth`` levels of ``fanout`` folders, each holding
+    ``files`` files, on a random local port.
+
+    :param float latency: Seconds to wait before answering each request
+    :param int throttle: Answer this many requests with a 429 first
+    """
+    def __init__(self, depth=2, fanout=3, files=2, latency=0, throttle=0):
+        self.depth = depth
+        self.fanout = fanout
+        self.files = files
+        self.latency = latency
+        self.throttle = throttle
+        self.requests = []
+        self._lock = threading.Lock()
+        self.server = _Server(('127.0.0.1', 0), self._make_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{0}/data?path=/'.format(self.server.server_address[1])
+
+    @property
+    def folder_count(self):
+        """Number of folders below the root."""
+        return sum(self.fanout ** level for level in range(1, self.depth + 1))
+
+    def list_folder(self, path):
+        """Metadata of the children of the folder at ``path``, or None."""
+        level = len([part for part in path.split('/') if part])
+        if level > self.depth:
+            return None
+        base = path.rstrip('/')
+        children = [
+            {
+                'path': '{0}/file{1}'.format(base, index),
+                'name': 'file{0}'.format(index),
+                'kind': 'file',
+                'size': 1024,
+            }
+            for index in range(self.files)
+        ]
+        if level < self.depth:
+            children.extend(
+                {
+                    'path': '{0}/folder{1}/'.format(base, index),
+                    'name': 'folder{0}'.format(index),
+                    'kind': 'folder',
+                }
+                for index in range(self.fanout)
+            )
+        return children
+
+    def _respond(self, path):
+        with self._lock:
+            self.requests.append(path)
+            if self.throttle > 0:
+                self.throttle -= 1
+                return 429, {'message': 'Too many requests'}
+        if self.latency:
+            time.sleep(self.latency)
+        children = self.list_folder(path)
+        if children is None:
+            return 404, {'message': 'Not found'}
+        return 200, {'data': children}
+
+    def _make_handler(self):
+        waterbutler = self
+
+        class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                query = urlparse.parse_qs(urlparse.urlparse(self.path).query)
+                status, body = waterbutler._respond(query.get('path', ['/'])[0])
+                payload = json.dumps(body)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
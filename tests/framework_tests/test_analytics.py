@@ -3,14 +3,17 @@
 Unit tests for analytics logic in framework/analytics/__init__.py
 """
 
+import time
 import unittest
 
+import mock
 from nose.tools import *  # flake8: noqa  (PEP8 asserts)
 from flask import Flask
 
 from datetime import datetime
 
 from framework import analytics, sessions
+from framework.analytics import counters
 from framework.sessions import session
 
 from tests.base import OsfTestCase
@@ -40,6 +43,75 @@ class TestAnalytics(OsfTestCase):
         assert_equal(user.get_activity_points(db=self.db), 1)
 
 
+class TestCounterBuffer(OsfTestCase):
+
+    def setUp(self):
+        super(TestCounterBuffer, self).setUp()
+        self.buffer = counters.CounterBuffer(interval=3600, max_pending=3)
+        self.collection = self.db['testcounters']
+
+    def test_increments_aggregated_until_flushed(self):
+        for _ in range(2):
+            self.buffer.increment(self.collection, 'a', {'total': 1})
+        self.buffer.increment(self.collection, 'a', {'total': 1, 'unique': 1})
+        assert_equal(self.collection.find().count(), 0)
+        assert_equal(self.buffer.pending(self.collection, 'a'), {'total': 3, 'unique': 1})
+        self.buffer.flush()
+        assert_equal(self.collection.find_one({'_id': 'a'}), {'_id': 'a', 'total': 3, 'unique': 1})
+        assert_equal(self.buffer.pending(self.collection, 'a'), {})
+
+    def test_increment_does_not_flush_inline(self):
+        with mock.patch.object(self.buffer, 'flush') as mock_flush:
+            with mock.patch.object(self.buffer, '_ensure_worker'):
+                for _id in ('a', 'b', 'c'):
+                    self.buffer.increment(self.collection, _id, {'total': 1})
+        assert_false(mock_flush.called)
+        # Too many pending; the worker is woken up early
+        assert_true(self.buffer._wake.is_set())
+
+    def test_worker_flushes_when_too_many_pending(self):
+        for _id in ('a', 'b', 'c'):
+            self.buffer.increment(self.collection, _id, {'total': 1})
+        for _ in range(50):
+            if self.collection.find().count() == 3:
+                break
+            time.sleep(0.1)
+        assert_equal(self.collection.find().count(), 3)
+
+    def test_write_through_without_interval(self):
+        buffer = counters.CounterBuffer(interval=0)
+        buffer.increment(self.collection, 'a', {'total': 1})
+        assert_equal(self.collection.find_one({'_id': 'a'})['total'], 1)
+
+    def test_failed_flush_kept(self):
+        self.buffer.increment(self.collection, 'a', {'total': 1})
+        with mock.patch.object(self.collection, 'update', side_effect=Exception):
+            self.buffer.flush()
+        assert_equal(self.buffer.pending(self.collection, 'a'), {'total': 1})
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_add_and_contains(self):
+        visited = counters.BloomFilter(bits=1024, hashes=4)
+        assert_true(visited.add('node:abc12'))
+        assert_false(visited.add('node:abc12'))
+        assert_in('node:abc12', visited)
+        assert_not_in('node:def34', visited)
+
+    def test_dumps(self):
+        visited = counters.BloomFilter(bits=1024, hashes=4)
+        visited.add(u'download:abc12:\u2603')
+        loaded = counters.BloomFilter(bits=1024, hashes=4, data=visited.dumps())
+        assert_in(u'download:abc12:\u2603', loaded)
+        assert_equal(len(visited.dumps()), len(counters.BloomFilter(bits=1024, hashes=4).dumps()))
+
+    def test_size_change_resets(self):
+        visited = counters.BloomFilter(bits=1024, hashes=4)
+        visited.add('node:abc12')
+        assert_not_in('node:abc12', counters.BloomFilter(bits=2048, hashes=4, data=visited.dumps()))
+
+
 class UpdateCountersTestCase(OsfTestCase):
 
     def setUp(self):
@@ -75,9 +147,6 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, self.fid), db=self.db)
         assert_equal(count, (1, 1))
 
-        page = 'download:{0}:{1}'.format(self.node, self.fid)
-
-        session.data['visited'].append(page)
         download_file_(node=self.node, fid=self.fid)
 
         count = analytics.get_basic_counters('download:{0}:{1}'.format(self.node, self.fid), db=self.db)
@@ -96,14 +165,45 @@ class TestUpdateCounters(UpdateCountersTestCase):
         count = analytics.get_basic_counters('download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid), db=self.db)
         assert_equal(count, (1, 1))
 
-        page = 'download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid)
-
-        session.data['visited'].append(page)
         download_file_version_(node=self.node, fid=self.fid, vid=self.vid)
 
         count = analytics.get_basic_counters('download:{0}:{1}:{2}'.format(self.node, self.fid, self.vid), db=self.db)
         assert_equal(count, (1, 2))
 
+    def test_update_counters_buffered(self):
+        page = 'node:' + str(self.node._id)
+        with mock.patch.object(analytics.counters.page_counters, 'interval', 3600):
+            analytics.update_counter(page, db=self.db)
+            analytics.update_counter(page, db=self.db)
+            assert_is_none(self.db['pagecounters'].find_one({'_id': page}))
+            assert_equal(analytics.get_basic_counters(page, db=self.db), (1, 2))
+            analytics.counters.page_counters.flush()
+        stored = self.db['pagecounters'].find_one({'_id': page})
+        assert_equal((stored['unique'], stored['total']), (1, 2))
+        assert_equal(analytics.get_basic_counters(page, db=self.db), (1, 2))
+
+    def test_update_counters_daily_unique(self):
+        page = 'node:' + str(self.node._id)
+        analytics.update_counter(page, db=self.db)
+        session.data['visited_today']['date'] = '2015/01/01'
+        analytics.update_counter(page, db=self.db)
+        analytics.counters.page_counters.flush()
+        date = datetime.utcnow().strftime('%Y/%m/%d')
+        stored = self.db['pagecounters'].find_one({'_id': page})
+        assert_equal(stored['unique'], 1)
+        assert_equal(stored['date'][date], {'unique': 2, 'total': 2})
+
+    def test_update_counters_converts_visited_lists(self):
+        page = 'node:' + str(self.node._id)
+        date = datetime.utcnow().strftime('%Y/%m/%d')
+        session.data['visited'] = [page]
+        session.data['visited_by_date'] = {'date': date, 'pages': [page]}
+        analytics.update_counter(page, db=self.db)
+        assert_equal(analytics.get_basic_counters(page, db=self.db), (0, 1))
+        assert_not_in('visited', session.data)
+        assert_not_in('visited_by_date', session.data)
+        assert_in(page, analytics.counters.BloomFilter(data=session.data['visited_filter']))
+
     def test_get_basic_counters(self):
         page = 'node:' + str(self.node._id)
 
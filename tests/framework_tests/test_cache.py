@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from nose.tools import *  # flake8: noqa
+
+from framework.cache import TTLCache
+
+
+class FakeTimer(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(TestCase):
+
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.cache = TTLCache(maxsize=2, ttl=10, timer=self.timer)
+
+    def test_get_set(self):
+        self.cache.set('a', 1)
+        assert_equal(self.cache.get('a'), 1)
+        assert_equal(self.cache.hits, 1)
+
+    def test_entries_expire(self):
+        self.cache.set('a', 1)
+        self.timer.now = 11
+        assert_is_none(self.cache.get('a'))
+        assert_equal(self.cache.misses, 1)
+
+    def test_least_recently_used_evicted(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        assert_is_none(self.cache.get('b'))
+        assert_equal(self.cache.get('a'), 1)
+        assert_equal(len(self.cache), 2)
+
+    def test_zero_ttl_disables_cache(self):
+        cache = TTLCache(ttl=0)
+        cache.set('a', 1)
+        assert_false(cache.enabled)
+        assert_is_none(cache.get('a'))
+
+    def test_delete_where(self):
+        self.cache.set(('user', 1), 1)
+        self.cache.set(('node', 1), 2)
+        self.cache.delete_where(lambda key: key[0] == 'user')
+        assert_is_none(self.cache.get(('user', 1)))
+        assert_equal(self.cache.get(('node', 1)), 2)
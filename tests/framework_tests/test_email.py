@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
-import unittest
+import os
+import socket
 import smtplib
+import tempfile
+import unittest
 
+import mock
 from nose.tools import *  # PEP8 asserts
 
-from framework.email.tasks import send_email
+from framework.email import backends
+from framework.email.tasks import send_email, send_emails
 from website import settings
 
 # Check if local mail server is running
@@ -27,5 +32,143 @@ class TestEmail(unittest.TestCase):
                                  message="<h1>Greetings!</h1>", ttls=False, login=False))
 
 
+
+class FakeSMTP(object):
+    """Records what is sent; fails sends once ``drop_after`` are done."""
+    def __init__(self, host, drop_after=None):
+        self.host = host
+        self.drop_after = drop_after
+        self.sent = []
+        self.logins = 0
+        self.closed = False
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def noop(self):
+        if self.closed:
+            raise smtplib.SMTPServerDisconnected()
+        return 250, 'OK'
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        if self.closed or (self.drop_after is not None and len(self.sent) >= self.drop_after):
+            self.closed = True
+            raise smtplib.SMTPServerDisconnected()
+        if 'refused@example.com' in to_addrs:
+            raise smtplib.SMTPRecipientsRefused({})
+        self.sent.append((from_addr, to_addrs, msg))
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+class TestSMTPPool(unittest.TestCase):
+
+    def setUp(self):
+        self.connections = []
+        self.now = 0
+        self.pool = backends.SMTPPool(
+            'smtp.example.com', 'user', 'secret', size=2, max_idle=30,
+            connect=self.connect, timer=lambda: self.now,
+        )
+        self.backend = backends.SMTPBackend(pool=self.pool)
+
+    def connect(self, host):
+        conn = FakeSMTP(host)
+        self.connections.append(conn)
+        return conn
+
+    def messages(self, count):
+        return [('from@example.com', ['to{0}@example.com'.format(i)], 'Hello') for i in range(count)]
+
+    def test_connection_is_reused(self):
+        assert_equal(self.backend.send_messages(self.messages(2)), 2)
+        assert_equal(self.backend.send_messages(self.messages(3)), 3)
+        assert_equal(len(self.connections), 1)
+        assert_equal(self.connections[0].logins, 1)
+        assert_equal(len(self.connections[0].sent), 5)
+
+    def test_concurrent_connections(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        assert_is_not(first, second)
+        self.pool.release(first)
+        self.pool.release(second)
+        assert_equal(len(self.connections), 2)
+
+    def test_idle_connection_checked_before_reuse(self):
+        self.backend.send_messages(self.messages(1))
+        self.connections[0].closed = True
+        self.now = 60
+        self.backend.send_messages(self.messages(1))
+        assert_equal(len(self.connections), 2)
+        assert_equal(len(self.connections[1].sent), 1)
+
+    def test_reconnects_when_dropped_mid_batch(self):
+        self.backend.send_messages(self.messages(1))
+        self.connections[0].drop_after = 2
+        assert_equal(self.backend.send_messages(self.messages(3)), 3)
+        assert_equal(len(self.connections), 2)
+        assert_equal(len(self.connections[0].sent) + len(self.connections[1].sent), 4)
+
+    def test_gives_up_after_second_disconnect(self):
+        self.pool.connect = mock.Mock(side_effect=lambda host: FakeSMTP(host, drop_after=0))
+        with assert_raises(smtplib.SMTPServerDisconnected):
+            self.backend.send_messages(self.messages(1))
+        # Broken connections are not returned to the pool
+        assert_true(self.pool._idle.empty())
+
+    def test_refused_recipients_skipped(self):
+        messages = self.messages(1) + [('from@example.com', ['refused@example.com'], 'Hello')] + self.messages(1)
+        assert_equal(self.backend.send_messages(messages), 2)
+
+    def test_failed_connect_frees_slot(self):
+        self.pool.connect = mock.Mock(side_effect=socket.error)
+        for _ in range(3):
+            with assert_raises(socket.error):
+                self.pool.acquire()
+
+
+class TestMailBackends(unittest.TestCase):
+
+    def setUp(self):
+        del backends.MemoryBackend.outbox[:]
+
+    @mock.patch('framework.email.tasks.settings.USE_EMAIL', True)
+    @mock.patch('framework.email.backends.settings.MAIL_BACKEND', 'memory')
+    def test_send_emails_batch(self):
+        messages = [
+            {'from_addr': 'from@example.com', 'to_addr': 'to{0}@example.com'.format(i),
+             'subject': 'Hi', 'message': 'Hello'}
+            for i in range(3)
+        ]
+        assert_equal(send_emails(messages, ttls=False, login=False), 3)
+        outbox = backends.MemoryBackend.outbox
+        assert_equal([to_addrs for _, to_addrs, _ in outbox], [[each['to_addr']] for each in messages])
+        assert_in('Subject: Hi', outbox[0][2])
+
+    @mock.patch('framework.email.tasks.settings.USE_EMAIL', False)
+    def test_send_emails_disabled(self):
+        assert_equal(send_emails([{'from_addr': 'a@b.c', 'to_addr': 'd@e.f', 'subject': '', 'message': ''}]), 0)
+
+    def test_file_backend(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        backend = backends.FileBackend(path=path)
+        assert_equal(backend.send_messages([('from@example.com', ['to@example.com'], 'Hello')]), 1)
+        with open(path) as fp:
+            assert_in('To: to@example.com\nHello', fp.read())
+
+
 if __name__ == '__main__':
     unittest.main()
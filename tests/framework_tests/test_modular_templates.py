@@ -8,13 +8,16 @@ import unittest
 import os
 
 import flask
+import mock
+import lxml.html
 from lxml.html import fragment_fromstring
 import werkzeug.wrappers
+from nose.tools import *  # noqa (PEP8 asserts)
 
 from framework.exceptions import HTTPError, http
 from framework.routing import (
     Renderer, JSONRenderer, WebRenderer,
-    render_mako_string,
+    render_mako_string, mark_embeds, EMBED_START, EMBED_END,
 )
 
 from tests.base import AppTestCase, OsfTestCase
@@ -230,6 +233,38 @@ class WebRendererTemplateTestCase(OsfTestCase):
         # The contents of the inner template should be present in the page.
         self.assertIn('child template content', resp.data)
 
+    def test_nested_templates_rendered_without_parsing_page(self):
+        self.app.app.preprocess_request()
+        r = WebRenderer(
+            'nested_parent_inner.html',
+            render_mako_string,
+            template_dir=TEMPLATES_PATH,
+        )
+        with mock.patch('framework.routing.lxml.html.fragment_fromstring',
+                        wraps=lxml.html.fragment_fromstring) as mock_parse:
+            resp = r({'name': 'alice', 'extra': ''})
+        # Only the embed element itself is parsed
+        assert_equal(mock_parse.call_count, 1)
+        assert_in('mod-meta', mock_parse.call_args[0][0])
+        assert_not_in('after', mock_parse.call_args[0][0])
+        assert_in('<p>child template content</p></div>', resp.data)
+        assert_in('<p>after</p>', resp.data)
+        assert_not_in(EMBED_START, resp.data)
+        assert_not_in(EMBED_END, resp.data)
+
+    def test_unmarked_embeds_from_data_still_rendered(self):
+        self.app.app.preprocess_request()
+        r = WebRenderer(
+            'nested_parent_inner.html',
+            render_mako_string,
+            template_dir=TEMPLATES_PATH,
+        )
+        resp = r({
+            'name': 'alice',
+            'extra': """<div mod-meta='{"tpl": "nested_child.html", "replace": true}'></div>""",
+        })
+        assert_equal(resp.data.count('child template content'), 2)
+
     def test_render_included_template(self):
         """``WebRenderer.render_element()`` is the internal method called when
         a template string is rendered. This test case examines the same
@@ -319,6 +354,38 @@ class WebRendererTemplateTestCase(OsfTestCase):
         )
 
 
+class MarkEmbedsTestCase(unittest.TestCase):
+
+    def test_no_embeds(self):
+        source = '<div>${name}</div>'
+        assert mark_embeds(source) is source
+
+    def test_marks_embeds(self):
+        source = (
+            "<div>\n"
+            "<div mod-meta='{\"tpl\": \"${'a' if x else 'b>'}.mako\"}'><div></div></div>\n"
+            "<span mod-meta='{}'/>\n"
+            "</div>"
+        )
+        self.assertEqual(
+            mark_embeds(source),
+            (
+                "<div>\n"
+                + EMBED_START + "<div mod-meta='{\"tpl\": \"${'a' if x else 'b>'}.mako\"}'><div></div></div>" + EMBED_END
+                + "\n" + EMBED_START + "<span mod-meta='{}'/>" + EMBED_END + "\n"
+                "</div>"
+            )
+        )
+
+    def test_nested_embeds_left_alone(self):
+        source = "<div mod-meta='{}'><div mod-meta='{}'></div></div>"
+        self.assertEqual(mark_embeds(source), source)
+
+    def test_unclosed_embed_left_alone(self):
+        source = "<div mod-meta='{}'><div></div>"
+        self.assertEqual(mark_embeds(source), source)
+
+
 class JSONRendererEncoderTestCase(unittest.TestCase):
 
     def test_encode_custom_class(self):
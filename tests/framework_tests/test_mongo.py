@@ -3,11 +3,13 @@ Tests related to functions in framework.mongo
 """
 from unittest import TestCase
 
+import mock
+
 from nose.tools import *  # flake8: noqa
 
 from modularodm.exceptions import ValidationError, ValidationValueError
 
-from framework.mongo import validators
+from framework.mongo import handlers, validators
 
 class TestValidators(TestCase):
 
@@ -62,3 +64,49 @@ class TestValidators(TestCase):
 
         with assert_raises(ValidationError):
             new_validator({'k': 'v', 'k2': 'v2'})
+
+
+class TestClientPool(TestCase):
+
+    def setUp(self):
+        self.pool = handlers.ClientPool()
+        self.patcher = mock.patch('framework.mongo.handlers.get_mongo_client')
+        self.mock_get_client = self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_get_client_reuses_client(self):
+        first = self.pool.get_client()
+        second = self.pool.get_client()
+        assert_is(first, second)
+        self.mock_get_client.assert_called_once_with(pooled=True)
+        assert_equal(self.pool.stats['created'], 1)
+
+    @mock.patch('framework.mongo.handlers.os.getpid')
+    def test_get_client_recreated_after_fork(self, mock_getpid):
+        mock_getpid.return_value = 1
+        self.pool.get_client()
+        mock_getpid.return_value = 2
+        self.pool.get_client()
+        assert_equal(self.mock_get_client.call_count, 2)
+        assert_equal(self.pool.stats['resets'], 1)
+
+    def test_checkout_pins_socket_once_per_thread(self):
+        client = self.pool.checkout()
+        self.pool.checkout()
+        client.start_request.assert_called_once_with()
+        assert_equal(self.pool.stats['active'], 1)
+
+    def test_release_ends_request(self):
+        client = self.pool.checkout()
+        self.pool.release(client)
+        self.pool.release(client)
+        client.end_request.assert_called_once_with()
+        assert_equal(self.pool.stats['active'], 0)
+
+    def test_status(self):
+        self.pool.checkout()
+        status = self.pool.status()
+        assert_equal(status['checkouts'], 1)
+        assert_in('max_pool_size', status)
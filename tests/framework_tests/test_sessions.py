@@ -1,3 +1,5 @@
+import datetime
+
 from nose.tools import *
 
 from framework.sessions import utils
@@ -34,3 +36,109 @@ class SessionUtilsTestCase(DbTestCase):
 
         utils.remove_sessions_for_user(self.user)
         assert_equal(1, Session.find().count())
+
+
+class SessionDirtyTrackingTestCase(DbTestCase):
+
+    def tearDown(self, *args, **kwargs):
+        super(SessionDirtyTrackingTestCase, self).tearDown(*args, **kwargs)
+        Session.remove()
+
+    def test_new_session_is_dirty(self):
+        assert_true(Session().is_dirty)
+
+    def test_saved_session_is_clean(self):
+        session = factories.SessionFactory()
+        session.save()
+        assert_false(session.is_dirty)
+        session.data['auth_user_id'] = 'abc12'
+        assert_true(session.is_dirty)
+        session.save()
+        assert_false(session.is_dirty)
+
+    def test_nested_change_is_dirty(self):
+        session = Session(data={'history': []})
+        session.save()
+        session.data['history'].append('/myprojects/')
+        assert_true(session.is_dirty)
+
+
+class LastLoginThrottleTestCase(DbTestCase):
+
+    def setUp(self, *args, **kwargs):
+        super(LastLoginThrottleTestCase, self).setUp(*args, **kwargs)
+        utils.last_login_cache.clear()
+
+    def test_should_update_last_login_once_per_interval(self):
+        assert_true(utils.should_update_last_login('abc12'))
+        assert_false(utils.should_update_last_login('abc12'))
+        assert_true(utils.should_update_last_login('def34'))
+
+    def test_should_update_last_login_after_interval(self):
+        utils.should_update_last_login('abc12')
+        utils.last_login_cache.delete('abc12')
+        assert_true(utils.should_update_last_login('abc12'))
+
+
+class SessionTouchTestCase(DbTestCase):
+
+    def setUp(self, *args, **kwargs):
+        super(SessionTouchTestCase, self).setUp(*args, **kwargs)
+        utils.session_touch_cache.clear()
+        self.session = factories.SessionFactory()
+        self.session.save()
+        self.collection = Session._storage[0].store
+        self.collection.update(
+            {'_id': self.session._id},
+            {'$set': {'date_modified': datetime.datetime(2015, 1, 1)}},
+        )
+
+    def tearDown(self, *args, **kwargs):
+        super(SessionTouchTestCase, self).tearDown(*args, **kwargs)
+        Session.remove()
+
+    def test_touch_session_refreshes_date_modified(self):
+        assert_true(utils.touch_session(self.session._id))
+        stored = self.collection.find_one({'_id': self.session._id})
+        assert_greater(stored['date_modified'], datetime.datetime(2015, 1, 1))
+
+    def test_touch_session_once_per_interval(self):
+        utils.touch_session(self.session._id)
+        self.collection.update(
+            {'_id': self.session._id},
+            {'$set': {'date_modified': datetime.datetime(2015, 1, 1)}},
+        )
+        assert_false(utils.touch_session(self.session._id))
+        stored = self.collection.find_one({'_id': self.session._id})
+        assert_equal(stored['date_modified'], datetime.datetime(2015, 1, 1))
+
+
+class SessionCacheTestCase(DbTestCase):
+
+    def setUp(self, *args, **kwargs):
+        super(SessionCacheTestCase, self).setUp(*args, **kwargs)
+        self.session = factories.SessionFactory()
+        self.session.save()
+        self.cookie = '{0}.signature'.format(self.session._id)
+        utils.session_cache.clear()
+        self.ttl = utils.session_cache.ttl
+        utils.session_cache.ttl = 60
+
+    def tearDown(self, *args, **kwargs):
+        super(SessionCacheTestCase, self).tearDown(*args, **kwargs)
+        utils.session_cache.ttl = self.ttl
+        utils.session_cache.clear()
+        Session.remove()
+
+    def test_load_session_caches_document(self):
+        utils.load_session(self.cookie, self.session._id)
+        assert_equal(utils.session_cache.get(self.cookie)['_id'], self.session._id)
+
+    def test_forget_session(self):
+        utils.load_session(self.cookie, self.session._id)
+        utils.forget_session(self.session._id)
+        assert_is_none(utils.session_cache.get(self.cookie))
+
+    def test_load_missing_session(self):
+        assert_is_none(utils.load_session('missing.signature', 'missing'))
+        assert_equal(len(utils.session_cache), 0)
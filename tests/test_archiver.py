@@ -4,6 +4,7 @@ import functools
 import json
 import logging
 import itertools
+import unittest
 
 import celery
 import mock  # noqa
@@ -16,6 +17,7 @@ from modularodm import Q
 from scripts import cleanup_failed_registrations as scripts
 
 from framework.auth import Auth
+from framework.exceptions import HTTPError
 from framework.tasks import handlers
 
 from website.archiver import (
@@ -38,10 +40,12 @@ from website import settings
 from website.util import waterbutler_url_for
 from website.project.model import Node, NodeLog
 from website.addons.base import StorageAddonBase
+from website.addons.base import crawler
 from website.util import api_url_for
 
 from tests import factories
 from tests.base import OsfTestCase
+from tests.fake_waterbutler import FakeWaterButler
 
 
 SILENT_LOGGERS = (
@@ -196,6 +200,73 @@ class TestStorageAddonBase(ArchiverTestCase):
         for addon in [a for a in settings.ADDONS_ARCHIVABLE if a not in ['wiki']]:
             self._test_addon(addon)
 
+class TestFileTreeCrawler(unittest.TestCase):
+
+    ROOT = {'path': '/', 'name': '', 'kind': 'folder'}
+
+    def setUp(self):
+        self.waterbutler = FakeWaterButler(depth=3, fanout=4, files=2).start()
+        self.parse = StorageAddonBase()._parse_child_metadata
+        self.bucket = crawler.TokenBucket(rate=1000)
+
+    def tearDown(self):
+        self.waterbutler.stop()
+
+    def make_crawler(self, **kwargs):
+        kwargs.setdefault('bucket', self.bucket)
+        return crawler.FileTreeCrawler('dropbox', self.waterbutler.url, self.parse, **kwargs)
+
+    def count_folders(self, tree):
+        return sum(
+            1 + self.count_folders(child)
+            for child in tree.get('children', [])
+            if child['kind'] == 'folder'
+        )
+
+    def test_crawl(self):
+        tree = self.make_crawler(workers=8).crawl(dict(self.ROOT))
+        assert_equal(self.count_folders(tree), self.waterbutler.folder_count)
+        # Each folder is listed exactly once; files never are
+        assert_equal(len(self.waterbutler.requests), self.waterbutler.folder_count + 1)
+        assert_equal(len(set(self.waterbutler.requests)), len(self.waterbutler.requests))
+
+    def test_crawl_file(self):
+        filenode = {'path': '/file', 'name': 'file', 'kind': 'file'}
+        assert_equal(self.make_crawler().crawl(filenode), filenode)
+        assert_equal(self.waterbutler.requests, [])
+
+    def test_retries_throttled_requests(self):
+        self.waterbutler.throttle = 2
+        sleep = mock.Mock()
+        tree = self.make_crawler(workers=1, sleep=sleep).crawl(dict(self.ROOT))
+        assert_equal(self.count_folders(tree), self.waterbutler.folder_count)
+        assert_equal(sleep.call_args_list, [call(0.5), call(1.0)])
+
+    def test_gives_up_after_retries(self):
+        self.waterbutler.throttle = 10
+        with assert_raises(HTTPError) as error:
+            self.make_crawler(retries=1, sleep=mock.Mock()).crawl(dict(self.ROOT))
+        assert_equal(error.exception.code, 429)
+
+    def test_error_stops_crawl(self):
+        self.waterbutler.depth = 0
+        with assert_raises(HTTPError):
+            self.make_crawler().crawl({'path': '/missing/', 'name': 'missing', 'kind': 'folder'})
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_acquire_waits_for_tokens(self):
+        now = [0.0]
+        sleep = mock.Mock(side_effect=lambda seconds: now.__setitem__(0, now[0] + seconds))
+        bucket = crawler.TokenBucket(rate=2, timer=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            bucket.acquire()
+        # Burst of two, then one token every half second
+        assert_equal(now[0], 1.0)
+        assert_equal(sleep.call_count, 2)
+
+
 class TestArchiverTasks(ArchiverTestCase):
 
     @use_fake_addons
@@ -403,6 +403,64 @@ class TestBasicAuth(OsfTestCase):
         ret = self.app.get(url, auth=('test', 'test'), expect_errors=True)
         assert_equal(ret.status_code, 403)
 
+    def test_basic_auth_does_not_store_a_session(self):
+        user = AuthUserFactory()
+        url = web_url_for('dashboard')
+        count = Session.find().count()
+        ret = self.app.get(url, auth=user.auth)
+        assert_equal(ret.status_code, 200)
+        assert_equal(Session.find().count(), count)
+
+    @mock.patch('framework.auth.core.check_password_hash', wraps=auth.core.check_password_hash)
+    def test_basic_auth_checks_password_hash_once(self, mock_check):
+        user = AuthUserFactory()
+        url = web_url_for('dashboard')
+        for _ in range(2):
+            ret = self.app.get(url, auth=user.auth)
+            assert_equal(ret.status_code, 200)
+        assert_equal(mock_check.call_count, 1)
+
+
+class TestPasswordCache(OsfTestCase):
+
+    def setUp(self):
+        super(TestPasswordCache, self).setUp()
+        self.user = UserFactory()
+        self.user.set_password('password')
+        self.user.save()
+        auth.core.verified_passwords.clear()
+
+    @mock.patch('framework.auth.core.check_password_hash', wraps=auth.core.check_password_hash)
+    def test_correct_password_is_remembered(self, mock_check):
+        assert_true(self.user.check_password('password', cache=True))
+        assert_true(self.user.check_password('password', cache=True))
+        assert_equal(mock_check.call_count, 1)
+
+    @mock.patch('framework.auth.core.check_password_hash', wraps=auth.core.check_password_hash)
+    def test_wrong_password_is_not_remembered(self, mock_check):
+        assert_false(self.user.check_password('wrong', cache=True))
+        assert_false(self.user.check_password('wrong', cache=True))
+        assert_equal(mock_check.call_count, 2)
+
+    def test_changed_password_is_checked_again(self):
+        assert_true(self.user.check_password('password', cache=True))
+        self.user.set_password('changed')
+        self.user.save()
+        assert_false(self.user.check_password('password', cache=True))
+        assert_true(self.user.check_password('changed', cache=True))
+
+    def test_cache_holds_no_plaintext(self):
+        self.user.check_password('password', cache=True)
+        (key, ) = auth.core.verified_passwords._data.keys()
+        assert_not_in('password', key)
+        assert_not_in(self.user.password, key)
+
+    @mock.patch('framework.auth.core.check_password_hash', wraps=auth.core.check_password_hash)
+    def test_uncached_check_always_hashes(self, mock_check):
+        self.user.check_password('password', cache=True)
+        assert_true(self.user.check_password('password'))
+        assert_equal(mock_check.call_count, 2)
+
 
 if __name__ == '__main__':
     unittest.main()
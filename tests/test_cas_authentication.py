@@ -6,8 +6,10 @@ import httpretty
 import furl
 
 from framework.auth import cas
+from framework.auth.token_cache import token_cache, TokenCache, MemoryBackend, MongoBackend, RevocationEpoch
 
 from tests.base import OsfTestCase, fake
+from tests.fake_cas import FakeCAS
 from tests.factories import UserFactory
 
 def make_successful_response(user):
@@ -191,3 +193,109 @@ class TestCASTicketAuthentication(OsfTestCase):
         ticket = fake.md5()
         service_url = 'http://accounts.osf.io/?ticket=' + ticket
         resp = cas.make_response_from_ticket(ticket, service_url)
+
+
+class TestTokenCache(OsfTestCase):
+
+    def setUp(self):
+        OsfTestCase.setUp(self)
+        self.user = UserFactory()
+        self.fake_cas = FakeCAS(
+            tokens={'good': self.user._id},
+            scopes={'good': ['osf.full_read']},
+        ).start()
+        self.patcher = mock.patch('framework.auth.cas.settings.CAS_SERVER_URL', self.fake_cas.url)
+        self.patcher.start()
+        token_cache.clear()
+
+    def tearDown(self):
+        OsfTestCase.tearDown(self)
+        self.patcher.stop()
+        self.fake_cas.stop()
+        token_cache.clear()
+
+    def test_profile_is_reused(self):
+        first = cas.get_profile('good')
+        second = cas.get_profile('good')
+
+        assert_equal(self.fake_cas.requests, ['good'])
+        for resp in (first, second):
+            assert_true(resp.authenticated)
+            assert_equal(resp.user, self.user._id)
+            assert_equal(resp.attributes['accessToken'], 'good')
+            assert_equal(resp.attributes['accessTokenScope'], {'osf.full_read'})
+
+    def test_rejected_token_is_remembered(self):
+        for _ in range(2):
+            with assert_raises(cas.CasHTTPError) as error:
+                cas.get_profile('bad')
+            assert_equal(error.exception.code, 401)
+
+        assert_equal(self.fake_cas.requests, ['bad'])
+
+    @mock.patch('framework.auth.cas.CasClient.profile')
+    def test_unavailable_cas_is_not_remembered(self, mock_profile):
+        mock_profile.side_effect = cas.CasHTTPError(503, 'Unavailable', {}, '')
+        for _ in range(2):
+            with assert_raises(cas.CasHTTPError):
+                cas.get_profile('good')
+
+        assert_equal(mock_profile.call_count, 2)
+
+    @mock.patch('framework.auth.cas.requests.post')
+    def test_revoking_application_tokens_clears_cache(self, mock_post):
+        mock_post.return_value = mock.Mock(status_code=204)
+        cas.get_profile('good')
+        cas.get_client().revoke_application_tokens('fake_id', 'fake_secret')
+        cas.get_profile('good')
+
+        assert_equal(self.fake_cas.requests, ['good', 'good'])
+
+    def test_counts_hits_and_misses(self):
+        cache = TokenCache(backend=MemoryBackend(), ttl=60)
+        cache.get('good')
+        cache.set('good', {'authenticated': True})
+        cache.get('good')
+
+        stats = cache.stats()
+        assert_equal((stats['hits'], stats['misses']), (1, 1))
+
+    def test_rejections_expire_sooner(self):
+        now = [0]
+        cache = TokenCache(backend=MemoryBackend(timer=lambda: now[0]), ttl=60, negative_ttl=10)
+        cache.set('good', {'authenticated': True})
+        cache.set('bad', {'authenticated': False, 'code': 401})
+        now[0] = 11
+
+        assert_is(cache.get('bad'), None)
+        assert_true(cache.get('good')['authenticated'])
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = TokenCache(backend=MemoryBackend(), ttl=0)
+        cache.set('good', {'authenticated': True})
+
+        assert_is(cache.get('good'), None)
+
+    def test_mongo_backend(self):
+        cache = TokenCache(backend=MongoBackend(), ttl=60)
+        cache.set('good', {'authenticated': True, 'user': self.user._id})
+
+        assert_equal(cache.get('good')['user'], self.user._id)
+        assert_equal(cache.stats(), {'size': 1, 'hits': 1, 'misses': 0})
+        cache.delete('good')
+        assert_is(cache.get('good'), None)
+
+    def test_revoke_reaches_other_processes(self):
+        now = [0]
+        revoking = TokenCache(backend=MemoryBackend(), ttl=60)
+        other = TokenCache(
+            backend=MemoryBackend(), ttl=60,
+            revocations=RevocationEpoch(check_interval=5, timer=lambda: now[0]),
+        )
+        other.set('good', {'authenticated': True})
+        revoking.revoke()
+
+        # Until it rereads the epoch, the other process keeps its entry
+        assert_true(other.get('good')['authenticated'])
+        now[0] = 5
+        assert_is(other.get('good'), None)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import mock
+import requests
+from nose.tools import *  # noqa
+
+from tests.base import OsfTestCase
+from tests.factories import ProjectFactory, RegistrationFactory
+
+from website import settings
+from website.discovery import tasks, views
+
+
+def piwik_value(node_id, actions=10, visits=5):
+    return mock.Mock(value=node_id, actions=actions, visits=visits)
+
+
+class TestActivitySnapshot(OsfTestCase):
+
+    def setUp(self):
+        super(TestActivitySnapshot, self).setUp()
+        self.project = ProjectFactory(is_public=True)
+        self.private_project = ProjectFactory(is_public=False)
+        self.registration = RegistrationFactory(project=self.project)
+        self.registration.is_public = True
+        self.registration.save()
+        self.collection = tasks.database[tasks.SNAPSHOT_COLLECTION]
+        self.collection.remove()
+
+    def _mock_piwik(self, mock_client, values):
+        mock_client.return_value.custom_variables = [
+            mock.Mock(label='Project ID', values=values),
+        ]
+
+    def test_compute_activity_recent(self):
+        activity = tasks.compute_activity()
+        recent_ids = [node['_id'] for node in activity['recent_public_projects']]
+        assert_in(self.project._id, recent_ids)
+        assert_not_in(self.private_project._id, recent_ids)
+        assert_equal(
+            [node['_id'] for node in activity['recent_public_registrations']],
+            [self.registration._id],
+        )
+        assert_equal(activity['popular_public_projects'], [])
+
+    @mock.patch('website.discovery.tasks.PiwikClient')
+    def test_compute_activity_popular(self, mock_client):
+        self._mock_piwik(mock_client, [
+            piwik_value(self.private_project._id),
+            piwik_value(self.registration._id, actions=20),
+            piwik_value('notanode'),
+            piwik_value(self.project._id, actions=7, visits=3),
+        ])
+        with mock.patch.object(settings, 'PIWIK_HOST', 'http://piwik.test'):
+            activity = tasks.compute_activity()
+        assert_equal(
+            [node['_id'] for node in activity['popular_public_projects']],
+            [self.project._id],
+        )
+        assert_equal(
+            [node['_id'] for node in activity['popular_public_registrations']],
+            [self.registration._id],
+        )
+        assert_equal(activity['hits'][self.project._id], {'hits': 7, 'visits': 3})
+        assert_not_in(self.private_project._id, activity['hits'])
+
+    @mock.patch('website.discovery.tasks.PiwikClient')
+    def test_refresh_keeps_popular_when_piwik_down(self, mock_client):
+        self._mock_piwik(mock_client, [piwik_value(self.project._id)])
+        with mock.patch.object(settings, 'PIWIK_HOST', 'http://piwik.test'):
+            tasks.refresh_activity_snapshot()
+            mock_client.side_effect = requests.ConnectionError
+            snapshot = tasks.refresh_activity_snapshot()
+        assert_equal(
+            [node['_id'] for node in snapshot['popular_public_projects']],
+            [self.project._id],
+        )
+        assert_equal(self.collection.count(), 1)
+        assert_equal(
+            tasks.get_activity_snapshot()['popular_public_projects'],
+            snapshot['popular_public_projects'],
+        )
+
+    @mock.patch('website.discovery.tasks.PiwikClient')
+    def test_refresh_rechecks_kept_popular(self, mock_client):
+        self._mock_piwik(mock_client, [
+            piwik_value(self.project._id),
+            piwik_value(self.registration._id),
+        ])
+        with mock.patch.object(settings, 'PIWIK_HOST', 'http://piwik.test'):
+            tasks.refresh_activity_snapshot()
+            self.project.is_public = False
+            self.project.save()
+            mock_client.side_effect = requests.ConnectionError
+            snapshot = tasks.refresh_activity_snapshot()
+        assert_equal(snapshot['popular_public_projects'], [])
+        assert_not_in(self.project._id, snapshot['hits'])
+        assert_equal(
+            [node['_id'] for node in snapshot['popular_public_registrations']],
+            [self.registration._id],
+        )
+        assert_in(self.registration._id, snapshot['hits'])
+
+    def test_view_reads_snapshot(self):
+        compute = mock.patch(
+            'website.discovery.tasks.compute_activity',
+            return_value=tasks.compute_activity(),
+        )
+        with compute as mock_compute, mock.patch.object(settings, 'USE_CELERY', True):
+            with mock.patch.object(settings, 'DISCOVERY_SNAPSHOT_ASYNC', True):
+                first = views.activity()
+                second = views.activity()
+        assert_equal(mock_compute.call_count, 1)
+        for key in ('recent_public_projects', 'recent_public_registrations'):
+            assert_equal(
+                [node['_id'] for node in first[key]],
+                [node['_id'] for node in second[key]],
+            )
+
+    def test_activity_page(self):
+        res = self.app.get('/explore/activity/')
+        assert_equal(res.status_code, 200)
+        assert_in(self.project.title, res)
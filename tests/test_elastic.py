@@ -12,6 +12,8 @@ from website import settings
 import website.search.search as search
 from website.search import elastic_search
 from website.search.util import build_query
+from website.search import tasks as search_tasks
+from website.search.exceptions import SearchUnavailableError
 from website.search_migration.migrate import migrate
 from website.models import Retraction
 
@@ -717,6 +719,143 @@ class TestSearchExceptions(OsfTestCase):
         self.project.save()
 
 
+class TestSearchRoundTrips(unittest.TestCase):
+
+    def setUp(self):
+        self.msearch_response = {
+            'responses': [
+                {'aggregations': {
+                    'counts': {'buckets': [
+                        {'key': 'project', 'doc_count': 2},
+                        {'key': 'user', 'doc_count': 1},
+                    ]},
+                    'tag_cloud': {'buckets': [{'key': 'science', 'doc_count': 2}]},
+                }},
+                {'hits': {'hits': [{'_source': {'category': 'user', 'id': 'abcde'}}]}},
+            ]
+        }
+        self.es_patcher = mock.patch.object(elastic_search, 'es')
+        self.mock_es = self.es_patcher.start()
+        self.mock_es.msearch.return_value = self.msearch_response
+
+    def tearDown(self):
+        self.es_patcher.stop()
+        elastic_search.clear_search_cache()
+
+    def test_search_makes_single_request(self):
+        query = build_query('science', start=0, size=10)
+        results = elastic_search.search(query, index='test')
+        assert_equal(self.mock_es.msearch.call_count, 1)
+        assert_false(self.mock_es.search.called)
+        assert_equal(results['counts'], {'project': 2, 'user': 1, 'total': 3})
+        assert_equal(results['tags'], [{'key': 'science', 'doc_count': 2}])
+        assert_equal(results['results'][0]['url'], '/profile/abcde')
+
+    def test_aggregation_query_strips_paging(self):
+        query = build_query('science', start=10, size=10)
+        agg_query = elastic_search.build_aggregation_query(query)
+        assert_not_in('from', agg_query)
+        assert_not_in('size', agg_query)
+        assert_in('tag_cloud', agg_query['aggregations'])
+        # The original query is left untouched
+        assert_equal(query['from'], 10)
+
+    def test_cached_results_reused(self):
+        with mock.patch.object(elastic_search._search_cache, 'ttl', 60):
+            query = build_query('science', start=0, size=10)
+            elastic_search.search(query, index='test')
+            elastic_search.search(build_query('science', start=0, size=10), index='test')
+        assert_equal(self.mock_es.msearch.call_count, 1)
+
+
+class TestFormatResults(unittest.TestCase):
+
+    def _result(self, **kwargs):
+        result = {
+            'category': 'component', 'contributors': [], 'title': 'Hi', 'url': '/abcde/',
+            'tags': [], 'is_registration': False, 'is_retracted': False,
+            'is_pending_retraction': False, 'embargo_end_date': False,
+            'is_pending_embargo': False, 'description': '', 'wikis': {},
+        }
+        result.update(kwargs)
+        return result
+
+    @mock.patch('website.search.elastic_search.Node')
+    def test_parents_loaded_in_one_query(self, mock_node):
+        parent = mock.Mock(_id='paren', title='Parent', url='/paren/', is_public=True, is_registration=False)
+        mock_node.find.return_value = [parent]
+        results = elastic_search.format_results([
+            self._result(parent_id='paren'),
+            self._result(parent_id='paren'),
+        ])
+        assert_equal(mock_node.find.call_count, 1)
+        assert_false(mock_node.load.called)
+        assert_equal([each['parent_title'] for each in results], ['Parent', 'Parent'])
+
+    @mock.patch('website.search.elastic_search.Node')
+    def test_denormalized_parent_info_used(self, mock_node):
+        parent_info = {'title': 'Parent', 'url': '/paren/', 'is_registration': False, 'id': 'paren'}
+        results = elastic_search.format_results([
+            self._result(parent_id='paren', parent_info=parent_info),
+        ])
+        assert_false(mock_node.find.called)
+        assert_false(mock_node.load.called)
+        assert_equal(results[0]['parent_url'], '/paren/')
+        assert_true(results[0]['is_component'])
+
+
+class TestSearchIndexQueue(OsfTestCase):
+
+    def setUp(self):
+        super(TestSearchIndexQueue, self).setUp()
+        self.project = ProjectFactory(is_public=True)
+        self.queue = search_tasks.database[search_tasks.QUEUE_COLLECTION]
+        self.queue.remove()
+
+    @mock.patch('website.search.search.update_node')
+    def test_update_search_enqueues_when_async(self, mock_update_node):
+        with mock.patch.object(settings, 'USE_CELERY', True):
+            with mock.patch.object(settings, 'SEARCH_INDEX_ASYNC', True):
+                self.project.update_search()
+                self.project.update_search()
+        assert_false(mock_update_node.called)
+        assert_equal(self.queue.find({'_id': self.project._id}).count(), 1)
+
+    @mock.patch('website.search.search.update_node')
+    def test_update_search_synchronous_without_celery(self, mock_update_node):
+        with mock.patch.object(settings, 'USE_CELERY', False):
+            self.project.update_search()
+        mock_update_node.assert_called_once_with(self.project)
+        assert_equal(self.queue.count(), 0)
+
+    @mock.patch('website.search.search.update_parent_info')
+    def test_update_children_search_enqueues_when_async(self, mock_update_parent_info):
+        child = NodeFactory(parent=self.project, is_public=True)
+        self.queue.remove()
+        with mock.patch.object(settings, 'USE_CELERY', True):
+            with mock.patch.object(settings, 'SEARCH_INDEX_ASYNC', True):
+                self.project.update_children_search()
+        assert_false(mock_update_parent_info.called)
+        assert_equal(self.queue.find({'_id': child._id}).count(), 1)
+
+    @mock.patch('website.search.search.bulk_index_nodes')
+    def test_flush_indexes_in_batches(self, mock_bulk_index):
+        other = ProjectFactory(is_public=True)
+        search_tasks.enqueue_node(self.project._id)
+        search_tasks.enqueue_node(other._id)
+        flushed = search_tasks.flush_queue(batch_size=1)
+        assert_equal(flushed, 2)
+        assert_equal(mock_bulk_index.call_count, 2)
+        assert_equal(self.queue.count(), 0)
+
+    @mock.patch('website.search.search.bulk_index_nodes')
+    def test_flush_keeps_queue_when_search_unavailable(self, mock_bulk_index):
+        mock_bulk_index.side_effect = SearchUnavailableError('down')
+        search_tasks.enqueue_node(self.project._id)
+        assert_equal(search_tasks.flush_queue(), 0)
+        assert_equal(self.queue.count(), 1)
+
+
 class TestSearchMigration(SearchTestCase):
     # Verify that the correct indices are created/deleted during migration
 
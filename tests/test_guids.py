@@ -11,7 +11,7 @@ from modularodm import fields
 from modularodm.storage.mongostorage import MongoStorage
 
 from framework.mongo import database
-from framework.guid.model import GuidStoredObject
+from framework.guid.model import GuidPool, GuidStoredObject
 
 from website import models
 
@@ -63,3 +63,85 @@ class TestResolveGuid(OsfTestCase):
             expect_errors=True,
         )
         assert_equal(res.status_code, 404)
+
+
+class TestGuidPool(OsfTestCase):
+
+    def setUp(self):
+        super(TestGuidPool, self).setUp()
+        self.pool = GuidPool(size=10)
+
+    def test_take_refills_in_blocks(self):
+        guid_ids = [self.pool.take() for _ in range(15)]
+        assert_equal(len(set(guid_ids)), 15)
+        assert_equal(self.pool.refills, 2)
+        assert_equal(self.pool.stats()['pooled'], 5)
+
+    def test_take_many_larger_than_pool(self):
+        assert_equal(len(set(self.pool.take_many(25))), 25)
+        assert_equal(self.pool.refills, 1)
+
+    @mock.patch('framework.guid.model.random_guid')
+    def test_skips_existing_and_blacklisted(self, mock_random_guid):
+        models.Guid(_id='taken').save()
+        models.BlacklistGuid(_id='nope1').save()
+        mock_random_guid.side_effect = ['taken', 'nope1', 'free1', 'free2']
+        pool = GuidPool(size=4)
+        assert_equal(sorted(pool.take_many(2)), ['free1', 'free2'])
+        assert_equal(pool.stats()['rejected'], 2)
+        assert_equal(pool.stats()['rejection_rate'], 0.5)
+
+    def test_generate_saves_once(self):
+        node = NodeFactory()
+        with mock.patch('framework.guid.model.guid_pool', self.pool):
+            with mock.patch.object(models.Guid, 'save', autospec=True, side_effect=models.Guid.save) as mock_save:
+                guid = models.Guid.generate(node)
+        assert_equal(mock_save.call_count, 1)
+        assert_equal(models.Guid.load(guid._id).referent, node)
+
+    def test_generate_retries_collisions(self):
+        models.Guid(_id='taken').save()
+        with mock.patch.object(self.pool, '_ids', ['taken', 'free1']):
+            with mock.patch('framework.guid.model.guid_pool', self.pool):
+                guid = models.Guid.generate()
+        assert_equal(guid._id, 'free1')
+        assert_equal(self.pool.collisions, 1)
+
+    def test_generate_many(self):
+        nodes = [NodeFactory() for _ in range(3)]
+        count = models.Guid.find().count()
+        guids = models.Guid.generate_many(nodes + [None])
+        assert_equal(models.Guid.find().count(), count + 4)
+        assert_equal([guid.referent for guid in guids], nodes + [None])
+        for guid in guids:
+            assert_equal(models.Guid.load(guid._id), guid)
+
+    def test_generate_many_with_collision(self):
+        node = NodeFactory()
+        models.Guid(_id='taken').save()
+        with mock.patch.object(self.pool, '_ids', ['free1', 'taken', 'free2']):
+            with mock.patch('framework.guid.model.guid_pool', self.pool):
+                guids = models.Guid.generate_many([node, node, node])
+        assert_equal(len(set(guid._id for guid in guids)), 3)
+        assert_not_in('taken', [guid._id for guid in guids])
+        assert_equal(self.pool.collisions, 1)
+        for guid in guids:
+            assert_equal(models.Guid.load(guid._id).referent, node)
+
+    def test_generate_many_collision_with_same_referent(self):
+        # Another process saved a new node under an id we were handed
+        models.Guid(_id='taken', referent=('taken', 'node')).save()
+        with mock.patch.object(self.pool, '_ids', ['free1', 'taken', 'free2']):
+            with mock.patch('framework.guid.model.guid_pool', self.pool):
+                guids = models.Guid.generate_many([(None, 'node')] * 3)
+        guid_ids = [guid._id for guid in guids]
+        assert_equal(guid_ids[0], 'free1')
+        assert_not_in('taken', guid_ids)
+        assert_equal(len(set(guid_ids)), 3)
+        assert_equal(self.pool.collisions, 1)
+
+    def test_generate_many_for_unsaved_objects(self):
+        guids = models.Guid.generate_many([(None, 'node')] * 2)
+        for guid in guids:
+            stored = models.Guid._storage[0].store.find_one({'_id': guid._id})
+            assert_equal(stored['referent'], [guid._id, 'node'])
@@ -35,6 +35,7 @@ from website.project.model import (
     Comment, Node, NodeLog, Pointer, ensure_schemas, has_anonymous_link,
     get_pointer_parent, Embargo,
 )
+from website.project import forking
 from website.util.permissions import CREATOR_PERMISSIONS, ADMIN, READ, WRITE, DEFAULT_CONTRIBUTOR_PERMISSIONS
 from website.util import web_url_for, api_url_for
 from website.addons.wiki.exceptions import (
@@ -2052,6 +2053,87 @@ class TestNodeTraversals(OsfTestCase):
         descendants = list(point1.get_descendants_recursive())
         assert_equal(len(descendants), 1)
 
+
+class TestNodeAncestry(OsfTestCase):
+
+    def setUp(self):
+        super(TestNodeAncestry, self).setUp()
+        self.user = UserFactory()
+        self.auth = Auth(user=self.user)
+        self.project = ProjectFactory(creator=self.user)
+        self.component = NodeFactory(creator=self.user, parent=self.project)
+        self.subcomponent = NodeFactory(creator=self.user, parent=self.component)
+        self.sibling = NodeFactory(creator=self.user, parent=self.project)
+
+    def assert_ancestry_consistent(self, root):
+        """Check the materialized paths of a tree against the recursive walkers."""
+        Node._clear_caches()
+        root = Node.load(root._id)
+        assert_equal(root.ancestor_ids, [])
+        assert_equal(root.root_id, root._id)
+        walked = {node._id for node in root.get_descendants_recursive(lambda n: n.primary)}
+        stored = {node._id for node in root.get_primary_descendants()}
+        assert_equal(walked, stored)
+        for node in root.node_and_primary_descendants():
+            assert_equal(node.root_id, root._id)
+            assert_equal(node.ancestor_ids, [parent._id for parent in reversed(node.parents)])
+
+    def test_component_creation(self):
+        assert_equal(self.component.ancestor_ids, [self.project._id])
+        assert_equal(
+            self.subcomponent.ancestor_ids,
+            [self.project._id, self.component._id]
+        )
+        self.assert_ancestry_consistent(self.project)
+
+    def test_fork(self):
+        fork = self.project.fork_node(self.auth)
+        self.assert_ancestry_consistent(fork)
+        self.assert_ancestry_consistent(self.project)
+
+    def test_registration(self):
+        registration = RegistrationFactory(project=self.project)
+        self.assert_ancestry_consistent(registration)
+        self.assert_ancestry_consistent(self.project)
+
+    def test_pointers_are_not_descendants(self):
+        pointee = ProjectFactory(creator=self.user)
+        self.component.add_pointer(pointee, auth=self.auth)
+        assert_equal(pointee.ancestor_ids, [])
+        assert_not_in(pointee._id, [node._id for node in self.project.get_primary_descendants()])
+        self.assert_ancestry_consistent(self.project)
+
+    def test_moved_subtree_is_updated(self):
+        other = ProjectFactory(creator=self.user)
+        self.project.nodes.remove(self.component)
+        self.project.save()
+        other.nodes.append(self.component)
+        other.save()
+        assert_equal(self.subcomponent.ancestor_ids, [other._id, self.component._id])
+        assert_equal(self.subcomponent.root_id, other._id)
+        self.assert_ancestry_consistent(other)
+
+    def test_parents_stop_at_deleted_ancestor(self):
+        self.component.is_deleted = True
+        self.component.save()
+        assert_equal(self.subcomponent.parents, [])
+        assert_equal(self.sibling.parents, [self.project])
+
+    def test_unmigrated_node_falls_back_to_walking(self):
+        self.subcomponent.root_id = None
+        self.subcomponent.ancestor_ids = []
+        self.subcomponent.save()
+        assert_equal(self.subcomponent.parents, [self.component, self.project])
+
+    def test_child_of_unmigrated_node_is_unmigrated(self):
+        self.component.root_id = None
+        self.component.ancestor_ids = []
+        self.component.save()
+        child = NodeFactory(creator=self.user, parent=self.component)
+        assert_is_none(child.root_id)
+        assert_equal(child.ancestor_ids, [])
+        assert_equal(child.parents, [self.component, self.project])
+
 class TestRemoveNode(OsfTestCase):
 
     def setUp(self):
@@ -2946,10 +3028,31 @@ class TestProject(OsfTestCase):
         )
 
     def test_date_modified(self):
-        self.project.logs.append(NodeLogFactory())
+        self.project.add_log(
+            NodeLog.EDITED_TITLE,
+            params={'node': self.project._id},
+            auth=self.auth,
+            log_date=self.project.date_created + datetime.timedelta(days=1),
+        )
         assert_equal(self.project.date_modified, self.project.logs[-1].date)
         assert_not_equal(self.project.date_modified, self.project.date_created)
 
+    def test_date_modified_is_stored(self):
+        self.project.add_log(
+            NodeLog.EDITED_TITLE,
+            params={'node': self.project._id},
+            auth=self.auth,
+        )
+        latest = Node.find(Q('_id', 'eq', self.project._id)).sort('-date_modified')[0]
+        assert_equal(latest.date_modified, self.project.logs[-1].date)
+        assert_equal(
+            Node.find(Q('date_modified', 'eq', self.project.logs[-1].date)).count(), 1
+        )
+
+    def test_date_modified_set_on_first_save(self):
+        node = NodeFactory()
+        assert_is_not_none(node.date_modified)
+
     def test_replace_contributor(self):
         contrib = UserFactory()
         self.project.add_contributor(contrib, auth=Auth(self.project.creator))
@@ -3372,6 +3475,83 @@ class TestForkNode(OsfTestCase):
             self.registration,
         )
 
+    def test_fork_shares_log_backrefs(self):
+        component = NodeFactory(creator=self.user, parent=self.project)
+        fork = self.project.fork_node(self.auth)
+        forked_component = fork.nodes[0]
+        for log in self.project.logs:
+            assert_in(fork._id, log.node__logged)
+        assert_equal(
+            component.logs._to_primary_keys(),
+            forked_component.logs._to_primary_keys()[:-1]
+        )
+        query = Q('__backrefs.logged.node.logs', 'eq', forked_component._id)
+        assert_equal(NodeLog.find(query).count(), len(forked_component.logs))
+
+    def test_fork_ancestry(self):
+        component = NodeFactory(creator=self.user, parent=self.project)
+        NodeFactory(creator=self.user, parent=component)
+        fork = self.project.fork_node(self.auth)
+        forked_component = fork.nodes[0]
+        forked_subcomponent = forked_component.nodes[0]
+        assert_equal(forked_component.ancestor_ids, [fork._id])
+        assert_equal(forked_subcomponent.ancestor_ids, [fork._id, forked_component._id])
+        assert_equal(forked_subcomponent.root_id, fork._id)
+
+    def test_fork_reserves_guids_at_once(self):
+        component = NodeFactory(creator=self.user, parent=self.project)
+        with mock.patch.object(Guid, 'generate_many', wraps=Guid.generate_many) as mock_generate_many:
+            fork = self.project.fork_node(self.auth)
+        mock_generate_many.assert_called_once_with([(None, 'node')] * 2)
+        forked_component = fork.nodes[0]
+        assert_equal(Guid.load(fork._id).referent, fork)
+        assert_equal(Guid.load(forked_component._id).referent, forked_component)
+
+    def test_fork_resets_fork_status(self):
+        self.project.fork_status = {'state': forking.PENDING, 'done': 0, 'total': 1, 'messages': []}
+        self.project.save()
+        fork = self.project.fork_node(self.auth)
+        assert_equal(fork.fork_status, {})
+
+    def test_fork_refreshes_cached_log_backrefs(self):
+        log = NodeLog.load(self.project.logs[-1]._id)
+        fork = self.project.fork_node(self.auth)
+        log = NodeLog.load(log._id)
+        assert_in(fork._id, log._backrefs['logged']['node']['logs'])
+
+    def test_plan_fork_skips_deleted_and_unforkable(self):
+        self.project.set_privacy('public')
+        public = NodeFactory(creator=self.user, parent=self.project, is_public=True)
+        private = NodeFactory(creator=self.user, parent=self.project)
+        NodeFactory(creator=self.user, parent=private, is_public=True)
+        deleted = NodeFactory(creator=self.user, parent=self.project, is_public=True)
+        deleted.is_deleted = True
+        deleted.save()
+        pointee = ProjectFactory(is_public=True)
+        pointer = self.project.add_pointer(pointee, auth=self.auth)
+        plan = forking.plan_fork(self.project, UserFactory())
+        assert_equal(
+            [(node._id, parent._id) for node, parent in plan],
+            [(public._id, self.project._id), (pointer._id, self.project._id)]
+        )
+
+    @mock.patch('website.project.forking.enqueue_task')
+    @mock.patch('website.project.forking.use_async_addons')
+    def test_fork_copies_addons_in_background(self, mock_use_async, mock_enqueue):
+        mock_use_async.return_value = True
+        self.project.add_addon('github', self.auth)
+        fork = self.project.fork_node(self.auth)
+        assert_equal(fork.fork_status['state'], forking.PENDING)
+        assert_equal(fork.fork_status['total'], 1)
+        assert_true(mock_enqueue.called)
+        assert_not_in('github', fork.get_addon_names())
+
+        forking.copy_addons(fork._id, self.user._id)
+        fork.reload()
+        assert_equal(fork.fork_status['state'], forking.COMPLETE)
+        assert_equal(fork.fork_status['done'], 1)
+        assert_in('github', fork.get_addon_names())
+
 
 class TestRegisterNode(OsfTestCase):
 
@@ -13,7 +13,9 @@ from framework.auth import Auth
 from framework.auth.core import User
 from framework.auth.signals import contributor_removed
 from framework.auth.signals import node_deleted
+from framework.mongo import database
 from website.notifications.tasks import get_users_emails, send_users_email, group_by_node, remove_notifications
+from website.notifications.tasks import iter_users_emails, CHECKPOINT_COLLECTION
 from website.notifications import constants
 from website.notifications.model import NotificationDigest
 from website.notifications.model import NotificationSubscription
@@ -1066,6 +1068,50 @@ class TestSendEmails(OsfTestCase):
         mock_store.assert_called_with([self.project.creator._id], 'email_transactional', 'comments', user,
                                       self.node, time_now, target_user=user)
 
+    @mock.patch('website.mails.render_message')
+    def test_store_emails_renders_once_per_timezone_and_locale(self, mock_render):
+        mock_render.side_effect = lambda tpl, **context: context['localized_timestamp']
+        users = [factories.UserFactory() for _ in range(3)]
+        users[2].timezone = 'Europe/Moscow'
+        users[2].save()
+        time_now = datetime.datetime.utcnow()
+        emails.store_emails([each._id for each in users], 'email_digest', 'comments', self.user, self.node,
+                            time_now, content='hi')
+        assert_equal(mock_render.call_count, 2)
+        digests = list(NotificationDigest.find(Q('event', 'eq', 'comments')))
+        assert_equal(sorted(digest.user_id for digest in digests), sorted(each._id for each in users))
+        messages = {digest.user_id: digest.message for digest in digests}
+        assert_equal(messages[users[0]._id], emails.localize_timestamp(time_now, users[0]))
+        assert_equal(messages[users[2]._id], emails.localize_timestamp(time_now, users[2]))
+        for digest in digests:
+            assert_equal(digest.send_type, 'email_digest')
+            assert_equal(digest.node_lineage, [self.project._id, self.node._id])
+
+    @mock.patch('website.mails.render_message')
+    def test_store_emails_skips_sender(self, mock_render):
+        emails.store_emails([self.user._id], 'email_transactional', 'comments', self.user, self.node,
+                            datetime.datetime.utcnow())
+        assert_false(mock_render.called)
+        assert_equal(NotificationDigest.find().count(), 0)
+
+    @mock.patch('website.notifications.emails.enqueue_task')
+    @mock.patch('website.notifications.emails.settings.USE_CELERY', True)
+    def test_store_emails_async(self, mock_enqueue):
+        target = factories.UserFactory()
+        time_now = datetime.datetime.utcnow()
+        emails.store_emails([target._id], 'email_transactional', 'comments', self.user, self.node,
+                            time_now, target_user=target, content='hi', gravatar_url='', url='')
+        assert_equal(NotificationDigest.find().count(), 0)
+        signature = mock_enqueue.call_args[0][0]
+        assert_equal(
+            signature.args,
+            ([target._id], 'email_transactional', 'comments', self.user._id, self.node._id, time_now,
+             {'target_user': target._id, 'content': 'hi', 'gravatar_url': '', 'url': ''}, ['target_user'])
+        )
+        emails.fan_out(*signature.args)
+        digest = NotificationDigest.find_one(Q('user_id', 'eq', target._id))
+        assert_in('hi', digest.message)
+
     def test_check_node_node_none(self):
         subs = emails.check_node(None, 'comments')
         assert_equal(subs, {'email_transactional': [], 'email_digest': [], 'none': []})
@@ -1223,6 +1269,8 @@ class TestSendDigest(OsfTestCase):
             }
         ]
 
+        expected.sort(key=lambda group: group['user_id'])
+
         assert_equal(len(user_groups), 2)
         assert_equal(user_groups, expected)
         digest_ids = [d._id, d2._id, d3._id]
@@ -1274,6 +1322,8 @@ class TestSendDigest(OsfTestCase):
             }
         ]
 
+        expected.sort(key=lambda group: group['user_id'])
+
         assert_equal(len(user_groups), 2)
         assert_equal(user_groups, expected)
         digest_ids = [d._id, d2._id, d3._id]
@@ -1307,7 +1357,94 @@ class TestSendDigest(OsfTestCase):
         assert_equal(kwargs['name'], user.fullname)
         message = group_by_node(user_groups[last_user_index]['info'])
         assert_equal(kwargs['message'], message)
-        assert_equal(kwargs['callback'], remove_notifications(email_notification_ids=email_notification_ids))
+        assert_equal(NotificationDigest.find(Q('_id', 'in', email_notification_ids)).count(), 0)
+
+    def make_digests(self, send_type, count):
+        users = sorted((factories.UserFactory() for _ in range(count)), key=lambda user: user._id)
+        for user in users:
+            factories.NotificationDigestFactory(
+                user_id=user._id,
+                send_type=send_type,
+                timestamp=self.timestamp,
+                message='Hello',
+                node_lineage=[self.project._id]
+            ).save()
+        return users
+
+    def test_iter_users_emails_groups_messages_by_user(self):
+        user = factories.UserFactory()
+        for message in ('First', 'Second'):
+            factories.NotificationDigestFactory(
+                user_id=user._id,
+                send_type='email_digest',
+                timestamp=self.timestamp,
+                message=message,
+                node_lineage=[self.project._id]
+            ).save()
+        user_groups = list(iter_users_emails('email_digest'))
+        assert_equal(len(user_groups), 1)
+        assert_equal([info['message'] for info in user_groups[0]['info']], ['First', 'Second'])
+
+    def test_iter_users_emails_pages_by_user(self):
+        users = self.make_digests('email_digest', 3)
+        factories.NotificationDigestFactory(
+            user_id=users[1]._id,
+            send_type='email_digest',
+            timestamp=self.timestamp,
+            message='Again',
+            node_lineage=[self.project._id]
+        ).save()
+        user_groups = list(iter_users_emails('email_digest', page_size=1))
+        assert_equal(
+            [group['user_id'] for group in user_groups],
+            sorted(user._id for user in users)
+        )
+        counts = dict((group['user_id'], len(group['info'])) for group in user_groups)
+        assert_equal(counts[users[1]._id], 2)
+
+    @mock.patch('website.mails.send_mail')
+    @mock.patch('website.notifications.tasks.settings.NOTIFICATIONS_DELETE_BATCH_SIZE', 2)
+    def test_send_users_email_removes_sent_digests(self, mock_send_mail):
+        self.make_digests('email_digest', 3)
+        send_users_email('email_digest')
+        assert_equal(mock_send_mail.call_count, 3)
+        assert_equal(NotificationDigest.find().count(), 0)
+        assert_is_none(database[CHECKPOINT_COLLECTION].find_one({'_id': 'email_digest'}))
+
+    @mock.patch('website.mails.send_mail')
+    def test_send_users_email_resumes_after_checkpoint(self, mock_send_mail):
+        users = self.make_digests('email_digest', 3)
+        # Another run was interrupted after emailing the first user
+        mock_send_mail.side_effect = [None, Exception('SMTP down')]
+        with assert_raises(Exception):
+            send_users_email('email_digest')
+        mock_send_mail.reset_mock()
+        mock_send_mail.side_effect = None
+
+        send_users_email('email_digest')
+        emailed = [kwargs['to_addr'] for args, kwargs in mock_send_mail.call_args_list]
+        assert_equal(emailed, [users[1].username, users[2].username])
+        assert_equal(NotificationDigest.find().count(), 0)
+
+    @mock.patch('website.mails.send_mail')
+    def test_send_users_email_skips_digests_stored_after_start(self, mock_send_mail):
+        users = self.make_digests('email_digest', 2)
+        mock_send_mail.side_effect = [None, Exception('SMTP down')]
+        with assert_raises(Exception):
+            send_users_email('email_digest')
+        late = factories.NotificationDigestFactory(
+            user_id=users[0]._id,
+            send_type='email_digest',
+            timestamp=self.timestamp,
+            message='Late',
+            node_lineage=[self.project._id]
+        )
+        late.save()
+        mock_send_mail.side_effect = None
+
+        send_users_email('email_digest')
+        assert_equal(NotificationDigest.find().count(), 1)
+        assert_equal(NotificationDigest.find_one()._id, late._id)
 
     def test_remove_sent_digest_notifications(self):
         d = factories.NotificationDigestFactory(
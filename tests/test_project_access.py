@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Tests for request-scoped permission resolution in website.project.access."""
+import mock
+from nose.tools import *  # noqa (PEP8 asserts)
+
+from framework.auth import Auth
+
+from website.project import access
+
+from tests.base import OsfTestCase
+from tests.factories import AuthUserFactory, NodeFactory, ProjectFactory
+
+
+class TestPermissionResolver(OsfTestCase):
+
+    def setUp(self):
+        super(TestPermissionResolver, self).setUp()
+        self.admin = AuthUserFactory()
+        self.other = AuthUserFactory()
+        self.project = ProjectFactory(creator=self.admin)
+        self.component = NodeFactory(parent=self.project, creator=self.other)
+        self.subcomponent = NodeFactory(parent=self.component, creator=self.other)
+        self.resolver = access.PermissionResolver()
+
+    def test_get_ancestors_matches_recursive_walk(self):
+        expected = []
+        node = self.subcomponent.parent_node
+        while node:
+            expected.append(node)
+            node = node.parent_node
+        assert_equal(self.resolver.get_ancestors(self.subcomponent), expected)
+        assert_equal(self.subcomponent.parents, expected)
+
+    def test_parents_resolved_once(self):
+        with mock.patch.object(type(self.subcomponent), 'parent_node', new_callable=mock.PropertyMock) as mock_parent:
+            mock_parent.return_value = None
+            self.resolver.get_ancestors(self.subcomponent)
+            self.resolver.get_ancestors(self.subcomponent)
+        assert_equal(mock_parent.call_count, 1)
+
+    def test_is_admin_parent(self):
+        assert_true(self.resolver.is_admin_parent(self.subcomponent, self.admin))
+        assert_false(self.resolver.is_admin_parent(self.project, self.other))
+        assert_false(self.resolver.is_admin_parent(self.subcomponent, None))
+
+    def test_is_admin_parent_memoized(self):
+        self.resolver.is_admin_parent(self.subcomponent, self.admin)
+        with mock.patch.object(type(self.project), 'has_permission') as mock_has_permission:
+            assert_true(self.resolver.is_admin_parent(self.subcomponent, self.admin))
+        assert_false(mock_has_permission.called)
+
+    def test_filter_viewable(self):
+        stranger = AuthUserFactory()
+        nodes = [self.project, self.component, self.subcomponent]
+        assert_equal(self.resolver.filter_viewable(nodes, Auth(self.admin)), nodes)
+        assert_equal(self.resolver.filter_viewable(nodes, Auth(stranger)), [])
+        assert_equal(
+            self.resolver.filter_viewable(nodes, Auth(self.other)),
+            [self.component, self.subcomponent]
+        )
+
+    def test_resolver_shared_within_request(self):
+        with self.app.app.test_request_context():
+            assert_is(access.get_resolver(), access.get_resolver())
+
+    @mock.patch('website.project.access.get_cache_key')
+    def test_resolver_not_shared_outside_request(self, mock_cache_key):
+        mock_cache_key.return_value = access.dummy_request
+        assert_is_not(access.get_resolver(), access.get_resolver())
+
+    def test_permission_change_invalidates_request_resolver(self):
+        with self.app.app.test_request_context():
+            stranger = AuthUserFactory()
+            assert_false(self.subcomponent.is_admin_parent(stranger))
+            self.project.add_permission(stranger, 'admin')
+            assert_true(self.subcomponent.is_admin_parent(stranger))
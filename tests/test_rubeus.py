@@ -2,6 +2,8 @@
 # encoding: utf-8
 
 import os
+import copy
+import time
 from types import NoneType
 from xmlrpclib import DateTime
 
@@ -13,6 +15,7 @@ from tests.base import OsfTestCase
 from tests.factories import (UserFactory, ProjectFactory, NodeFactory,
     AuthFactory, PointerFactory, DashboardFactory, FolderFactory, RegistrationFactory)
 from framework.auth import Auth
+from website import settings as website_settings
 from website.util import rubeus, api_url_for
 import website.app
 from website.util.rubeus import sort_by_name
@@ -265,7 +268,7 @@ class TestRubeus(OsfTestCase):
         collector = rubeus.NodeFileCollector(
             self.project, Auth(user=UserFactory())
         )
-        nodes = collector._collect_components(self.project, visited=[])
+        nodes = collector._collect_components(self.project, visited=set())
         assert_equal(len(nodes), 0)
 
     def test_serialized_pointer_has_flag_indicating_its_a_pointer(self):
@@ -357,13 +360,16 @@ class TestSerializingNodeWithAddon(OsfTestCase):
             },
         )
 
-    def test_collect_js_recursive(self):
-        self.project.get_addons.return_value[0].config.include_js = {'files': ['foo.js']}
+    @mock.patch('website.util.rubeus.get_addon_js')
+    def test_collect_js_recursive(self, mock_get_addon_js):
+        mock_get_addon_js.side_effect = lambda short_name, *args: {
+            'dropbox': {'foo.js'},
+            'github': {'bar.js', 'baz.js'},
+        }[short_name]
         self.project.get_addons.return_value[0].config.short_name = 'dropbox'
         node = NodeFactory(parent=self.project)
         mock_node_addon = mock.Mock()
-        mock_node_addon.config.include_js = {'files': ['bar.js', 'baz.js']}
-        mock_node_addon.config.short_name = 'dropbox'
+        mock_node_addon.config.short_name = 'github'
         node.get_addons = mock.Mock()
         node.get_addons.return_value = [mock_node_addon]
         result = rubeus.collect_addon_js(self.project)
@@ -372,17 +378,125 @@ class TestSerializingNodeWithAddon(OsfTestCase):
         assert_in('baz.js', result)
 
     def test_collect_js_unique(self):
-        self.project.get_addons.return_value[0].config.include_js = {'files': ['foo.js']}
         self.project.get_addons.return_value[0].config.short_name = 'dropbox'
         node = NodeFactory(parent=self.project)
         mock_node_addon = mock.Mock()
-        mock_node_addon.config.include_js = {'files': ['foo.js', 'baz.js']}
         mock_node_addon.config.short_name = 'dropbox'
         node.get_addons = mock.Mock()
         node.get_addons.return_value = [mock_node_addon]
-        result = rubeus.collect_addon_js(self.project)
-        assert_in('foo.js', result)
-        assert_in('baz.js', result)
+        with mock.patch('website.util.rubeus.get_addon_js') as mock_get_addon_js:
+            mock_get_addon_js.return_value = {'foo.js', 'baz.js'}
+            result = rubeus.collect_addon_js(self.project)
+        assert_equal(result, {'foo.js', 'baz.js'})
+        mock_get_addon_js.assert_called_once_with('dropbox', 'files.js', 'files')
+
+    def test_collect_js_includes_linked_projects(self):
+        self.project.get_addons.return_value[0].config.short_name = 'dropbox'
+        linked = ProjectFactory()
+        linked.get_addons = mock.Mock()
+        linked_addon = mock.Mock()
+        linked_addon.config.short_name = 'github'
+        linked.get_addons.return_value = [linked_addon]
+        self.project.add_pointer(linked, auth=Auth(self.project.creator))
+        assert_equal(rubeus.collect_addon_names(self.project), {'dropbox', 'github'})
+
+    def test_addon_names_cached_until_settings_saved(self):
+        self.project.get_addons.return_value[0].config.short_name = 'dropbox'
+        assert_equal(rubeus.get_addon_names(self.project), {'dropbox'})
+        self.project.get_addons.return_value = []
+        assert_equal(rubeus.get_addon_names(self.project), {'dropbox'})
+        rubeus.forget_addon_names(self.project._id)
+        assert_equal(rubeus.get_addon_names(self.project), set())
+
+    def test_addon_js_manifest(self):
+        dropbox = website_settings.ADDONS_AVAILABLE_DICT['dropbox']
+        with mock.patch('website.util.rubeus.paths.resolve_addon_path') as mock_resolve:
+            mock_resolve.return_value = '/static/public/js/dropbox/files.js'
+            rubeus._addon_js.clear()
+            rubeus.build_addon_asset_manifest([dropbox])
+            rubeus.get_addon_js('dropbox')
+        assert_equal(mock_resolve.call_count, 2)
+        assert_in('/static/public/js/dropbox/files.js', rubeus.get_addon_js('dropbox'))
+        rubeus._addon_js.clear()
+
+
+def make_hgrid_addon(short_name, data=None, delay=0):
+    addon = mock.Mock()
+    addon.config.short_name = short_name
+    addon.config.full_name = short_name.capitalize()
+    addon.config.has_hgrid_files = True
+
+    def get_hgrid_data(node_addon, auth, **kwargs):
+        time.sleep(delay)
+        return copy.deepcopy(data or [{'name': short_name}])
+    addon.config.get_hgrid_data.side_effect = get_hgrid_data
+    return addon
+
+
+class TestParallelHGridCollection(OsfTestCase):
+
+    def setUp(self):
+        super(TestParallelHGridCollection, self).setUp()
+        rubeus.hgrid_cache.clear()
+        self.auth = AuthFactory()
+        self.project = ProjectFactory(creator=self.auth.user)
+        self.component = NodeFactory(creator=self.auth.user, parent=self.project)
+        self.project.get_addons = mock.Mock(return_value=[make_hgrid_addon('github')])
+        self.component.get_addons = mock.Mock(return_value=[make_hgrid_addon('box')])
+
+    def tearDown(self):
+        super(TestParallelHGridCollection, self).tearDown()
+        rubeus.hgrid_cache.clear()
+
+    def test_parallel_matches_sequential(self):
+        parallel = rubeus.NodeFileCollector(self.project, self.auth, parallel=True).to_hgrid()
+        rubeus.hgrid_cache.clear()
+        sequential = rubeus.NodeFileCollector(self.project, self.auth, parallel=False).to_hgrid()
+        assert_equal(parallel, sequential)
+        root = parallel[0]
+        assert_equal(root['children'][0], {'name': 'github'})
+        assert_equal(root['children'][1]['children'], [{'name': 'box'}])
+
+    @mock.patch('website.util.rubeus.settings.HGRID_TIMEOUTS', {'box': 0.05})
+    def test_slow_provider_is_unavailable(self):
+        self.component.get_addons.return_value = [make_hgrid_addon('box', delay=0.5)]
+        root = rubeus.NodeFileCollector(self.project, self.auth, parallel=True).to_hgrid()[0]
+        assert_equal(root['children'][0], {'name': 'github'})
+        placeholder = root['children'][1]['children'][0]
+        assert_true(placeholder['unavailable'])
+        assert_equal(placeholder['name'], 'Box is currently unavailable')
+
+    def test_failing_provider_is_unavailable(self):
+        addon = make_hgrid_addon('box')
+        addon.config.get_hgrid_data.side_effect = ValueError
+        self.component.get_addons.return_value = [addon]
+        root = rubeus.NodeFileCollector(self.project, self.auth, parallel=True).to_hgrid()[0]
+        assert_true(root['children'][1]['children'][0]['unavailable'])
+
+    def test_provider_writing_in_worker_is_unavailable(self):
+        addon = make_hgrid_addon('box')
+        addon.config.get_hgrid_data.side_effect = lambda *args, **kwargs: self.component.save()
+        self.component.get_addons.return_value = [addon]
+        root = rubeus.NodeFileCollector(self.project, self.auth, parallel=True).to_hgrid()[0]
+        assert_true(root['children'][1]['children'][0]['unavailable'])
+
+    def test_pool_is_shared(self):
+        rubeus.NodeFileCollector(self.project, self.auth, parallel=True).to_hgrid()
+        pool = rubeus._get_hgrid_pool()
+        rubeus.NodeFileCollector(self.project, self.auth, parallel=True).to_hgrid()
+        assert_is(rubeus._get_hgrid_pool(), pool)
+
+    @mock.patch.object(rubeus.hgrid_cache, 'ttl', 60)
+    def test_hgrid_data_is_cached(self):
+        addon = self.project.get_addons.return_value[0]
+        addon.owner = self.project
+        collector = rubeus.NodeFileCollector(self.project, self.auth)
+        collector._collect_addons(self.project)
+        collector._collect_addons(self.project)
+        assert_equal(addon.config.get_hgrid_data.call_count, 1)
+        rubeus.forget_hgrid_data(self.project._id)
+        collector._collect_addons(self.project)
+        assert_equal(addon.config.get_hgrid_data.call_count, 2)
 
 
 class TestSerializingEmptyDashboard(OsfTestCase):
@@ -21,6 +21,7 @@ from dateutil.parser import parse as parse_date
 from framework import auth
 from framework.exceptions import HTTPError
 from framework.auth import User, Auth
+from framework.auth import signing
 from framework.auth.utils import impute_names_model
 from framework.auth.exceptions import InvalidTokenError
 from framework.tasks import handlers
@@ -2595,6 +2596,23 @@ class TestWatchViews(OsfTestCase):
         assert_equal(res.json['pages'], 2)
         assert_equal(res.json['logs'][0]['action'], 'file_added')
 
+    def test_get_watched_logs_before_cursor(self):
+        project = ProjectFactory()
+        for _ in range(12):
+            project.logs.append(NodeLogFactory(user=self.user, action="file_added"))
+        project.save()
+        watch_cfg = WatchConfigFactory(node=project)
+        self.user.watch(watch_cfg)
+        self.user.save()
+        url = api_url_for("watched_logs_get")
+        first = self.app.get(url, auth=self.auth).json
+        res = self.app.get(url, {'before': first['next']}, auth=self.auth)
+        assert_equal(len(res.json['logs']), 3)
+        assert_equal(res.json['total'], 12 + 1)
+        assert_is_none(res.json['next'])
+        ids = [log['id'] for log in first['logs'] + res.json['logs']]
+        assert_equal(ids, sorted(set(ids), reverse=True))
+
     def test_get_more_watched_logs_invalid_page(self):
         project = ProjectFactory()
         watch_cfg = WatchConfigFactory(node=project)
@@ -2944,6 +2962,20 @@ class TestPublicViews(OsfTestCase):
         assert_in('Forgot Password', res.body)
 
 
+class TestProcessStatusViews(OsfTestCase):
+
+    def test_mongo_pool_status_requires_signature(self):
+        res = self.app.get('/api/v1/status/mongo/', auth=AuthUserFactory().auth, expect_errors=True)
+        assert_equal(res.status_code, http.BAD_REQUEST)
+
+    def test_mongo_pool_status_signed(self):
+        res = self.app.get(
+            '/api/v1/status/mongo/',
+            signing.sign_data(signing.default_signer, {}),
+        )
+        assert_equal(res.status_code, http.OK)
+
+
 class TestAuthViews(OsfTestCase):
 
     def setUp(self):
@@ -86,6 +86,51 @@ class TestWatching(OsfTestCase):
         day_log_ids = list(self.user.get_daily_digest_log_ids())
         assert_in(self.last_log._id, day_log_ids)
 
+    def test_get_recent_log_ids_merges_watched_nodes(self):
+        other = ProjectFactory(creator=self.user)
+        other.logs = []
+        other.save()
+        for project in (self.project, other, self.project, other):
+            project.add_log(
+                'tag_added',
+                params={'project': project._primary_key},
+                auth=self.consolidate_auth,
+                save=True,
+            )
+        self._watch_project(self.project)
+        self._watch_project(other)
+        log_ids = list(self.user.get_recent_log_ids())
+        expected = [log._id for log in self.project.logs + other.logs]
+        assert_equal(log_ids, sorted(expected, reverse=True))
+        assert_equal(self.user.get_recent_log_count(), len(expected))
+
+    def test_get_recent_log_ids_shared_logs_once(self):
+        # Registrations share their logs with the registered project
+        registration = ProjectFactory(creator=self.user)
+        registration.logs = self.project.logs
+        registration.save()
+        self._watch_project(self.project)
+        self._watch_project(registration)
+        log_ids = list(self.user.get_recent_log_ids())
+        assert_equal(log_ids, sorted([log._id for log in self.project.logs], reverse=True))
+        assert_equal(self.user.get_recent_log_count(), 2)
+
+    def test_get_recent_log_ids_limit_and_before(self):
+        for _ in range(4):
+            self.project.add_log(
+                'tag_added',
+                params={'project': self.project._primary_key},
+                auth=self.consolidate_auth,
+                save=True,
+            )
+        self._watch_project(self.project)
+        log_ids = list(self.user.get_recent_log_ids())
+        assert_equal(len(log_ids), 6)
+        first_page = list(self.user.get_recent_log_ids(limit=2))
+        assert_equal(first_page, log_ids[:2])
+        second_page = list(self.user.get_recent_log_ids(before=first_page[-1], limit=2))
+        assert_equal(second_page, log_ids[2:4])
+
     def _watch_project(self, project):
         watch_config = WatchConfigFactory(node=project)
         self.user.watch(watch_config)
@@ -571,6 +571,80 @@ class TestFolderObj(FilesTestCase):
         pass
 
 
+def listed(name, kind='file', **kwargs):
+    path = '/' + name + ('/' if kind == 'folder' else '')
+    return dict({
+        'provider': 'test',
+        'kind': kind,
+        'name': name,
+        'path': path,
+        'materialized': path,
+        'etag': name,
+        'modified': None,
+        'size': 1024,
+    }, **kwargs)
+
+
+class TestReconcile(FilesTestCase):
+
+    def test_creates_file_nodes_in_listing_order(self):
+        reconciled = models.FileNode.reconcile(self.node, [listed('b'), listed('a', kind='folder')])
+
+        assert_equal([each.name for each in reconciled], ['b', 'a'])
+        assert_is_instance(reconciled[0], TestFile)
+        assert_is_instance(reconciled[1], TestFolder)
+        assert_equal(models.StoredFileNode.find(Q('node', 'eq', self.node)).count(), 2)
+        assert_equal(models.StoredFileNode.load(reconciled[0]._id).history[0]['etag'], 'b')
+
+    def test_matches_stored_file_nodes(self):
+        (created, ) = models.FileNode.reconcile(self.node, [listed('a')])
+        (found, ) = models.FileNode.reconcile(self.node, [listed('a', name='renamed')])
+
+        assert_equal(found._id, created._id)
+        assert_equal(models.StoredFileNode.find(Q('node', 'eq', self.node)).count(), 1)
+        assert_equal(models.StoredFileNode._storage[0].store.find_one({'_id': found._id})['name'], 'renamed')
+
+    def test_unchanged_file_nodes_are_not_written(self):
+        (created, ) = models.FileNode.reconcile(self.node, [listed('a')])
+        last_touched = created.last_touched
+
+        with mock.patch.object(models.StoredFileNode._storage[0].store, 'update') as mock_update:
+            (found, ) = models.FileNode.reconcile(self.node, [listed('a')])
+
+        assert_false(mock_update.called)
+        assert_equal(found.last_touched, last_touched)
+
+    def test_new_etag_is_added_to_history(self):
+        models.FileNode.reconcile(self.node, [listed('a')])
+        (found, ) = models.FileNode.reconcile(self.node, [listed('a', etag='changed')])
+
+        stored = models.StoredFileNode._storage[0].store.find_one({'_id': found._id})
+        assert_equal([each['etag'] for each in stored['history']], ['a', 'changed'])
+
+    @mock.patch('website.files.models.base.settings.FILES_RECONCILE_BATCH_SIZE', 2)
+    def test_looks_up_one_batch_at_a_time(self):
+        listing = [listed(name) for name in 'abcde']
+        with mock.patch.object(models.StoredFileNode, 'find', wraps=models.StoredFileNode.find) as mock_find:
+            reconciled = models.FileNode.reconcile(self.node, listing)
+
+        assert_equal(mock_find.call_count, 3)
+        assert_equal([each.name for each in reconciled], list('abcde'))
+
+    def test_created_file_nodes_can_be_saved(self):
+        (created, ) = models.FileNode.reconcile(self.node, [listed('a')])
+        created.name = 'renamed'
+        created.save()
+
+        assert_equal(models.StoredFileNode.find(Q('node', 'eq', self.node)).count(), 1)
+        assert_equal(models.StoredFileNode.load(created._id).name, 'renamed')
+
+    def test_repeated_entries_are_created_once(self):
+        reconciled = models.FileNode.reconcile(self.node, [listed('a'), listed('a')])
+
+        assert_equal(reconciled[0], reconciled[1])
+        assert_equal(models.StoredFileNode.find(Q('node', 'eq', self.node)).count(), 1)
+
+
 class TestUtils(FilesTestCase):
 
     def test_genwrapper_repr(self):
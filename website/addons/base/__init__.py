@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
 import os
+import functools
 import glob
 import importlib
 import mimetypes
 from bson import ObjectId
 from modularodm import fields
 from mako.lookup import TemplateLookup
-from time import sleep
 
 import requests
 from modularodm import Q
@@ -19,8 +19,10 @@ from framework.exceptions import (
 )
 
 from website import settings
+from website.addons.base import crawler
 from website.addons.base import serializer
 from website.project.model import Node
+from website.util import rubeus
 from website.util import waterbutler_url_for
 
 from website.oauth.signals import oauth_complete
@@ -501,6 +503,13 @@ class AddonNodeSettingsBase(AddonSettingsBase):
         """
         raise NotImplementedError()
 
+    def save(self, *args, **kwargs):
+        saved_fields = super(AddonNodeSettingsBase, self).save(*args, **kwargs)
+        if saved_fields and self.owner:
+            rubeus.forget_hgrid_data(self.owner._id)
+            rubeus.forget_addon_names(self.owner._id)
+        return saved_fields
+
     @property
     def has_auth(self):
         """Whether the node has added credentials for this addon."""
@@ -697,7 +706,7 @@ class StorageAddonBase(object):
             name = name + ": {folder}".format(folder=folder_name)
         return name
 
-    def _get_fileobj_child_metadata(self, filenode, user, cookie=None, version=None):
+    def _get_metadata_url(self, filenode, user, cookie=None, version=None):
         kwargs = dict(
             provider=self.config.short_name,
             path=filenode.get('path', ''),
@@ -709,41 +718,45 @@ class StorageAddonBase(object):
             kwargs['cookie'] = cookie
         if version:
             kwargs['version'] = version
-        metadata_url = waterbutler_url_for(
+        return waterbutler_url_for(
             'metadata',
             **kwargs
         )
-        res = requests.get(metadata_url)
+
+    def _parse_child_metadata(self, filenode, res, version=None):
+        """Return the children listed in a WaterButler metadata response for
+        ``filenode``.
+        """
         if res.status_code != 200:
             raise HTTPError(res.status_code, data={
                 'error': res.json(),
             })
-        # TODO: better throttling?
-        sleep(1.0 / 5.0)
         return res.json().get('data', [])
 
+    def _get_fileobj_child_metadata(self, filenode, user, cookie=None, version=None):
+        metadata_url = self._get_metadata_url(filenode, user, cookie=cookie, version=version)
+        res = requests.get(metadata_url)
+        return self._parse_child_metadata(filenode, res, version=version)
+
     def _get_file_tree(self, filenode=None, user=None, cookie=None, version=None):
         """
-        Recursively get file metadata
+        Get file metadata for a folder and everything below it. Folders are
+        listed concurrently; see `website.addons.base.crawler`.
         """
         filenode = filenode or {
             'path': '/',
             'kind': 'folder',
             'name': self.root_node.name,
         }
-        if filenode.get('kind') == 'file':
-            return filenode
-        elif 'size' in filenode:
+        if not crawler.is_folder(filenode):
             return filenode
-        kwargs = {
-            'version': version,
-            'cookie': cookie,
-        }
-        filenode['children'] = [
-            self._get_file_tree(child, user, cookie=cookie)
-            for child in self._get_fileobj_child_metadata(filenode, user, **kwargs)
-        ]
-        return filenode
+        tree_crawler = crawler.FileTreeCrawler(
+            provider=self.config.short_name,
+            # Built once, so that the user's cookie is looked up once
+            base_url=self._get_metadata_url(filenode, user, cookie=cookie, version=version),
+            parse=functools.partial(self._parse_child_metadata, version=version),
+        )
+        return tree_crawler.crawl(filenode)
 
 class AddonOAuthNodeSettingsBase(AddonNodeSettingsBase):
     _meta = {
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""Concurrent crawling of an addon's file tree through WaterButler. Folders
+are listed by a bounded pool of worker threads sharing one keep-alive HTTP
+session; requests to each provider are rate limited with a token bucket, and
+rate-limited or failed requests are retried with exponential backoff.
+"""
+
+import time
+import Queue
+import threading
+
+import furl
+import requests
+
+from website import settings
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket(object):
+    """Allow ``rate`` acquisitions per second on average, in bursts of up to
+    ``capacity``. Thread-safe.
+    """
+    def __init__(self, rate, capacity=None, timer=time.time, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.timer = timer
+        self.sleep = sleep
+        self.updated = timer()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, blocking until one is available."""
+        while True:
+            with self._lock:
+                now = self.timer()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(provider):
+    """Return the token bucket shared by all crawls of ``provider`` in this
+    process.
+    """
+    with _buckets_lock:
+        if provider not in _buckets:
+            rate = settings.WATERBUTLER_CRAWL_RATES.get(provider, settings.WATERBUTLER_CRAWL_RATE)
+            _buckets[provider] = TokenBucket(rate)
+        return _buckets[provider]
+
+
+def is_folder(filenode):
+    # Folders that already carry a size are treated as leaves, as before
+    return filenode.get('kind') != 'file' and 'size' not in filenode
+
+
+def metadata_url(base_url, path):
+    """Point a WaterButler metadata URL at another path."""
+    url = furl.furl(base_url)
+    url.args['path'] = path
+    return url.url
+
+
+class FileTreeCrawler(object):
+    """Fill in the ``children`` of every folder below a root folder.
+
+    :param str provider: Provider short name, used for rate limiting
+    :param str base_url: WaterButler metadata URL for any path of the addon;
+        only its ``path`` argument is replaced for each folder
+    :param parse: Callable taking a folder and its metadata response and
+        returning the folder's children; raises on unusable responses
+    """
+    def __init__(self, provider, base_url, parse, workers=None, retries=None,
+                 backoff=None, session=None, bucket=None, sleep=time.sleep):
+        self.base_url = base_url
+        self.parse = parse
+        self.workers = workers or settings.WATERBUTLER_CRAWL_WORKERS
+        self.retries = settings.WATERBUTLER_CRAWL_RETRIES if retries is None else retries
+        self.backoff = settings.WATERBUTLER_CRAWL_BACKOFF if backoff is None else backoff
+        self.session = session or requests.Session()
+        self.bucket = bucket or get_bucket(provider)
+        self.sleep = sleep
+
+    def get(self, url):
+        """GET ``url``, retrying connection errors and retryable statuses.
+        The last response is returned once retries are exhausted.
+        """
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url)
+            except requests.ConnectionError:
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    return response
+            self.sleep(self.backoff * 2 ** attempt)
+
+    def list_folder(self, folder):
+        response = self.get(metadata_url(self.base_url, folder.get('path', '')))
+        return self.parse(folder, response)
+
+    def crawl(self, root):
+        """List every folder below ``root``, assembling the tree in place.
+
+        :return: ``root``, with ``children`` set on it and on every folder
+            below it
+        :raises: The first error raised while listing a folder
+        """
+        if not is_folder(root):
+            return root
+        folders = Queue.Queue()
+        errors = []
+
+        def work():
+            while True:
+                folder = folders.get()
+                try:
+                    if folder is None:
+                        return
+                    # Once a folder fails, drain the queue without listing
+                    if not errors:
+                        folder['children'] = self.list_folder(folder)
+                        for child in folder['children']:
+                            if is_folder(child):
+                                folders.put(child)
+                except Exception as error:
+                    errors.append(error)
+                finally:
+                    folders.task_done()
+
+        threads = [threading.Thread(target=work) for _ in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        folders.put(root)
+        folders.join()
+        for _ in threads:
+            folders.put(None)
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return root
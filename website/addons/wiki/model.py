@@ -2,6 +2,7 @@
 
 import datetime
 import functools
+import hashlib
 import logging
 
 from bleach import linkify
@@ -14,10 +15,12 @@ from modularodm import fields
 
 from framework.forms.utils import sanitize
 from framework.guid.model import GuidStoredObject
+from framework.mongo import database
 
 from website import settings
 from website.addons.base import AddonNodeSettingsBase
 from website.addons.wiki import utils as wiki_utils
+from website.addons.wiki import settings as wiki_settings
 from website.addons.wiki.settings import WIKI_CHANGE_DATE
 from website.project.signals import write_permissions_revoked
 
@@ -152,6 +155,45 @@ def render_content(content, node):
     return sanitized_content
 
 
+# Bump when the output of `render_content`, `linkify` or `raw_text` changes
+# so that previously cached renders are no longer used
+RENDERER_VERSION = 1
+RENDER_CACHE_COLLECTION = 'wikirendercache'
+
+
+def get_render_key(page, node):
+    """Key of the rendered output of ``page`` as shown on ``node``. Covers the
+    content, the renderer version and the URL prefix that wiki links resolve
+    against, which changes when the node moves.
+    """
+    digest = hashlib.sha1()
+    digest.update(page.content.encode('utf-8'))
+    digest.update(str(RENDERER_VERSION))
+    digest.update(build_wiki_url(node, '__page__', '', '').encode('utf-8'))
+    return '{0}:{1}'.format(page._id, digest.hexdigest())
+
+
+_render_cache_indexed = False
+
+
+def get_render_cache():
+    """The render cache collection. Entries are removed by page when the page
+    is renamed and expire ``WIKI_RENDER_CACHE_TTL`` seconds after they were
+    rendered.
+    """
+    global _render_cache_indexed
+    collection = database[RENDER_CACHE_COLLECTION]
+    if not _render_cache_indexed:
+        collection.ensure_index('page')
+        collection.ensure_index('date', expireAfterSeconds=wiki_settings.WIKI_RENDER_CACHE_TTL)
+        _render_cache_indexed = True
+    return collection
+
+
+def clear_render_cache(page_id):
+    get_render_cache().remove({'page': page_id})
+
+
 class NodeWikiPage(GuidStoredObject):
 
     _id = fields.StringField(primary=True)
@@ -177,8 +219,25 @@ class NodeWikiPage(GuidStoredObject):
     def rendered_before_update(self):
         return self.date < WIKI_CHANGE_DATE
 
-    def html(self, node):
-        """The cleaned HTML of the page"""
+    def _get_render(self, node):
+        """Return the cached render of the page on ``node``, rendering the
+        HTML if it is not cached yet.
+        """
+        key = get_render_key(self, node)
+        if not wiki_settings.WIKI_RENDER_CACHE:
+            return {'_id': key, 'html': self._render_html(node)}
+        cached = get_render_cache().find_one({'_id': key})
+        if cached is None:
+            cached = {
+                '_id': key,
+                'page': self._id,
+                'html': self._render_html(node),
+                'date': datetime.datetime.utcnow(),
+            }
+            get_render_cache().save(cached)
+        return cached
+
+    def _render_html(self, node):
         sanitized_content = render_content(self.content, node=node)
         try:
             return linkify(
@@ -189,10 +248,21 @@ class NodeWikiPage(GuidStoredObject):
             logger.warning('Returning unlinkified content.')
             return sanitized_content
 
+    def html(self, node):
+        """The cleaned HTML of the page"""
+        return self._get_render(node)['html']
+
     def raw_text(self, node):
         """ The raw text of the page, suitable for using in a test search"""
-
-        return sanitize(self.html(node), tags=[], strip=True)
+        cached = self._get_render(node)
+        if 'text' not in cached:
+            cached['text'] = sanitize(cached['html'], tags=[], strip=True)
+            if wiki_settings.WIKI_RENDER_CACHE:
+                get_render_cache().update(
+                    {'_id': cached['_id']},
+                    {'$set': {'text': cached['text']}},
+                )
+        return cached['text']
 
     def get_draft(self, node):
         """
@@ -223,6 +293,7 @@ class NodeWikiPage(GuidStoredObject):
 
     def rename(self, new_name, save=True):
         self.page_name = new_name
+        clear_render_cache(self._id)
         if save:
             self.save()
 
@@ -7,3 +7,8 @@ SHAREJS_URL = '{}:{}'.format(SHAREJS_HOST, SHAREJS_PORT)
 
 # TODO: Change to release date for wiki change
 WIKI_CHANGE_DATE = datetime.datetime.utcfromtimestamp(1423760098)
+
+# Store rendered page HTML and search text, keyed by content and node URL
+WIKI_RENDER_CACHE = True
+# Seconds after which a cached render expires, bounding the collection
+WIKI_RENDER_CACHE_TTL = 60 * 60 * 24 * 30
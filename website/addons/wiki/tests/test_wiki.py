@@ -19,6 +19,7 @@ from tests.factories import (
 from website.exceptions import NodeStateError
 from website.addons.wiki import settings
 from website.addons.wiki import views
+from website.addons.wiki import model
 from website.addons.wiki.exceptions import InvalidVersionError
 from website.addons.wiki.model import NodeWikiPage, render_content
 from website.addons.wiki.utils import (
@@ -27,6 +28,7 @@ from website.addons.wiki.utils import (
 )
 from website.addons.wiki.tests.config import EXAMPLE_DOCS, EXAMPLE_OPS
 from framework.auth import Auth
+from framework.mongo import database
 from framework.mongo.utils import to_mongo_key
 
 # forward slashes are not allowed, typically they would be replaced with spaces
@@ -708,6 +710,59 @@ class TestWikiLinks(OsfTestCase):
         assert_equal(expected, wiki.html(node))
 
 
+class TestWikiRenderCache(OsfTestCase):
+
+    def setUp(self):
+        super(TestWikiRenderCache, self).setUp()
+        self.project = ProjectFactory()
+        self.wiki = NodeWikiFactory(content='# Title\n\n[[other]]', node=self.project)
+
+    def cached_renders(self):
+        return database[model.RENDER_CACHE_COLLECTION].find({'page': self.wiki._id})
+
+    @mock.patch('website.addons.wiki.model.render_content')
+    def test_html_rendered_once(self, mock_render):
+        mock_render.return_value = '<h1>Title</h1>'
+        assert_equal(self.wiki.html(self.project), '<h1>Title</h1>')
+        assert_equal(self.wiki.html(self.project), '<h1>Title</h1>')
+        assert_equal(self.wiki.raw_text(self.project), 'Title')
+        assert_equal(mock_render.call_count, 1)
+        assert_equal(self.cached_renders().count(), 1)
+        assert_equal(self.cached_renders()[0]['text'], 'Title')
+
+    def test_content_change_rerenders(self):
+        self.wiki.html(self.project)
+        self.wiki.content = 'Changed'
+        assert_in('Changed', self.wiki.html(self.project))
+        assert_equal(self.cached_renders().count(), 2)
+
+    def test_render_depends_on_node_url(self):
+        fork = self.project.fork_node(Auth(self.project.creator))
+        assert_in(self.project.web_url_for('project_wiki_view', wname='other'), self.wiki.html(self.project))
+        assert_in(fork.web_url_for('project_wiki_view', wname='other'), self.wiki.html(fork))
+
+    def test_rename_clears_cache(self):
+        self.wiki.html(self.project)
+        self.wiki.rename('renamed')
+        assert_equal(self.cached_renders().count(), 0)
+
+    @mock.patch('website.addons.wiki.model._render_cache_indexed', False)
+    def test_cache_indexed_by_page_and_expiry(self):
+        self.wiki.html(self.project)
+        indexes = database[model.RENDER_CACHE_COLLECTION].index_information()
+        keys = dict((tuple(index['key']), index) for index in indexes.values())
+        assert_in((('page', 1), ), keys)
+        assert_equal(
+            keys[(('date', 1), )]['expireAfterSeconds'],
+            model.wiki_settings.WIKI_RENDER_CACHE_TTL,
+        )
+
+    @mock.patch('website.addons.wiki.model.wiki_settings.WIKI_RENDER_CACHE', False)
+    def test_cache_disabled(self):
+        self.wiki.raw_text(self.project)
+        assert_equal(self.cached_renders().count(), 0)
+
+
 class TestWikiUuid(OsfTestCase):
 
     def setUp(self):
@@ -19,6 +19,7 @@ from framework.transactions import handlers as transaction_handlers
 
 import website.models
 from website.routes import make_url_map
+from website.util.rubeus import build_addon_asset_manifest
 from website.addons.base import init_addon
 from website.project.model import ensure_schemas, Node
 # This import is necessary to set up the archiver signal listeners
@@ -116,6 +117,7 @@ def init_app(settings_module='website.settings', set_backends=True, routes=True,
 
     build_log_templates(settings)
     init_addons(settings, routes)
+    build_addon_asset_manifest()
     build_js_config_files(settings)
 
     app.debug = settings.DEBUG_MODE
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Precomputed payload for /explore/activity. A periodic task gathers the
+newest and most viewed public projects and registrations into a single
+snapshot document, so that the page costs one read rather than a call to
+Piwik and a scan of nodes. If Piwik cannot be reached, the popular lists of
+the previous snapshot are kept, less any node that is no longer public.
+"""
+
+import logging
+import datetime
+
+import requests
+from modularodm import Q
+
+from framework.mongo import database
+from framework.tasks import app as celery_app
+from framework.analytics.piwik import PiwikClient
+
+from website import settings
+
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_COLLECTION = 'discoverysnapshot'
+ACTIVITY_SNAPSHOT_ID = 'activity'
+
+# Number of nodes in each list of the page
+LIST_SIZE = 10
+
+
+def use_snapshot():
+    """Whether the page is served from the snapshot rather than computed on
+    each visit. Without Celery nothing would refresh it.
+    """
+    return settings.DISCOVERY_SNAPSHOT_ASYNC and settings.USE_CELERY
+
+
+def serialize_node(node):
+    """The fields of ``node`` that active_nodes.mako renders."""
+    return {
+        '_id': node._id,
+        'title': node.title,
+        'url': node.url,
+        'api_url': node.api_url,
+        'is_registration': node.is_registration,
+        'date_created': node.date_created,
+        'registered_date': node.registered_date,
+    }
+
+
+def get_recent_public_projects():
+    from website.models import Node
+    return Node.find(
+        Q('category', 'eq', 'project') &
+        Q('is_public', 'eq', True) &
+        Q('is_deleted', 'eq', False) &
+        Q('is_registration', 'eq', False)
+    ).sort(
+        '-date_created'
+    ).limit(LIST_SIZE)
+
+
+def is_listable(node):
+    """Whether ``node`` may appear in the popular lists: public, not deleted
+    and, for registrations, not retracted.
+    """
+    if node is None or not node.is_public or node.is_deleted:
+        return False
+    return not (node.is_registration and node.is_retracted)
+
+
+def get_popular(date):
+    """Return the most viewed public projects and registrations in the week
+    starting ``date``, and their view counts keyed by node id.
+
+    :raises: `requests.RequestException` or `ValueError` if Piwik cannot be
+        reached or answers with garbage
+    """
+    from website.models import Node
+
+    client = PiwikClient(
+        url=settings.PIWIK_HOST,
+        auth_token=settings.PIWIK_ADMIN_TOKEN,
+        site_id=settings.PIWIK_SITE_ID,
+        period='week',
+        date=date.strftime('%Y-%m-%d'),
+    )
+    try:
+        popular_project_ids = [
+            x for x in client.custom_variables if x.label == 'Project ID'
+        ][0].values
+    except IndexError:
+        raise ValueError('Piwik returned no "Project ID" custom variable')
+
+    # Load every candidate in one query, then walk them in order of views
+    nodes = dict(
+        (node._id, node)
+        for node in Node.find(Q('_id', 'in', [x.value for x in popular_project_ids]))
+    )
+    projects, registrations, hits = [], [], {}
+    for x in popular_project_ids:
+        node = nodes.get(x.value)
+        if not is_listable(node):
+            continue
+        selected = registrations if node.is_registration else projects
+        if len(selected) < LIST_SIZE:
+            selected.append(serialize_node(node))
+            hits[node._id] = {'hits': x.actions, 'visits': x.visits}
+        if len(projects) >= LIST_SIZE and len(registrations) >= LIST_SIZE:
+            break
+    return projects, registrations, hits
+
+
+def recheck_popular(previous):
+    """Reload the popular lists of the snapshot ``previous``, dropping nodes
+    that have since been made private, deleted or retracted.
+    """
+    from website.models import Node
+
+    kept = previous['popular_public_projects'] + previous['popular_public_registrations']
+    nodes = dict(
+        (node._id, node)
+        for node in Node.find(Q('_id', 'in', [entry['_id'] for entry in kept]))
+    )
+    projects, registrations, hits = [], [], {}
+    for entry in kept:
+        node = nodes.get(entry['_id'])
+        if not is_listable(node):
+            continue
+        selected = registrations if node.is_registration else projects
+        selected.append(serialize_node(node))
+        if node._id in previous['hits']:
+            hits[node._id] = previous['hits'][node._id]
+    return projects, registrations, hits
+
+
+def compute_activity(previous=None):
+    """Build the activity payload. Popular lists come from ``previous``, the
+    last snapshot, when Piwik is unavailable.
+    """
+    from website.project.utils import recent_public_registrations
+
+    activity = {
+        'recent_public_projects': [serialize_node(node) for node in get_recent_public_projects()],
+        'recent_public_registrations': [
+            serialize_node(node) for node in recent_public_registrations(n=LIST_SIZE)
+        ],
+        'popular_public_projects': [],
+        'popular_public_registrations': [],
+        'hits': {},
+    }
+    if settings.PIWIK_HOST:
+        # get the date for exactly one week ago
+        target_date = datetime.date.today() - datetime.timedelta(weeks=1)
+        try:
+            popular = get_popular(target_date)
+        except (requests.RequestException, ValueError) as error:
+            logger.exception(error)
+            if not previous:
+                return activity
+            popular = recheck_popular(previous)
+        (
+            activity['popular_public_projects'],
+            activity['popular_public_registrations'],
+            activity['hits'],
+        ) = popular
+    return activity
+
+
+def get_activity_snapshot():
+    """Return the stored activity snapshot, or None if there is none yet."""
+    return database[SNAPSHOT_COLLECTION].find_one({'_id': ACTIVITY_SNAPSHOT_ID})
+
+
+def refresh_activity_snapshot():
+    """Recompute the activity payload and store it as the new snapshot.
+
+    :return: The snapshot
+    """
+    snapshot = compute_activity(previous=get_activity_snapshot())
+    snapshot.update({
+        '_id': ACTIVITY_SNAPSHOT_ID,
+        'computed': datetime.datetime.utcnow(),
+    })
+    database[SNAPSHOT_COLLECTION].save(snapshot)
+    return snapshot
+
+
+@celery_app.task(name='discovery.refresh_activity_snapshot', ignore_result=True)
+def refresh_activity():
+    snapshot = refresh_activity_snapshot()
+    logger.info('Refreshed activity snapshot at {0}'.format(snapshot['computed'].isoformat()))
@@ -1,6 +1,7 @@
 from __future__ import unicode_literals
 
 import os
+import copy
 import bson
 import logging
 import pymongo
@@ -11,6 +12,7 @@ import functools
 from modularodm import fields, Q
 from modularodm.exceptions import NoResultsFound
 from dateutil.parser import parse as parse_date
+from pymongo.errors import DuplicateKeyError
 
 from framework.guid.model import Guid
 from framework.mongo import StoredObject
@@ -18,6 +20,7 @@ from framework.mongo.utils import unique_on
 from framework.analytics import get_basic_counters
 
 from website import util
+from website import settings
 from website.files import utils
 from website.files import exceptions
 
@@ -175,6 +178,15 @@ class FileNodeMeta(type):
             cls_map[index] = cls
 
 
+def _mark_saved(stored_object, data):
+    """Have the ODM treat a StoredFileNode written directly to the database
+    as ``data`` as though it had saved it itself
+    """
+    stored_object._is_loaded = True
+    stored_object._stored_key = stored_object._primary_key
+    StoredFileNode._set_cache(stored_object._primary_key, stored_object, data)
+
+
 class FileNode(object):
     """The base class for the entire files storage system.
     Use for querying on all files and folders in the database
@@ -201,7 +213,7 @@ class FileNode(object):
         See FileNode.create
         Note: Osfstorage overrides this method due to odd database constraints
         """
-        path = '/' + path.lstrip('/')
+        path = cls.get_stored_path(node, path)
         try:
             # Note: Possible race condition here
             # Currently create then find is not super feasable as create would require a
@@ -211,6 +223,102 @@ class FileNode(object):
         except NoResultsFound:
             return cls.create(node=node, path=path)
 
+    @classmethod
+    def get_stored_path(cls, node, path):
+        """The path stored for the file at WaterButler path ``path``.
+        Subclasses may override it, see PathFollowingFileNode
+        """
+        return '/' + path.lstrip('/')
+
+    @classmethod
+    def reconcile(cls, node, listing, user=None):
+        """Find or create the FileNodes for the entries of a WaterButler folder
+        listing and update each of them with its metadata, as get_or_create
+        and update would, without a query and a save per entry.
+        Stored FileNodes are looked up FILES_RECONCILE_BATCH_SIZE entries
+        at a time with a single query. Only FileNodes that are new or whose
+        metadata changed are written; new ones with a single insert per batch.
+        FileNodes that did not change keep their last_touched.
+        Not for osfstorage, whose listings come from the database.
+        :param list listing: The attributes of each entry of the listing
+        :returns: The FileNodes, in the order of listing
+        """
+        reconciled = []
+        for start in range(0, len(listing), settings.FILES_RECONCILE_BATCH_SIZE):
+            batch = listing[start:start + settings.FILES_RECONCILE_BATCH_SIZE]
+            try:
+                reconciled.extend(cls._reconcile_batch(node, batch, user))
+            except DuplicateKeyError:
+                # Another request created some of these; go one by one
+                reconciled.extend(cls._reconcile_one(node, attrs, user) for attrs in batch)
+        return reconciled
+
+    @classmethod
+    def _resolve_listed_class(cls, attrs):
+        return FileNode.resolve_class(
+            attrs['provider'],
+            FileNode.FOLDER if attrs['kind'] == 'folder' else FileNode.FILE
+        )
+
+    @classmethod
+    def _reconcile_one(cls, node, attrs, user):
+        file_node = cls._resolve_listed_class(attrs).get_or_create(node, attrs['path'])
+        file_node.update(None, dict(attrs), user=user)
+        return file_node
+
+    @classmethod
+    def _reconcile_batch(cls, node, listing, user):
+        entries = []
+        for attrs in listing:
+            klass = cls._resolve_listed_class(attrs)
+            entries.append((klass, klass.get_stored_path(node, attrs['path']), attrs))
+
+        stored = {}
+        for each in StoredFileNode.find(Q('node', 'eq', node) & Q('path', 'in', list({path for _, path, _ in entries}))):
+            stored.setdefault((each.provider, each.is_file, each.path), each)
+
+        collection = StoredFileNode._storage[0].store
+        reconciled, inserts, updates, seen = [], [], [], {}
+        for klass, path, attrs in entries:
+            key = (klass.provider, klass.is_file, path)
+            if key in seen:
+                reconciled.append(seen[key])
+                continue
+            existing = stored.get(key)
+            if existing is None:
+                file_node = klass.create(node=node, path=path)
+            else:
+                file_node = existing.wrapped()
+                before = copy.deepcopy(existing.to_storage())
+            # update may mutate the metadata it is given
+            file_node.update(None, dict(attrs), user=user, save=False)
+            data = file_node.stored_object.to_storage()
+            # Some updates blank out fields for display only, see DataverseFile.update
+            data.update(name=attrs['name'], materialized_path=attrs['materialized'])
+
+            if existing is None:
+                inserts.append((file_node.stored_object, data))
+            else:
+                changed = {
+                    field: value for field, value in data.items()
+                    if field != 'last_touched' and before.get(field) != value
+                }
+                if changed:
+                    changed['last_touched'] = data['last_touched']
+                    updates.append((existing, data, changed))
+                else:
+                    existing.last_touched = before['last_touched']
+            seen[key] = file_node
+            reconciled.append(file_node)
+
+        if inserts:
+            collection.insert([data for _, data in inserts])
+        for existing, _, changed in updates:
+            collection.update({'_id': existing._id}, {'$set': changed})
+        for stored_object, data in inserts + [(existing, data) for existing, data, _ in updates]:
+            _mark_saved(stored_object, data)
+        return reconciled
+
     @classmethod
     def resolve_class(cls, provider, _type=2):
         """Resolve a provider and type to the appropriate subclass.
@@ -509,10 +617,11 @@ class File(FileNode):
         # TODO Switch back to head requests
         # return self.update(revision, json.loads(resp.headers['x-waterbutler-metadata']))
 
-    def update(self, revision, data, user=None):
+    def update(self, revision, data, user=None, save=True):
         """Using revision and data update all data pretaining to self
         :param str or None revision: The revision that data points to
         :param dict data: Metadata recieved from waterbutler
+        :param bool save: Whether to save self; the version is saved regardless
         :returns: FileVersion
         """
         self.name = data['name']
@@ -544,7 +653,8 @@ class File(FileNode):
         # Finally update last touched
         self.last_touched = datetime.datetime.utcnow()
 
-        self.save()
+        if save:
+            self.save()
         return version
 
     def get_download_count(self, version=None):
@@ -17,12 +17,11 @@ class PathFollowingFileNode(FileNode):
     FOLDER_ATTR_NAME = 'folder'
 
     @classmethod
-    def get_or_create(cls, node, path):
+    def get_stored_path(cls, node, path):
         """Forces path to extend to the add-on's root directory
         """
         node_settings = node.get_addon(cls.provider)
-        path = os.path.join(getattr(node_settings, cls.FOLDER_ATTR_NAME).strip('/'), path.lstrip('/'))
-        return super(PathFollowingFileNode, cls).get_or_create(node, '/' + path)
+        return '/' + os.path.join(getattr(node_settings, cls.FOLDER_ATTR_NAME).strip('/'), path.lstrip('/'))
 
     @property
     def path(self):
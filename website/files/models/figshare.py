@@ -18,13 +18,14 @@ class FigshareFile(FigshareFileNode, File):
     def touch(self, bearer, revision=None, **kwargs):
         return super(FigshareFile, self).touch(bearer, revision=None, **kwargs)
 
-    def update(self, revision, data, user=None):
+    def update(self, revision, data, user=None, save=True):
         """Figshare does not support versioning.
         Always pass revision as None to avoid conflict.
         """
         self.name = data['name']
         self.materialized_path = data['materialized']
-        self.save()
+        if save:
+            self.save()
 
         version = FileVersion(identifier=None)
         version.update_metadata(data, save=False)
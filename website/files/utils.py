@@ -48,6 +48,8 @@ class GenWrapper(object):
         """__getitem__ does not default to __getattr__
         so it must be explicitly overriden
         """
+        if isinstance(x, slice):
+            return [each.wrapped() for each in self.mqs[x]]
         return self.mqs[x].wrapped()
 
     def __len__(self):
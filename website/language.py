@@ -106,6 +106,11 @@ BEFORE_FORK_HAS_POINTERS = (
     'original project.'
 )
 
+FORK_ADDONS_PENDING = (
+    'Your fork has been created. Add-on settings are still being copied and '
+    'will be available shortly.'
+)
+
 REGISTRATION_INFO = '''
 
 <p>Registration creates a frozen version of the project that can never be
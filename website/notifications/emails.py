@@ -1,10 +1,16 @@
+from bson import ObjectId
 from babel import dates, core, Locale
+from modularodm import Q
+
+from framework.mongo import database
+from framework.tasks import app as celery_app
+from framework.tasks.handlers import enqueue_task
 
 from website import mails
+from website import settings
 from website import models as website_models
 from website.notifications import constants
 from website.notifications import utils
-from website.notifications.model import NotificationDigest
 from website.notifications.model import NotificationSubscription
 from website.util import web_url_for
 
@@ -43,6 +49,13 @@ def notify(event, user, node, timestamp, **context):
     return sent_users
 
 
+def use_async_fan_out():
+    """Whether digests should be rendered and stored in a background task.
+    Storing stays synchronous when Celery is disabled, e.g. in tests.
+    """
+    return settings.NOTIFICATIONS_ASYNC and settings.USE_CELERY
+
+
 def store_emails(recipient_ids, notification_type, event, user, node, timestamp, **context):
     """Store notification emails
 
@@ -59,26 +72,107 @@ def store_emails(recipient_ids, notification_type, event, user, node, timestamp,
     if notification_type == 'none':
         return
 
+    recipient_ids = [user_id for user_id in recipient_ids if user_id != user._id]
+    if not recipient_ids:
+        return
+
+    if use_async_fan_out():
+        context, user_keys = dump_context(context)
+        enqueue_task(fan_out.si(
+            recipient_ids, notification_type, event, user._id,
+            node._id if node else None, timestamp, context, user_keys,
+        ))
+    else:
+        store_digests(recipient_ids, notification_type, event, user, node, timestamp, **context)
+
+
+def store_digests(recipient_ids, notification_type, event, user, node, timestamp, **context):
+    """Render the message for each recipient and insert the digests in one
+    batch. Recipients are loaded with a single query, and the template is
+    rendered once per distinct timezone and locale, the only parts of the
+    message that differ between recipients.
+    """
     template = event + '.html.mako'
     context['user'] = user
     node_lineage_ids = get_node_lineage(node) if node else []
 
+    recipients = {
+        recipient._id: recipient
+        for recipient in website_models.User.find(Q('_id', 'in', recipient_ids))
+    }
+    messages = {}
+    digests = []
     for user_id in recipient_ids:
-        if user_id == user._id:
+        recipient = recipients.get(user_id)
+        if recipient is None:
             continue
-        recipient = website_models.User.load(user_id)
-        context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
-        message = mails.render_message(template, **context)
+        key = (recipient.timezone, recipient.locale)
+        if key not in messages:
+            context['localized_timestamp'] = localize_timestamp(timestamp, recipient)
+            messages[key] = mails.render_message(template, **context)
+        digests.append({
+            '_id': str(ObjectId()),
+            'user_id': user_id,
+            'timestamp': timestamp,
+            'send_type': notification_type,
+            'event': event,
+            'message': messages[key],
+            'node_lineage': node_lineage_ids,
+        })
+    if digests:
+        database['notificationdigest'].insert(digests)
 
-        digest = NotificationDigest(
-            timestamp=timestamp,
-            send_type=notification_type,
-            event=event,
-            user_id=user_id,
-            message=message,
-            node_lineage=node_lineage_ids
-        )
-        digest.save()
+
+def dump_context(context):
+    """Replace the users in a template context with their ids so that the
+    context can be passed to a task.
+
+    :return: Tuple of the new context and the keys that held users
+    """
+    dumped = dict(context)
+    user_keys = []
+    for key, value in context.items():
+        if isinstance(value, website_models.User):
+            dumped[key] = value._id
+            user_keys.append(key)
+    return dumped, user_keys
+
+
+def load_context(context, user_keys):
+    """Inverse of `dump_context`."""
+    loaded = dict(context)
+    for key in user_keys:
+        loaded[key] = website_models.User.load(context[key])
+    return loaded
+
+
+@celery_app.task(name='website.notifications.emails.fan_out', ignore_result=True)
+def fan_out(recipient_ids, notification_type, event, user_id, node_id, timestamp, context, user_keys):
+    user = website_models.User.load(user_id)
+    node = website_models.Node.load(node_id) if node_id else None
+    store_digests(recipient_ids, notification_type, event, user, node, timestamp,
+                  **load_context(context, user_keys))
+
+
+def prefetch_subscriptions(node, events):
+    """Load the ancestors of ``node``, their subscriptions to ``events`` and
+    the subscribed users with one query each, so that the loads made while
+    compiling subscriptions are served from the object cache.
+    """
+    ancestor_ids = list(node.ancestor_ids)
+    if ancestor_ids:
+        list(website_models.Node.find(Q('_id', 'in', ancestor_ids)))
+    keys = [
+        utils.to_subscription_key(node_id, event)
+        for node_id in ancestor_ids + [node._id]
+        for event in events
+    ]
+    user_ids = set()
+    for subscription in NotificationSubscription.find(Q('_id', 'in', keys)):
+        for notification_type in constants.NOTIFICATION_TYPES:
+            user_ids.update(getattr(subscription, notification_type)._to_primary_keys())
+    if user_ids:
+        list(website_models.User.find(Q('_id', 'in', list(user_ids))))
 
 
 def compile_subscriptions(node, event_type, event=None, level=0):
@@ -90,6 +184,8 @@ def compile_subscriptions(node, event_type, event=None, level=0):
     :param level: How deep the recursion is
     :return: a dict of notification types with lists of users.
     """
+    if level == 0 and node:
+        prefetch_subscriptions(node, [event_type, event] if event else [event_type])
     subscriptions = check_node(node, event_type)
     if event:
         subscriptions = check_node(node, event)  # Gets particular event subscriptions
@@ -128,6 +224,9 @@ def get_node_lineage(node):
     """ Get a list of node ids in order from the node to top most project
         e.g. [parent._id, node._id]
     """
+    if node.root_id is not None:
+        return list(node.ancestor_ids) + [node._id]
+
     lineage = [node._id]
 
     while node.parent_id:
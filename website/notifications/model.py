@@ -1,3 +1,4 @@
+import pymongo
 from modularodm import fields
 
 from framework.mongo import StoredObject, ObjectId
@@ -60,6 +61,16 @@ class NotificationSubscription(StoredObject):
 
 
 class NotificationDigest(StoredObject):
+    # Supports streaming each send type's digests grouped by user
+    __indices__ = [{
+        'unique': False,
+        'key_or_list': [
+            ('send_type', pymongo.ASCENDING),
+            ('user_id', pymongo.ASCENDING),
+            ('_id', pymongo.ASCENDING),
+        ]
+    }]
+
     _id = fields.StringField(primary=True, default=lambda: str(ObjectId()))
     user_id = fields.StringField(index=True)
     timestamp = fields.DateTimeField()
@@ -1,7 +1,10 @@
 """
 Tasks for making even transactional emails consolidated.
 """
-from bson.code import Code
+
+import itertools
+
+import pymongo
 from modularodm import Q
 
 from framework.tasks import app as celery_app
@@ -9,23 +12,31 @@ from framework.mongo import database as db
 from framework.auth.core import User
 from framework.sentry import log_exception
 
-from framework.transactions.context import TokuTransaction
-
+from website import mails
+from website import settings
 from website.notifications.utils import NotificationsDict
 from website.notifications.model import NotificationDigest
-from website import mails
+
+
+CHECKPOINT_COLLECTION = 'notificationdigestcheckpoint'
 
 
 @celery_app.task(name='notify.send_users_email', max_retries=0)
 def send_users_email(send_type):
     """Find pending Emails and amalgamates them into a single Email.
 
+    Digests are streamed one user at a time. Progress is checkpointed after
+    each email so that a run that dies part way resumes after the last user
+    emailed instead of emailing everyone again.
+
     :param send_type
     :return:
     """
-    grouped_emails = get_users_emails(send_type)
-    if not grouped_emails:
+    checkpoint = start_checkpoint(send_type)
+    if checkpoint is None:
         return
+    sent_ids = []
+    grouped_emails = iter_users_emails(send_type, after=checkpoint['user_id'], cutoff=checkpoint['cutoff'])
     for group in grouped_emails:
         user = User.load(group['user_id'])
         if not user:
@@ -41,15 +52,61 @@ def send_users_email(send_type):
                 mail=mails.DIGEST,
                 name=user.fullname,
                 message=sorted_messages,
-                callback=remove_notifications(email_notification_ids=notification_ids)
             )
+        sent_ids.extend(notification_ids)
+        save_checkpoint(send_type, group['user_id'])
+        if len(sent_ids) >= settings.NOTIFICATIONS_DELETE_BATCH_SIZE:
+            remove_notifications(email_notification_ids=sent_ids)
+            sent_ids = []
+    remove_notifications(email_notification_ids=sent_ids)
+    db[CHECKPOINT_COLLECTION].remove({'_id': send_type})
 
 
-def get_users_emails(send_type):
-    """Get all emails that need to be sent.
+def start_checkpoint(send_type):
+    """Return the checkpoint of the run sending ``send_type`` emails, creating
+    it if no earlier run was interrupted. A new run covers the digests stored
+    before it started. When resuming, the digests of users who were already
+    emailed are deleted first.
+
+    :return: Checkpoint document with the last digest id covered by the run
+        (``cutoff``) and the last user emailed (``user_id``), or None if
+        there is nothing to send
+    """
+    checkpoint = db[CHECKPOINT_COLLECTION].find_one({'_id': send_type})
+    if checkpoint is None:
+        latest = db['notificationdigest'].find_one(
+            {'send_type': send_type},
+            {'_id': True},
+            sort=[('_id', pymongo.DESCENDING)],
+        )
+        if latest is None:
+            return None
+        checkpoint = {'_id': send_type, 'cutoff': latest['_id'], 'user_id': None}
+        db[CHECKPOINT_COLLECTION].save(checkpoint)
+    elif checkpoint['user_id'] is not None:
+        NotificationDigest.remove(
+            Q('send_type', 'eq', send_type) &
+            Q('_id', 'lte', checkpoint['cutoff']) &
+            Q('user_id', 'lte', checkpoint['user_id'])
+        )
+    return checkpoint
+
+
+def save_checkpoint(send_type, user_id):
+    db[CHECKPOINT_COLLECTION].update({'_id': send_type}, {'$set': {'user_id': user_id}})
+
+
+def iter_users_emails(send_type, after=None, cutoff=None, page_size=None):
+    """Stream the emails that need to be sent, grouped by user in order of
+    user id. Digests are read a page at a time with a fresh query for each
+    page, so that no cursor is held open while emails are sent.
 
     :param send_type: from NOTIFICATION_TYPES
-    :return: [{
+    :param after: Only include users with ids greater than this
+    :param cutoff: Only include digests with ids up to this one
+    :param page_size: Digests read per query; defaults to
+        `NOTIFICATIONS_DIGEST_PAGE_SIZE`
+    :return: Iterator of {
                 'user_id': 'se8ea',
                 'info': [{
                     'message': {
@@ -60,31 +117,61 @@ def get_users_emails(send_type):
                     '_id': NotificationDigest._id
                 }, ...
                 }]
-              },
-              {
-                'user_id': ...
-              }]
+              }
     """
-    with TokuTransaction():
-        emails = db['notificationdigest'].group(
-            key={'user_id': 1},
-            condition={
-                'send_type': send_type
-            },
-            initial={'info': []},
-            reduce=Code(
-                """
-                function(curr, result) {
-                    result.info.push({
-                        'message': curr.message,
-                        'node_lineage': curr.node_lineage,
-                        '_id': curr._id
-                    });
-                };
-                """
-            )
-        )
-    return emails
+    page_size = page_size or settings.NOTIFICATIONS_DIGEST_PAGE_SIZE
+    query = {'send_type': send_type}
+    if cutoff is not None:
+        query['_id'] = {'$lte': cutoff}
+
+    def find(user_query, limit=0):
+        page_query = dict(query)
+        if user_query is not None:
+            page_query['user_id'] = user_query
+        return list(db['notificationdigest'].find(
+            page_query,
+            {'user_id': True, 'message': True, 'node_lineage': True},
+            sort=[('user_id', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)],
+            limit=limit,
+        ))
+
+    user_query = {'$gt': after} if after is not None else None
+    while True:
+        page = find(user_query, limit=page_size)
+        if not page:
+            return
+        groups = [
+            (user_id, list(user_digests))
+            for user_id, user_digests in itertools.groupby(page, key=lambda digest: digest['user_id'])
+        ]
+        if len(page) == page_size:
+            # The last user's digests may continue on the next page
+            if len(groups) == 1:
+                groups = [(groups[0][0], find(groups[0][0]))]
+            else:
+                groups.pop()
+        for user_id, user_digests in groups:
+            yield {
+                'user_id': user_id,
+                'info': [
+                    {
+                        'message': digest['message'],
+                        'node_lineage': digest['node_lineage'],
+                        '_id': digest['_id'],
+                    }
+                    for digest in user_digests
+                ],
+            }
+        user_query = {'$gt': groups[-1][0]}
+
+
+def get_users_emails(send_type):
+    """Get all emails that need to be sent, as a list. See
+    `iter_users_emails`.
+
+    :param send_type: from NOTIFICATION_TYPES
+    """
+    return list(iter_users_emails(send_type))
 
 
 def group_by_node(notifications):
@@ -105,5 +192,5 @@ def remove_notifications(email_notification_ids=None):
     :param email_notification_ids:
     :return:
     """
-    for email_id in email_notification_ids:
-        NotificationDigest.remove(Q('_id', 'eq', email_id))
+    if email_notification_ids:
+        NotificationDigest.remove(Q('_id', 'in', email_notification_ids))
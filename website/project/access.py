@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Request-scoped memoization of permission checks that walk the node
+hierarchy. Within a request, each node's ancestor chain is resolved once and
+each (node, user, permission) decision inherited from ancestors is computed
+once, however many children are checked.
+"""
+
+from modularodm import Q
+
+from framework.mongo import get_cache_key, dummy_request
+
+
+RESOLVER_ATTR = '_permission_resolver'
+
+
+class PermissionResolver(object):
+
+    def __init__(self):
+        self._parents = {}
+        self._decisions = {}
+
+    def clear(self):
+        self._parents.clear()
+        self._decisions.clear()
+
+    def get_parent(self, node):
+        try:
+            return self._parents[node._id]
+        except KeyError:
+            parent = node.parent_node
+            self._parents[node._id] = parent
+            return parent
+
+    def get_ancestors(self, node):
+        """Return the ancestors of ``node``, nearest first."""
+        if node.root_id is not None and node._id not in self._parents:
+            self._load_ancestors(node)
+        ancestors = []
+        parent = self.get_parent(node)
+        while parent is not None:
+            ancestors.append(parent)
+            parent = self.get_parent(parent)
+        return ancestors
+
+    def _load_ancestors(self, node):
+        """Fetch the whole ancestor chain of ``node`` in one query using its
+        materialized path. As with `Node.parent_node`, the chain stops below
+        the nearest deleted ancestor.
+        """
+        from website.project.model import Node
+        ancestor_ids = list(node.ancestor_ids)
+        loaded = {
+            ancestor._id: ancestor
+            for ancestor in Node.find(Q('_id', 'in', ancestor_ids))
+        } if ancestor_ids else {}
+        child = node
+        for ancestor_id in reversed(ancestor_ids):
+            ancestor = loaded.get(ancestor_id)
+            if ancestor is None or ancestor.is_deleted:
+                self._parents[child._id] = None
+                return
+            self._parents[child._id] = ancestor
+            child = ancestor
+        self._parents[child._id] = None
+
+    def is_admin_parent(self, node, user):
+        """Whether ``user`` is an admin on ``node`` or any of its ancestors."""
+        if user is None:
+            return False
+        key = (node._id, user._id, 'admin')
+        try:
+            return self._decisions[key]
+        except KeyError:
+            pass
+        if node.has_permission(user, 'admin', check_parent=False):
+            decision = True
+        else:
+            parent = self.get_parent(node)
+            decision = parent is not None and self.is_admin_parent(parent, user)
+        self._decisions[key] = decision
+        return decision
+
+    def filter_viewable(self, nodes, auth):
+        return [node for node in nodes if node.can_view(auth)]
+
+
+def get_resolver():
+    """Return the resolver for the current Flask or Django request. Outside
+    of a request, return a fresh resolver so that nothing is memoized across
+    calls.
+    """
+    key = get_cache_key()
+    if key is dummy_request:
+        return PermissionResolver()
+    resolver = getattr(key, RESOLVER_ATTR, None)
+    if resolver is None:
+        resolver = PermissionResolver()
+        setattr(key, RESOLVER_ATTR, resolver)
+    return resolver
+
+
+def invalidate():
+    """Forget memoized decisions for the current request, e.g. after a node's
+    permissions or position in the hierarchy change.
+    """
+    key = get_cache_key()
+    resolver = getattr(key, RESOLVER_ATTR, None)
+    if resolver is not None:
+        resolver.clear()
+
+
+def filter_viewable(nodes, auth):
+    """Return the nodes in ``nodes`` that ``auth`` may view."""
+    return get_resolver().filter_viewable(nodes, auth)
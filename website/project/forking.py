@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Forking of whole project trees. The nodes to fork are planned up front and
+each fork is written once; log references are shared with bulk updates rather
+than one back-reference write per log, and add-on settings are copied
+afterwards, in a background task when Celery is enabled.
+"""
+
+import logging
+import datetime
+from collections import defaultdict
+
+from framework import status
+from framework.mongo import database
+from framework.exceptions import PermissionsError
+from framework.guid.model import Guid
+from framework.tasks import app as celery_app
+from framework.tasks.handlers import enqueue_task
+
+from website import settings
+from website.exceptions import NodeStateError
+from website.util.permissions import CREATOR_PERMISSIONS
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+COMPLETE = 'complete'
+
+
+def use_async_addons():
+    """Whether add-on settings should be copied in a background task.
+    Copying stays synchronous when Celery is disabled, e.g. in tests.
+    """
+    return settings.FORK_ADDONS_ASYNC and settings.USE_CELERY
+
+
+def can_fork(node, user):
+    return node.is_public or node.has_permission(user, 'read')
+
+
+def plan_fork(original, user):
+    """Return ``(node, parent)`` pairs for everything to fork below
+    ``original``, parents before children and in the order of each parent's
+    `nodes`. Pointers are included but not descended into; deleted nodes and
+    nodes ``user`` may not fork are left out along with their descendants.
+    """
+    # Warm the object cache with one query for the whole subtree
+    list(original.get_primary_descendants())
+    plan = []
+    parents = [original]
+    while parents:
+        children = []
+        for parent in parents:
+            for node in parent.nodes:
+                if node.is_deleted:
+                    continue
+                if node.primary:
+                    if not can_fork(node, user):
+                        continue
+                    children.append(node)
+                plan.append((node, parent))
+        parents = children
+    return plan
+
+
+def _fork_one(original, auth, title, when, parent=None, guid=None):
+    """Create a fork of a single node, with no children or logs of its own
+    beyond the fork log, saved under the id of ``guid`` if given.
+    """
+    from website.project.model import NodeLog
+
+    # Note: Cloning a node copies its `wiki_pages_current` and
+    # `wiki_pages_versions` fields, but does not clone the underlying
+    # database objects to which these dictionaries refer. This means that
+    # the cloned node must pass itself to its wiki objects to build the
+    # correct URLs to that content.
+    forked = original.clone()
+    if parent is not None:
+        # Lets the first save record the materialized path below `parent`
+        forked.parent = parent
+
+    forked.tags = original.tags
+    forked.title = title + forked.title
+    forked.is_fork = True
+    forked.is_registration = False
+    # Progress of the original's own fork, if any, is not the fork's
+    forked.fork_status = {}
+    forked.forked_date = when
+    forked.forked_from = original
+    forked.creator = auth.user
+    forked.piwik_site_id = None
+
+    # Forks default to private status
+    forked.is_public = False
+
+    # Clear permissions before adding users
+    forked.permissions = {}
+    forked.visible_contributor_ids = []
+
+    forked.add_contributor(
+        contributor=auth.user,
+        permissions=CREATOR_PERMISSIONS,
+        log=False,
+        save=False
+    )
+
+    forked.add_log(
+        action=NodeLog.NODE_FORKED,
+        params={
+            'parent_node': original.parent_id,
+            'node': original._primary_key,
+            'registration': forked._primary_key,
+        },
+        auth=auth,
+        log_date=when,
+        save=False,
+    )
+    if guid is not None:
+        forked._id = guid._id
+    forked.save()
+    return forked
+
+
+def share_logs(original, forked):
+    """Give ``forked`` the logs of ``original``, followed by its own, with one
+    update to the fork and one multi-document update to the logs.
+    """
+    from website.project.model import NodeLog
+
+    log_ids = original.logs._to_primary_keys()
+    if not log_ids:
+        return
+    database['node'].update(
+        {'_id': forked._id},
+        {'$set': {'logs': log_ids + forked.logs._to_primary_keys()}},
+    )
+    database['nodelog'].update(
+        {'_id': {'$in': log_ids}},
+        {'$addToSet': {'__backrefs.logged.node.logs': forked._id}},
+        multi=True,
+    )
+    # Logs already loaded would otherwise keep their old back-references
+    NodeLog._clear_caches()
+    forked.reload()
+
+
+def fork_tree(original, auth, title='Fork of '):
+    """Fork ``original`` and every component ``auth.user`` may fork.
+
+    :param Node original: Node to fork
+    :param Auth auth: Consolidated authorization
+    :param str title: Text to prepend to the title of the top-level fork
+    :return: Forked node
+    """
+    user = auth.user
+    if not can_fork(original, user):
+        raise PermissionsError('{0!r} does not have permission to fork node {1!r}'.format(user, original._id))
+
+    when = datetime.datetime.utcnow()
+    original = original.load(original._primary_key)
+    if original.is_deleted:
+        raise NodeStateError('Cannot fork deleted node.')
+
+    plan = plan_fork(original, user)
+    # Reserve the ids of all forks with one insert
+    guids = iter(Guid.generate_many(
+        [(None, original._name)] * (1 + sum(1 for node, _ in plan if node.primary))
+    ))
+
+    forked = _fork_one(original, auth, title, when, guid=next(guids))
+    forks = [(original, forked)]
+    forks_by_original = {original._id: forked}
+    children = defaultdict(list)
+    for node, parent in plan:
+        parent_fork = forks_by_original[parent._id]
+        if node.primary:
+            child = _fork_one(node, auth, '', when, parent=parent_fork, guid=next(guids))
+            forks.append((node, child))
+            forks_by_original[node._id] = child
+        else:
+            child = node.fork_node()
+            if child is None:
+                continue
+        children[parent_fork._id].append(child)
+
+    for node, fork in forks:
+        if children[fork._id]:
+            fork.nodes.extend(children[fork._id])
+            fork.save()
+        share_logs(node, fork)
+
+    if use_async_addons():
+        forked.fork_status = {'state': PENDING, 'done': 0, 'total': len(forks), 'messages': []}
+        forked.save()
+        enqueue_task(copy_addons.si(forked._id, user._id))
+    else:
+        for message in copy_addons_to_tree(forked, user):
+            status.push_status_message(message, kind='info', trust=True)
+    return forked
+
+
+def copy_addons_to_tree(forked, user):
+    """Run each add-on's `after_fork` hook for every node in a fork tree,
+    recording progress on the top-level fork when a copy is pending.
+
+    :return: Messages returned by the add-ons
+    """
+    messages = []
+    pending = forked.fork_status.get('state') == PENDING
+    for done, fork in enumerate(forked.node_and_primary_descendants(), 1):
+        original = fork.forked_from
+        for addon in original.get_addons():
+            _, message = addon.after_fork(original, fork, user)
+            if message:
+                messages.append(message)
+        if pending:
+            forked.fork_status['done'] = done
+            forked.fork_status['messages'] = messages
+            forked.save()
+    if pending:
+        forked.fork_status['state'] = COMPLETE
+        forked.save()
+    return messages
+
+
+@celery_app.task(name='website.project.forking.copy_addons', ignore_result=True)
+def copy_addons(fork_id, user_id):
+    from framework.auth import User
+    from website.project.model import Node
+
+    forked = Node.load(fork_id)
+    user = User.load(user_id)
+    messages = copy_addons_to_tree(forked, user)
+    logger.info('Copied add-ons to fork {0} ({1} messages)'.format(fork_id, len(messages)))
@@ -54,6 +54,8 @@ from website.identifiers.model import IdentifierMixin
 from website.util.permissions import expand_permissions
 from website.util.permissions import CREATOR_PERMISSIONS, DEFAULT_CONTRIBUTOR_PERMISSIONS, ADMIN
 from website.project.metadata.schemas import OSF_META_SCHEMAS
+from website.project import access
+from website.project import forking
 from website.project import signals as project_signals
 
 logger = logging.getLogger(__name__)
@@ -266,6 +268,15 @@ class Comment(GuidStoredObject):
 @unique_on(['params.node', '_id'])
 class NodeLog(StoredObject):
 
+    __indices__ = [{
+        # Logs of a node, newest first; see `User.get_recent_log_ids`
+        'unique': False,
+        'key_or_list': [
+            ('__backrefs.logged.node.logs', pymongo.ASCENDING),
+            ('_id', pymongo.ASCENDING),
+        ]
+    }]
+
     _id = fields.StringField(primary=True, default=lambda: str(ObjectId()))
 
     date = fields.DateTimeField(default=datetime.datetime.utcnow, index=True)
@@ -555,6 +566,11 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             ('is_public', pymongo.ASCENDING),
             ('is_deleted', pymongo.ASCENDING),
         ]
+    }, {
+        'unique': False,
+        'key_or_list': [
+            ('ancestor_ids', pymongo.ASCENDING),
+        ]
     }]
 
     # Node fields that trigger an update to Solr on save
@@ -574,6 +590,12 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         'is_retracted',
     }
 
+    # Fields denormalized into the search documents of primary children
+    SEARCH_PARENT_FIELDS = {
+        'title',
+        'is_public',
+    }
+
     # Maps category identifier => Human-readable representation for use in
     # titles, menus, etc.
     # Use an OrderedDict so that menu items show in the correct order
@@ -605,6 +627,8 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
     _id = fields.StringField(primary=True)
 
     date_created = fields.DateTimeField(auto_now_add=datetime.datetime.utcnow, index=True)
+    # Date of the most recent log; kept up to date by `add_log`
+    date_modified = fields.DateTimeField(index=True)
 
     # Privacy
     is_public = fields.BooleanField(default=False, index=True)
@@ -666,7 +690,15 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
     system_tags = fields.StringField(list=True)
 
     nodes = fields.AbstractForeignField(list=True, backref='parent')
+    # Materialized path through primary parents: ids of the ancestors of this
+    # node, root first, and the id of the root. Kept up to date by `save` and
+    # `update_ancestry`; `root_id` is None for nodes not yet backfilled.
+    ancestor_ids = fields.StringField(list=True)
+    root_id = fields.StringField(index=True)
     forked_from = fields.ForeignField('node', backref='forked', index=True)
+    # Progress of copying add-on settings to a fork tree, set on the
+    # top-level fork while the copy runs in the background
+    fork_status = fields.DictionaryField()
     registered_from = fields.ForeignField('node', backref='registrations', index=True)
 
     # The node (if any) used as a template for this node's creation
@@ -865,11 +897,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
                 yield contrib
 
     def is_admin_parent(self, user):
-        if self.has_permission(user, 'admin', check_parent=False):
-            return True
-        if self.parent_node:
-            return self.parent_node.is_admin_parent(user)
-        return False
+        return access.get_resolver().is_admin_parent(self, user)
 
     def can_view(self, auth):
         if not auth and not self.is_public:
@@ -936,6 +964,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             if permission in self.permissions[user._id]:
                 raise ValueError('User already has permission {0}'.format(permission))
             self.permissions[user._id].append(permission)
+        access.invalidate()
         if save:
             self.save()
 
@@ -951,6 +980,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             self.permissions[user._id].remove(permission)
         except (KeyError, ValueError):
             raise ValueError('User does not have permission {0}'.format(permission))
+        access.invalidate()
         if save:
             self.save()
 
@@ -969,11 +999,13 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
                     user._id, self._id,
                 )
             )
+        access.invalidate()
         if save:
             self.save()
 
     def set_permissions(self, user, permissions, save=False):
         self.permissions[user._id] = permissions
+        access.invalidate()
         if save:
             self.save()
 
@@ -1048,9 +1080,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
     @property
     def parents(self):
-        if self.parent_node:
-            return [self.parent_node] + self.parent_node.parents
-        return []
+        return access.get_resolver().get_ancestors(self)
 
     @property
     def admin_contributor_ids(self, contributors=None):
@@ -1220,7 +1250,26 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         else:
             suppress_log = False
 
+        if self.date_modified is None:
+            # Not yet backfilled by scripts/migrate_node_date_modified.py
+            latest_log = self.logs[-1] if self.logs else None
+            if latest_log is not None and latest_log.date:
+                self.date_modified = latest_log.date
+            else:
+                self.date_modified = self.date_created or datetime.datetime.utcnow()
+
+        if first_save:
+            # Clones carry the path of the original; start from the parent
+            # passed on creation, or as a root until appended to one
+            self._set_ancestry(getattr(self, 'parent', None))
+
         saved_fields = super(Node, self).save(*args, **kwargs)
+        if saved_fields:
+            access.invalidate()
+
+        if first_save or 'nodes' in saved_fields:
+            for child in self.nodes_primary:
+                child.update_ancestry(parent=self)
 
         if first_save and is_original and not suppress_log:
             # TODO: This logic also exists in self.use_as_template()
@@ -1259,6 +1308,8 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             need_update = False
         if need_update:
             self.update_search()
+        if not first_save and not self.is_folder and self.SEARCH_PARENT_FIELDS.intersection(saved_fields):
+            self.update_children_search()
 
         # This method checks what has changed.
         if settings.PIWIK_HOST and update_piwik:
@@ -1476,7 +1527,48 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
         :param node Node: target Node
         """
-        return itertools.chain([self], self.get_descendants_recursive(lambda n: n.primary))
+        return itertools.chain([self], self.get_primary_descendants())
+
+    def get_primary_descendants(self):
+        """Return all primary (non-pointer) descendants of this node, deleted
+        or not, in no particular order. Uses the materialized path when it is
+        available, falling back to walking the tree.
+        """
+        if self.root_id is None:
+            return list(self.get_descendants_recursive(lambda n: n.primary))
+        return Node.find(Q('ancestor_ids', 'eq', self._id))
+
+    def _set_ancestry(self, parent):
+        if parent is not None and parent.root_id is None:
+            # The parent's path is unknown until it is backfilled; leave this
+            # node unmigrated too so that its parents are walked instead
+            self.ancestor_ids = []
+            self.root_id = None
+        elif parent is not None:
+            self.ancestor_ids = list(parent.ancestor_ids) + [parent._id]
+            self.root_id = parent.root_id
+        else:
+            self._ensure_guid()
+            self.ancestor_ids = []
+            self.root_id = self._id
+
+    def update_ancestry(self, parent=None):
+        """Recompute the materialized path of this node from ``parent``, or
+        from its current primary parent if not given, and propagate any
+        change to its primary descendants.
+
+        :return: Whether the path of this node changed
+        """
+        if parent is None and self.node__parent:
+            parent = self.node__parent[0]
+        ancestor_ids, root_id = list(self.ancestor_ids), self.root_id
+        self._set_ancestry(parent)
+        if list(self.ancestor_ids) == ancestor_ids and self.root_id == root_id:
+            return False
+        self.save(update_piwik=False)
+        for child in self.nodes_primary:
+            child.update_ancestry(parent=self)
+        return True
 
     @property
     def depth(self):
@@ -1509,7 +1601,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
     def get_aggregate_logs_queryset(self, auth):
         ids = [self._id] + [n._id
-                            for n in self.get_descendants_recursive()
+                            for n in self.get_primary_descendants()
                             if n.can_view(auth)]
         query = Q('__backrefs.logged.node.logs', 'in', ids)
         return NodeLog.find(query).sort('-_id')
@@ -1630,16 +1722,6 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         """
         return list(reversed(self.logs)[:n])
 
-    @property
-    def date_modified(self):
-        '''The most recent datetime when this node was modified, based on
-        the logs.
-        '''
-        try:
-            return self.logs[-1].date
-        except IndexError:
-            return self.date_created
-
     def set_title(self, title, auth, save=False):
         """Set the title of this Node and log it.
 
@@ -1699,12 +1781,38 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
 
     def update_search(self):
         from website import search
+        from website.search import tasks as search_tasks
+        if search_tasks.use_index_queue():
+            search_tasks.enqueue_node(self._id)
+            return
         try:
             search.search.update_node(self)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception()
 
+    def update_children_search(self):
+        """Refresh the parent info stored in the search documents of this
+        node's public primary children.
+        """
+        from website import search
+        from website.search import tasks as search_tasks
+        children = [
+            child for child in self.nodes_primary
+            if child.is_public and not child.is_deleted and not child.archiving
+        ]
+        if not children:
+            return
+        if search_tasks.use_index_queue():
+            for child in children:
+                search_tasks.enqueue_node(child._id)
+            return
+        try:
+            search.search.update_parent_info(children)
+        except search.exceptions.SearchUnavailableError as e:
+            logger.exception(e)
+            log_exception()
+
     @classmethod
     def bulk_update_search(cls, nodes):
         from website import search
@@ -1724,14 +1832,13 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             log_exception()
 
     def delete_registration_tree(self, save=False):
-        self.is_deleted = True
-        if not getattr(self.embargo, 'for_existing_registration', False):
-            self.registered_from = None
-        if save:
-            self.save()
-        self.update_search()
-        for child in self.nodes_primary:
-            child.delete_registration_tree(save=save)
+        for node in self.node_and_primary_descendants():
+            node.is_deleted = True
+            if not getattr(node.embargo, 'for_existing_registration', False):
+                node.registered_from = None
+            if save:
+                node.save()
+            node.update_search()
 
     def remove_node(self, auth, date=None):
         """Marks a node as deleted.
@@ -1799,88 +1906,13 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
         return True
 
     def fork_node(self, auth, title='Fork of '):
-        """Recursively fork a node.
+        """Recursively fork a node. See `website.project.forking`.
 
         :param Auth auth: Consolidated authorization
         :param str title: Optional text to prepend to forked title
         :return: Forked node
         """
-        user = auth.user
-
-        # Non-contributors can't fork private nodes
-        if not (self.is_public or self.has_permission(user, 'read')):
-            raise PermissionsError('{0!r} does not have permission to fork node {1!r}'.format(user, self._id))
-
-        when = datetime.datetime.utcnow()
-
-        original = self.load(self._primary_key)
-
-        if original.is_deleted:
-            raise NodeStateError('Cannot fork deleted node.')
-
-        # Note: Cloning a node copies its `wiki_pages_current` and
-        # `wiki_pages_versions` fields, but does not clone the underlying
-        # database objects to which these dictionaries refer. This means that
-        # the cloned node must pass itself to its wiki objects to build the
-        # correct URLs to that content.
-        forked = original.clone()
-
-        forked.logs = self.logs
-        forked.tags = self.tags
-
-        # Recursively fork child nodes
-        for node_contained in original.nodes:
-            if not node_contained.is_deleted:
-                forked_node = None
-                try:  # Catch the potential PermissionsError above
-                    forked_node = node_contained.fork_node(auth=auth, title='')
-                except PermissionsError:
-                    pass  # If this exception is thrown omit the node from the result set
-                if forked_node is not None:
-                    forked.nodes.append(forked_node)
-
-        forked.title = title + forked.title
-        forked.is_fork = True
-        forked.is_registration = False
-        forked.forked_date = when
-        forked.forked_from = original
-        forked.creator = user
-        forked.piwik_site_id = None
-
-        # Forks default to private status
-        forked.is_public = False
-
-        # Clear permissions before adding users
-        forked.permissions = {}
-        forked.visible_contributor_ids = []
-
-        forked.add_contributor(
-            contributor=user,
-            permissions=CREATOR_PERMISSIONS,
-            log=False,
-            save=False
-        )
-
-        forked.add_log(
-            action=NodeLog.NODE_FORKED,
-            params={
-                'parent_node': original.parent_id,
-                'node': original._primary_key,
-                'registration': forked._primary_key,
-            },
-            auth=auth,
-            log_date=when,
-            save=False,
-        )
-
-        forked.save()
-        # After fork callback
-        for addon in original.get_addons():
-            _, message = addon.after_fork(original, forked, user)
-            if message:
-                status.push_status_message(message, kind='info', trust=True)
-
-        return forked
+        return forking.fork_tree(self, auth, title=title)
 
     def register_node(self, schema, auth, template, data, parent=None):
         """Make a frozen copy of a node.
@@ -2009,6 +2041,7 @@ class Node(GuidStoredObject, AddonModelMixin, IdentifierMixin):
             log.date = log_date
         log.save()
         self.logs.append(log)
+        self.date_modified = log.date
         if save:
             self.save()
         if user:
@@ -39,6 +39,7 @@ from website import settings
 from website.views import _render_nodes, find_dashboard, validate_page_num
 from website.profile import utils
 from website.project import new_folder
+from website.project import forking
 from website.util.sanitize import strip_html
 from website.util import rapply
 
@@ -260,9 +261,23 @@ def node_fork_page(auth, node, **kwargs):
             http.FORBIDDEN,
             redirect_url=node.url
         )
+    if fork.fork_status.get('state') == forking.PENDING:
+        status.push_status_message(language.FORK_ADDONS_PENDING, kind='info', trust=False)
     return fork.url
 
 
+@must_be_valid_project
+@must_be_contributor_or_public
+def node_fork_status(auth, node, **kwargs):
+    """Progress of copying add-on settings to a new fork."""
+    return {
+        'state': node.fork_status.get('state', forking.COMPLETE),
+        'done': node.fork_status.get('done'),
+        'total': node.fork_status.get('total'),
+        'messages': node.fork_status.get('messages', []),
+    }
+
+
 @must_be_valid_project
 @must_be_contributor_or_public
 def node_registrations(auth, node, **kwargs):
@@ -168,6 +168,11 @@ def make_url_map(app):
         Rule('/robots.txt', 'get', robots, json_renderer),
     ])
 
+    # Process status
+    process_rules(app, [
+        Rule('/api/v1/status/mongo/', 'get', website_views.mongo_pool_status, json_renderer),
+    ])
+
     ### Base ###
 
     process_rules(app, [
@@ -1258,6 +1263,12 @@ def make_url_map(app):
                 '/project/<pid>/node/<nid>/fork/',
             ], 'post', project_views.node.node_fork_page, json_renderer,
         ),
+        Rule(
+            [
+                '/project/<pid>/fork/status/',
+                '/project/<pid>/node/<nid>/fork/status/',
+            ], 'get', project_views.node.node_fork_status, json_renderer,
+        ),
         Rule(
             [
                 '/project/<pid>/pointer/fork/',
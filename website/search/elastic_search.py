@@ -3,7 +3,7 @@
 from __future__ import division
 
 import re
-import copy
+import json
 import math
 import logging
 import unicodedata
@@ -19,7 +19,10 @@ from elasticsearch import (
     helpers,
 )
 
+from modularodm import Q
+
 from framework import sentry
+from framework.cache import TTLCache
 
 from website import settings
 from website.filters import gravatar
@@ -86,40 +89,52 @@ def requires_search(func):
     return wrapped
 
 
-@requires_search
-def get_counts(count_query, clean=True):
-    count_query['aggregations'] = {
-        'counts': {
-            'terms': {
-                'field': '_type',
-            }
+AGGREGATIONS = {
+    'counts': {
+        'terms': {
+            'field': '_type',
         }
-    }
+    },
+    'tag_cloud': {
+        'terms': {'field': 'tags'}
+    },
+}
+
+#: Short-lived cache of formatted search results, keyed on the normalized query
+_search_cache = TTLCache(
+    maxsize=settings.SEARCH_RESULT_CACHE_SIZE,
+    ttl=settings.SEARCH_RESULT_CACHE_TTL,
+)
+
+
+def clear_search_cache():
+    _search_cache.clear()
+
 
-    res = es.search(index=INDEX, doc_type=None, search_type='count', body=count_query)
-    counts = {x['key']: x['doc_count'] for x in res['aggregations']['counts']['buckets'] if x['key'] in ALIASES.keys()}
+def parse_counts(aggregations):
+    counts = {x['key']: x['doc_count'] for x in aggregations['counts']['buckets'] if x['key'] in ALIASES.keys()}
 
     counts['total'] = sum([val for val in counts.values()])
     return counts
 
 
-@requires_search
-def get_tags(query, index):
-    query['aggregations'] = {
-        'tag_cloud': {
-            'terms': {'field': 'tags'}
-        }
+def build_aggregation_query(query):
+    """Return a copy of ``query`` without paging or sorting, carrying the tag
+    cloud and type count aggregations.
+    """
+    agg_query = {
+        key: value
+        for key, value in query.items()
+        if key not in ('from', 'size', 'sort', 'aggregations', 'aggs')
     }
-
-    results = es.search(index=index, doc_type=None, body=query)
-    tags = results['aggregations']['tag_cloud']['buckets']
-
-    return tags
+    agg_query['aggregations'] = AGGREGATIONS
+    return agg_query
 
 
 @requires_search
 def search(query, index=None, doc_type='_all'):
-    """Search for a query
+    """Search for a query. Tags, counts and hits are fetched with a single
+    multi-search request.
 
     :param query: The substring of the username/project name/tag to search for
     :param index:
@@ -132,45 +147,69 @@ def search(query, index=None, doc_type='_all'):
         typeAliases: the doc_types that exist in the search database
     """
     index = index or INDEX
-    tag_query = copy.deepcopy(query)
-    count_query = copy.deepcopy(query)
-
-    for key in ['from', 'size', 'sort']:
-        try:
-            del tag_query[key]
-            del count_query[key]
-        except KeyError:
-            pass
-
-    tags = get_tags(tag_query, index)
-    counts = get_counts(count_query, index)
 
-    # Run the real query and get the results
-    raw_results = es.search(index=index, doc_type=doc_type, body=query)
+    cache_key = None
+    if _search_cache.enabled:
+        cache_key = (index, doc_type, json.dumps(query, sort_keys=True, default=str))
+        cached = _search_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+
+    hits_header = {'index': index}
+    if doc_type and doc_type != '_all':
+        hits_header['type'] = doc_type
+    body = [
+        {'index': index, 'search_type': 'count'},
+        build_aggregation_query(query),
+        hits_header,
+        query,
+    ]
+    agg_response, raw_results = es.msearch(body=body)['responses']
+    for response in (agg_response, raw_results):
+        if 'error' in response:
+            if 'ParseException' in response['error']:
+                raise exceptions.MalformedQueryError(response['error'])
+            raise exceptions.SearchException(response['error'])
 
     results = [hit['_source'] for hit in raw_results['hits']['hits']]
     return_value = {
         'results': format_results(results),
-        'counts': counts,
-        'tags': tags,
+        'counts': parse_counts(agg_response['aggregations']),
+        'tags': agg_response['aggregations']['tag_cloud']['buckets'],
         'typeAliases': ALIASES
     }
-    return return_value
+    if cache_key is not None:
+        _search_cache.set(cache_key, return_value)
+    return dict(return_value)
 
 
 def format_results(results):
+    # Documents indexed before parent info was denormalized need their
+    # parents loaded; do so in a single query
+    parent_ids = [
+        result['parent_id']
+        for result in results
+        if result.get('category') in {'project', 'component', 'registration'}
+        and result.get('parent_id') and 'parent_info' not in result
+    ]
+    parents = load_parents(parent_ids)
     ret = []
     for result in results:
         if result.get('category') == 'user':
             result['url'] = '/profile/' + result['id']
         elif result.get('category') in {'project', 'component', 'registration'}:
-            result = format_result(result, result.get('parent_id'))
+            if 'parent_info' in result:
+                parent_info = result['parent_info']
+            else:
+                parent_info = parents.get(result.get('parent_id'))
+            result = format_result(result, parent_info=parent_info)
         ret.append(result)
     return ret
 
 
-def format_result(result, parent_id=None):
-    parent_info = load_parent(parent_id)
+def format_result(result, parent_id=None, parent_info=None):
+    if parent_info is None and parent_id is not None:
+        parent_info = load_parent(parent_id)
     formatted_result = {
         'contributors': result['contributors'],
         'wiki_link': result['url'] + 'wiki/',
@@ -197,12 +236,12 @@ def format_result(result, parent_id=None):
     return formatted_result
 
 
-def load_parent(parent_id):
-    parent = Node.load(parent_id)
-    if parent is None:
-        return None
+def serialize_parent(parent):
+    """Return the parent fields shown with a component's search result.
+    Private parents are masked.
+    """
     parent_info = {}
-    if parent is not None and parent.is_public:
+    if parent.is_public:
         parent_info['title'] = parent.title
         parent_info['url'] = parent.url
         parent_info['is_registration'] = parent.is_registration
@@ -215,6 +254,32 @@ def load_parent(parent_id):
     return parent_info
 
 
+def load_parent(parent_id):
+    parent = Node.load(parent_id)
+    if parent is None:
+        return None
+    return serialize_parent(parent)
+
+
+def load_parents(parent_ids):
+    """Load the parents of several results at once.
+
+    :return: Dictionary mapping parent ids to serialized parent info
+    """
+    if not parent_ids:
+        return {}
+    parents = Node.find(Q('_id', 'in', list(set(parent_ids))))
+    return {parent._id: serialize_parent(parent) for parent in parents}
+
+
+def serialize_parent_info(node):
+    """Partial document refreshing the denormalized parent of ``node``."""
+    parent = node.node__parent[0] if node.node__parent else None
+    return {
+        'parent_info': serialize_parent(parent) if parent else None,
+    }
+
+
 COMPONENT_CATEGORIES = set([k for k in Node.CATEGORY_MAP.keys() if not k == 'project'])
 
 def get_doctype_from_node(node):
@@ -227,72 +292,107 @@ def get_doctype_from_node(node):
         return node.category
 
 
+def is_indexable(node):
+    return not (node.is_deleted or not node.is_public or node.archiving)
+
+
+def serialize_node(node, category):
+    from website.addons.wiki.model import NodeWikiPage
+
+    elastic_document_id = node._id
+    if category == 'project':
+        parent_id = None
+        parent_info = None
+    else:
+        parent = node.node__parent[0] if node.node__parent else None
+        parent_id = parent._primary_key if parent else None
+        parent_info = serialize_parent(parent) if parent else None
+
+    try:
+        normalized_title = six.u(node.title)
+    except TypeError:
+        normalized_title = node.title
+    normalized_title = unicodedata.normalize('NFKD', normalized_title).encode('ascii', 'ignore')
+
+    elastic_document = {
+        'id': elastic_document_id,
+        'contributors': [
+            {
+                'fullname': x.fullname,
+                'url': x.profile_url if x.is_active else None
+            }
+            for x in node.visible_contributors
+            if x is not None
+        ],
+        'title': node.title,
+        'normalized_title': normalized_title,
+        'category': category,
+        'public': node.is_public,
+        'tags': [tag._id for tag in node.tags if tag],
+        'description': node.description,
+        'url': node.url,
+        'is_registration': node.is_registration,
+        'is_pending_registration': node.is_pending_registration,
+        'is_retracted': node.is_retracted,
+        'is_pending_retraction': node.is_pending_retraction,
+        'embargo_end_date': node.embargo_end_date.strftime("%A, %b. %d, %Y") if node.embargo_end_date else False,
+        'is_pending_embargo': node.is_pending_embargo,
+        'registered_date': node.registered_date,
+        'wikis': {},
+        'parent_id': parent_id,
+        # Denormalized so that rendering results needs no database reads
+        'parent_info': parent_info,
+        'date_created': node.date_created,
+        'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
+    }
+    if not node.is_retracted:
+        for wiki in [
+            NodeWikiPage.load(x)
+            for x in node.wiki_pages_current.values()
+        ]:
+            elastic_document['wikis'][wiki.page_name] = wiki.raw_text(node)
+
+    return elastic_document
+
+
 @requires_search
 def update_node(node, index=None, bulk=False):
     index = index or INDEX
-    from website.addons.wiki.model import NodeWikiPage
 
     category = get_doctype_from_node(node)
 
-    if category == 'project':
-        elastic_document_id = node._id
-        parent_id = None
-    else:
-        try:
-            elastic_document_id = node._id
-            parent_id = node.parent_id
-        except IndexError:
-            # Skip orphaned components
-            return
-    if node.is_deleted or not node.is_public or node.archiving:
-        delete_doc(elastic_document_id, node)
+    if not is_indexable(node):
+        delete_doc(node._id, node)
     else:
-        try:
-            normalized_title = six.u(node.title)
-        except TypeError:
-            normalized_title = node.title
-        normalized_title = unicodedata.normalize('NFKD', normalized_title).encode('ascii', 'ignore')
-
-        elastic_document = {
-            'id': elastic_document_id,
-            'contributors': [
-                {
-                    'fullname': x.fullname,
-                    'url': x.profile_url if x.is_active else None
-                }
-                for x in node.visible_contributors
-                if x is not None
-            ],
-            'title': node.title,
-            'normalized_title': normalized_title,
-            'category': category,
-            'public': node.is_public,
-            'tags': [tag._id for tag in node.tags if tag],
-            'description': node.description,
-            'url': node.url,
-            'is_registration': node.is_registration,
-            'is_pending_registration': node.is_pending_registration,
-            'is_retracted': node.is_retracted,
-            'is_pending_retraction': node.is_pending_retraction,
-            'embargo_end_date': node.embargo_end_date.strftime("%A, %b. %d, %Y") if node.embargo_end_date else False,
-            'is_pending_embargo': node.is_pending_embargo,
-            'registered_date': node.registered_date,
-            'wikis': {},
-            'parent_id': parent_id,
-            'date_created': node.date_created,
-            'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
-        }
-        if not node.is_retracted:
-            for wiki in [
-                NodeWikiPage.load(x)
-                for x in node.wiki_pages_current.values()
-            ]:
-                elastic_document['wikis'][wiki.page_name] = wiki.raw_text(node)
-
+        elastic_document = serialize_node(node, category)
         if bulk:
             return elastic_document
         else:
-            es.index(index=index, doc_type=category, id=elastic_document_id, body=elastic_document, refresh=True)
+            es.index(index=index, doc_type=category, id=node._id, body=elastic_document, refresh=True)
+
+
+@requires_search
+def bulk_index_nodes(nodes, index=None):
+    """Index or remove each of ``nodes`` in a single bulk request. Documents
+    become searchable at the next scheduled index refresh.
+    """
+    index = index or INDEX
+    actions = []
+    for node in nodes:
+        category = get_doctype_from_node(node)
+        action = {
+            '_index': index,
+            '_id': node._id,
+            '_type': category,
+        }
+        if is_indexable(node):
+            action.update({'_op_type': 'index', '_source': serialize_node(node, category)})
+        else:
+            action['_op_type'] = 'delete'
+        actions.append(action)
+    if actions:
+        # Deleting documents that were never indexed is not an error
+        return helpers.bulk(es, actions, raise_on_error=False)
 
 
 def bulk_update_nodes(serialize, nodes, index=INDEX):
@@ -317,6 +417,24 @@ def bulk_update_nodes(serialize, nodes, index=INDEX):
     if actions:
         return helpers.bulk(es, actions)
 
+@requires_search
+def update_parent_info(nodes, index=None):
+    """Refresh the denormalized parent info of ``nodes`` in place."""
+    index = index or INDEX
+    actions = [
+        {
+            '_op_type': 'update',
+            '_index': index,
+            '_id': node._id,
+            '_type': get_doctype_from_node(node),
+            'doc': serialize_parent_info(node),
+        }
+        for node in nodes
+    ]
+    if actions:
+        # Children missing from the index are skipped rather than failing
+        return helpers.bulk(es, actions, raise_on_error=False)
+
 def serialize_contributors(node):
     return {
         'contributors': [
@@ -410,6 +528,8 @@ def create_index(index=None):
             analyzers = {field: ENGLISH_ANALYZER_PROPERTY
                          for field in analyzed_fields}
             mapping['properties'].update(analyzers)
+            # Stored for display only; never searched
+            mapping['properties']['parent_info'] = {'type': 'object', 'enabled': False}
 
         if type_ == 'user':
             fields = {
@@ -29,11 +29,21 @@ def update_node(node, index=None, bulk=False):
     index = index or settings.ELASTIC_INDEX
     return search_engine.update_node(node, index=index, bulk=bulk)
 
+@requires_search
+def bulk_index_nodes(nodes, index=None):
+    index = index or settings.ELASTIC_INDEX
+    return search_engine.bulk_index_nodes(nodes, index=index)
+
 @requires_search
 def bulk_update_nodes(serialize, nodes, index=None):
     index = index or settings.ELASTIC_INDEX
     search_engine.bulk_update_nodes(serialize, nodes, index=index)
 
+@requires_search
+def update_parent_info(nodes, index=None):
+    index = index or settings.ELASTIC_INDEX
+    search_engine.update_parent_info(nodes, index=index)
+
 @requires_search
 def delete_node(node, index=None):
     index = index or settings.ELASTIC_INDEX
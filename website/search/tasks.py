@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Background search indexing. Saving a node only records its id in a queue
+collection; a periodic task coalesces repeated updates to the same node and
+sends them to the search engine in bulk.
+"""
+
+import logging
+import datetime
+
+from modularodm import Q
+
+from framework.mongo import database
+from framework.tasks import app as celery_app
+
+from website import settings
+
+
+logger = logging.getLogger(__name__)
+
+QUEUE_COLLECTION = 'searchindexqueue'
+
+
+def use_index_queue():
+    """Whether node updates should be queued rather than indexed inline.
+    Indexing stays synchronous when Celery is disabled, e.g. in tests.
+    """
+    return settings.SEARCH_INDEX_ASYNC and settings.USE_CELERY
+
+
+def enqueue_node(node_id):
+    """Queue a node for reindexing. Queuing a node that is already pending
+    only refreshes its timestamp, so it is indexed once per flush.
+    """
+    database[QUEUE_COLLECTION].update(
+        {'_id': node_id},
+        {'$set': {'queued': datetime.datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def _dequeue(entries):
+    """Remove processed entries, keeping any that were queued again while
+    the batch was being indexed.
+    """
+    database[QUEUE_COLLECTION].remove({
+        '$or': [
+            {'_id': entry['_id'], 'queued': entry['queued']}
+            for entry in entries
+        ]
+    })
+
+
+def flush_queue(batch_size=None):
+    """Index every queued node in batches.
+
+    :return: Number of nodes indexed
+    """
+    from website.models import Node
+    from website.search import search
+    from website.search.exceptions import SearchUnavailableError
+
+    batch_size = batch_size or settings.SEARCH_INDEX_BATCH_SIZE
+    collection = database[QUEUE_COLLECTION]
+    cutoff = datetime.datetime.utcnow()
+    flushed = 0
+    while True:
+        entries = list(
+            collection.find({'queued': {'$lte': cutoff}})
+            .sort('queued', 1)
+            .limit(batch_size)
+        )
+        if not entries:
+            break
+        node_ids = [entry['_id'] for entry in entries]
+        nodes = list(Node.find(Q('_id', 'in', node_ids)))
+        try:
+            search.bulk_index_nodes(nodes)
+        except SearchUnavailableError as error:
+            # Leave the batch queued for the next flush
+            logger.exception(error)
+            break
+        _dequeue(entries)
+        flushed += len(entries)
+    return flushed
+
+
+@celery_app.task(name='search.flush_index_queue', ignore_result=True)
+def flush_index_queue():
+    flushed = flush_queue()
+    if flushed:
+        logger.info('Indexed {0} queued nodes'.format(flushed))
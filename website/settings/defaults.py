@@ -26,6 +26,10 @@ STATIC_URL_PATH = '/static'
 ASSET_HASH_PATH = os.path.join(APP_PATH, 'webpack-assets.json')
 ROOT = os.path.join(BASE_PATH, '..')
 BCRYPT_LOG_ROUNDS = 12
+# Seconds to skip bcrypt for a password that was just found correct, for
+# clients sending HTTP Basic auth credentials with every request. 0 disables.
+PASSWORD_CACHE_TTL = 60
+PASSWORD_CACHE_SIZE = 1000
 
 # Hours before email confirmation tokens expire
 EMAIL_TOKEN_EXPIRATION = 24
@@ -67,6 +71,15 @@ SEARCH_ENGINE = 'elastic'  # Can be 'elastic', or None
 ELASTIC_URI = 'localhost:9200'
 ELASTIC_TIMEOUT = 10
 ELASTIC_INDEX = 'website'
+# Seconds to cache formatted search results per normalized query; 0 disables
+SEARCH_RESULT_CACHE_TTL = 0
+SEARCH_RESULT_CACHE_SIZE = 512
+# Queue node search updates and index them in bulk from a periodic Celery task
+# instead of during the request. Ignored (indexing is synchronous) when
+# USE_CELERY is off.
+SEARCH_INDEX_ASYNC = True
+SEARCH_INDEX_FLUSH_INTERVAL = 10  # seconds
+SEARCH_INDEX_BATCH_SIZE = 500
 SHARE_ELASTIC_URI = ELASTIC_URI
 SHARE_ELASTIC_INDEX = 'share'
 # For old indices
@@ -79,6 +92,18 @@ COOKIE_NAME = 'osf'
 # TODO: Override SECRET_KEY in local.py in production
 SECRET_KEY = 'CHANGEME'
 
+# Seconds to reuse the session document read for a signed cookie in-process.
+# A session removed by another process stays usable for up to this long, so
+# keep it short. 0 disables the cache.
+SESSION_CACHE_TTL = 0
+SESSION_CACHE_SIZE = 2048
+# Write a user's date_last_login at most once per interval (seconds) per process
+LAST_LOGIN_UPDATE_INTERVAL = 15 * 60
+LAST_LOGIN_CACHE_SIZE = 10000
+# Refresh the date_modified of an unchanged session at most once per interval
+# (seconds) per process; scripts/clear_sessions.py removes sessions by it
+SESSION_TOUCH_INTERVAL = 60 * 60
+
 # Change if using `scripts/cron.py` to manage crontab
 CRON_USER = None
 
@@ -91,6 +116,14 @@ SUPPORT_EMAIL = 'support@osf.io'
 MAIL_SERVER = 'smtp.sendgrid.net'
 MAIL_USERNAME = 'osf-smtp'
 MAIL_PASSWORD = ''  # Set this in local.py
+# How mail is delivered: 'smtp', or 'file' / 'memory' to deliver nowhere
+# (e.g. for development or for measuring throughput without a mail server)
+MAIL_BACKEND = 'smtp'
+MAIL_FILE_PATH = os.path.join(LOG_PATH, 'mail.log')
+# SMTP connections kept open per worker process, and seconds a connection may
+# sit idle before it is checked with a NOOP before reuse
+MAIL_POOL_SIZE = 4
+MAIL_POOL_MAX_IDLE = 30
 
 # Mandrill
 MANDRILL_USERNAME = None
@@ -137,6 +170,14 @@ DB_NAME = 'osf20130903'
 DB_USER = None
 DB_PASS = None
 
+# Share one pooled MongoClient per process instead of connecting on every
+# request. Each request still pins a single socket so that TokuMX
+# transactions run over a consistent connection.
+DB_POOL_ENABLED = True
+DB_POOL_SIZE = 20
+DB_CONNECT_TIMEOUT_MS = 5000
+DB_SOCKET_TIMEOUT_MS = None
+
 # Cache settings
 SESSION_HISTORY_LENGTH = 5
 SESSION_HISTORY_IGNORE_RULES = [
@@ -214,6 +255,22 @@ SYSTEM_ADDED_ADDONS = {
 PIWIK_HOST = None
 PIWIK_ADMIN_TOKEN = None
 PIWIK_SITE_ID = None
+# Serve /explore/activity from a snapshot refreshed by a periodic Celery task
+# instead of querying Piwik and nodes on each visit. Ignored (computed on
+# each visit) when USE_CELERY is off.
+DISCOVERY_SNAPSHOT_ASYNC = True
+DISCOVERY_SNAPSHOT_INTERVAL = 15 * 60  # seconds
+
+# Page view counters are summed in each process and written by a background
+# thread every ANALYTICS_FLUSH_INTERVAL seconds (0 writes every view through
+# in the request), or once ANALYTICS_MAX_PENDING pages have unwritten views
+ANALYTICS_FLUSH_INTERVAL = 10
+ANALYTICS_MAX_PENDING = 1000
+# Size of the Bloom filters tracking the pages each session has visited, for
+# unique view counts. The defaults keep the false positive rate (views
+# wrongly counted as repeat views) under 0.5% for sessions of 300 pages.
+ANALYTICS_UNIQUE_FILTER_BITS = 4096
+ANALYTICS_UNIQUE_FILTER_HASHES = 4
 
 SENTRY_DSN = None
 SENTRY_DSN_JS = None
@@ -232,6 +289,19 @@ ALL_MY_REGISTRATIONS_NAME = 'All my registrations'
 # and uploads in order to save disk space.
 DISK_SAVING_MODE = False
 
+# Copy add-on settings to new forks in a Celery task so that the fork request
+# returns quickly. Ignored (copying is synchronous) when USE_CELERY is off.
+FORK_ADDONS_ASYNC = True
+
+# Render and store notification digests for an event's subscribers in a
+# Celery task rather than in the request. Ignored when USE_CELERY is off.
+NOTIFICATIONS_ASYNC = True
+
+# Number of sent notification digests to delete at a time while sending emails
+NOTIFICATIONS_DELETE_BATCH_SIZE = 1000
+# Number of notification digests read per query while sending emails
+NOTIFICATIONS_DIGEST_PAGE_SIZE = 1000
+
 # Seconds before another notification email can be sent to a contributor when added to a project
 CONTRIBUTOR_ADDED_EMAIL_THROTTLE = 24 * 3600
 
@@ -247,6 +317,35 @@ DEFAULT_HMAC_ALGORITHM = hashlib.sha256
 WATERBUTLER_URL = 'http://localhost:7777'
 WATERBUTLER_ADDRS = ['127.0.0.1']
 
+# Fetch the file browser (HGrid) data of every addon in a component tree
+# concurrently, showing providers that miss their deadline as unavailable.
+# Workers run outside the request's transaction and may not save or remove
+# stored objects; addons that do are shown as unavailable.
+HGRID_PARALLEL = False
+HGRID_WORKERS = 8  # Threads per process, shared by all requests
+HGRID_TIMEOUT = 10  # Seconds
+HGRID_TIMEOUTS = {}  # Per-provider overrides of HGRID_TIMEOUT
+# Seconds to reuse an addon's HGrid data for the same node and user
+HGRID_CACHE_TTL = 15
+HGRID_CACHE_SIZE = 1024
+# Seconds to reuse the names of a node's enabled addons when collecting addon
+# assets. Entries are dropped as soon as addon settings are saved in the same
+# process; other processes see changes once their entries expire.
+ADDON_NAMES_CACHE_TTL = 60
+ADDON_NAMES_CACHE_SIZE = 10000
+
+# Listing addon file trees through WaterButler, e.g. when archiving
+WATERBUTLER_CRAWL_WORKERS = 4
+WATERBUTLER_CRAWL_RATE = 10  # Requests per second to each provider, per process
+WATERBUTLER_CRAWL_RATES = {}  # Per-provider overrides of WATERBUTLER_CRAWL_RATE
+WATERBUTLER_CRAWL_RETRIES = 3  # For 429 and 5xx responses and connection errors
+WATERBUTLER_CRAWL_BACKOFF = 0.5  # Seconds; doubled after each retry
+# Entries of a WaterButler folder listing matched against stored file nodes
+# per query when listing an addon folder through the API
+FILES_RECONCILE_BATCH_SIZE = 500
+# Free GUIDs checked for and kept in memory per refill of the GUID pool
+GUID_POOL_SIZE = 100
+
 # Test identifier namespaces
 DOI_NAMESPACE = 'doi:10.5072/FK2'
 ARK_NAMESPACE = 'ark:99999/fk4'
@@ -262,6 +361,15 @@ SHARE_REGISTRATION_URL = ''
 SHARE_API_DOCS_URL = ''
 
 CAS_SERVER_URL = 'http://localhost:8080'
+# Seconds to reuse CAS's answer for an API bearer token. 0 disables the cache.
+# Revoking an application's tokens bumps a revocation epoch shared by all
+# processes; each process rereads it at most every
+# CAS_TOKEN_REVOCATION_CHECK_INTERVAL seconds and drops entries cached before.
+CAS_TOKEN_CACHE_TTL = 60
+CAS_TOKEN_CACHE_NEGATIVE_TTL = 10  # For tokens CAS rejected
+CAS_TOKEN_CACHE_SIZE = 10000  # Per process, for the 'memory' backend
+CAS_TOKEN_CACHE_BACKEND = 'memory'  # Or 'mongo', shared by all processes
+CAS_TOKEN_REVOCATION_CHECK_INTERVAL = 1
 MFR_SERVER_URL = 'http://localhost:7778'
 
 ###### ARCHIVER ###########
@@ -293,7 +401,11 @@ CELERY_IMPORTS = (
     'framework.analytics.tasks',
     'website.mailchimp_utils',
     'website.notifications.tasks',
-    'website.archiver.tasks'
+    'website.notifications.emails',
+    'website.archiver.tasks',
+    'website.search.tasks',
+    'website.project.forking',
+    'website.discovery.tasks',
 )
 
 # celery.schedule will not be installed when running invoke requirements the first time.
@@ -314,6 +426,14 @@ else:
             'schedule': crontab(minute=0, hour=0),
             'args': ('email_digest',),
         },
+        'search-index-flush': {
+            'task': 'search.flush_index_queue',
+            'schedule': SEARCH_INDEX_FLUSH_INTERVAL,
+        },
+        'discovery-activity-snapshot': {
+            'task': 'discovery.refresh_activity_snapshot',
+            'schedule': DISCOVERY_SNAPSHOT_INTERVAL,
+        },
     }
 
 WATERBUTLER_JWE_SALT = 'yusaltydough'
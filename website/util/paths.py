@@ -41,20 +41,25 @@ def webpack_asset(path, asset_paths=asset_paths, debug=settings.DEBUG_MODE):
         return path
 
 
-def resolve_addon_path(addon_config, file_name):
-    """Check for addon asset in source directory (e.g. website/addons/dropbox/static');
+def resolve_addon_path(addon_config, file_name, asset_paths=asset_paths):
+    """Check for addon asset in the webpack build output or, if webpack-assets.json
+    is not loaded, in source directory (e.g. website/addons/dropbox/static');
     if file is found, return path to webpack-built asset.
 
     :param AddonConfig config: Addon config object
     :param str file_name: Asset file name (e.g. "files.js")
     """
-    source_path = os.path.join(
-        settings.ADDON_PATH,
-        addon_config.short_name,
-        'static',
-        file_name,
-    )
-    if os.path.exists(source_path):
+    if asset_paths:
+        entry = '/'.join([addon_config.short_name, os.path.splitext(file_name)[0]])
+        exists = entry in asset_paths
+    else:
+        exists = os.path.exists(os.path.join(
+            settings.ADDON_PATH,
+            addon_config.short_name,
+            'static',
+            file_name,
+        ))
+    if exists:
         return os.path.join(
             '/',
             'static',
@@ -2,14 +2,26 @@
 """Contains helper functions for generating correctly
 formatted hgrid list/folders.
 """
+import os
+import copy
+import time
+import logging
 import datetime
+import threading
+import multiprocessing
+from multiprocessing.pool import ThreadPool
 
 import hurry.filesize
 from modularodm import Q
+from flask import _app_ctx_stack, _request_ctx_stack
 
 from framework import sentry
+from framework.cache import TTLCache
+from framework.mongo import read_only
 from framework.auth.decorators import Auth
 
+from api.base.api_globals import api_globals
+from website import settings
 from website.util import paths
 from website.util import sanitize
 from website.settings import (
@@ -18,6 +30,9 @@ from website.settings import (
 )
 
 
+logger = logging.getLogger(__name__)
+
+
 FOLDER = 'folder'
 FILE = 'file'
 KIND = 'kind'
@@ -409,28 +424,102 @@ class NodeProjectCollector(object):
         return data
 
 
+#: (node, addon, user, private key, extra) => HGrid data returned by the addon
+hgrid_cache = TTLCache(maxsize=settings.HGRID_CACHE_SIZE, ttl=settings.HGRID_CACHE_TTL)
+
+
+def forget_hgrid_data(node_id):
+    """Drop cached HGrid data of a node's addons, e.g. after their settings
+    change.
+    """
+    hgrid_cache.delete_where(lambda key: key[0] == node_id)
+
+
+_hgrid_pool = None
+_hgrid_pool_pid = None
+_hgrid_pool_lock = threading.Lock()
+
+
+def _get_hgrid_pool():
+    """Return the process's pool of `HGRID_WORKERS` threads, shared by all
+    requests so that workers still busy after their deadline cannot pile up.
+    """
+    global _hgrid_pool, _hgrid_pool_pid
+    with _hgrid_pool_lock:
+        # Threads do not survive a fork; start a pool in each worker process
+        if _hgrid_pool is None or _hgrid_pool_pid != os.getpid():
+            _hgrid_pool = ThreadPool(settings.HGRID_WORKERS)
+            _hgrid_pool_pid = os.getpid()
+        return _hgrid_pool
+
+
+def _in_current_context(func):
+    """Wrap ``func`` to run in another thread with the calling thread's
+    Flask contexts and Django request visible, so that it shares the
+    request's URL adapter and ODM caches. The contexts are pushed onto the
+    worker's stacks directly rather than through `RequestContext.push`,
+    whose matching `pop` would run the request's teardown handlers.
+
+    Workers do not share the request's database connection, and so are
+    outside its transaction; saving or removing stored objects in ``func``
+    raises `ReadOnlyError`.
+    """
+    app_ctx = _app_ctx_stack.top
+    request_ctx = _request_ctx_stack.top
+    django_request = getattr(api_globals, 'request', None)
+
+    def wrapped(*args, **kwargs):
+        if app_ctx is not None:
+            _app_ctx_stack.push(app_ctx)
+        if request_ctx is not None:
+            _request_ctx_stack.push(request_ctx)
+        api_globals.request = django_request
+        try:
+            with read_only():
+                return func(*args, **kwargs)
+        finally:
+            api_globals.request = None
+            if request_ctx is not None:
+                _request_ctx_stack.pop()
+            if app_ctx is not None:
+                _app_ctx_stack.pop()
+    return wrapped
+
+
 class NodeFileCollector(object):
 
-    """A utility class for creating rubeus formatted node data"""
-    def __init__(self, node, auth, **kwargs):
+    """A utility class for creating rubeus formatted node data
+
+    :param bool parallel: Fetch the HGrid data of all addons in the tree
+        concurrently in `to_hgrid`; defaults to `settings.HGRID_PARALLEL`
+    """
+    def __init__(self, node, auth, parallel=None, **kwargs):
         self.node = node
         self.auth = auth
         self.extra = kwargs
+        self.parallel = settings.HGRID_PARALLEL if parallel is None else parallel
         self.can_view = node.can_view(auth)
         self.can_edit = node.can_edit(auth) and not node.is_registration
+        # (node, children) whose addon data is collected after the tree walk
+        self._deferred = None
 
     def to_hgrid(self):
         """Return the Rubeus.JS representation of the node's file data, including
         addons and components
         """
+        if self.parallel:
+            self._deferred = []
         root = self._serialize_node(self.node)
+        if self._deferred:
+            self._collect_deferred_addons()
+        self._deferred = None
         return [root]
 
     def _collect_components(self, node, visited):
         rv = []
         for child in node.nodes:
             if child.resolve()._id not in visited and not child.is_deleted and node.can_view(self.auth):
-                visited.append(child.resolve()._id)
+                visited.add(child.resolve()._id)
                 rv.append(self._serialize_node(child, visited=visited))
         return rv
 
@@ -455,10 +544,13 @@ class NodeFileCollector(object):
     def _serialize_node(self, node, visited=None):
         """Returns the rubeus representation of a node folder.
         """
-        visited = visited or []
-        visited.append(node.resolve()._id)
+        visited = visited or set()
+        visited.add(node.resolve()._id)
         can_view = node.can_view(auth=self.auth)
-        if can_view:
+        if can_view and self._deferred is not None:
+            children = self._collect_components(node, visited)
+            self._deferred.append((node, children))
+        elif can_view:
             children = self._collect_addons(node) + self._collect_components(node, visited)
         else:
             children = []
@@ -483,28 +575,88 @@ class NodeFileCollector(object):
             'nodeID': node.resolve()._id,
         }
 
+    def _get_hgrid_addons(self, node):
+        return [addon for addon in node.get_addons() if addon.config.has_hgrid_files]
+
+    def _get_hgrid_data(self, addon):
+        """Return the HGrid data of ``addon``, reusing data fetched for the same
+        node, addon and user within `HGRID_CACHE_TTL` seconds.
+        """
+        key = (
+            addon.owner._id,
+            addon.config.short_name,
+            getattr(self.auth.user, '_id', None),
+            self.auth.private_key,
+            repr(sorted(self.extra.items())),
+        ) if hgrid_cache.enabled else None
+        if key is not None:
+            data = hgrid_cache.get(key)
+            if data is not None:
+                return copy.deepcopy(data)
+        # WARNING: get_hgrid_data can return None if the addon is added but has no credentials.
+        data = addon.config.get_hgrid_data(addon, self.auth, **self.extra)
+        if key is not None and data is not None:
+            hgrid_cache.set(key, copy.deepcopy(data))
+        return data
+
+    def _unavailable(self, addon):
+        return {
+            KIND: FOLDER,
+            'unavailable': True,
+            'iconUrl': addon.config.icon_url,
+            'provider': addon.config.short_name,
+            'addonFullname': addon.config.full_name,
+            'permissions': {'view': False, 'edit': False},
+            'name': '{} is currently unavailable'.format(addon.config.full_name),
+        }
+
     def _collect_addons(self, node):
         rv = []
-        for addon in node.get_addons():
-            if addon.config.has_hgrid_files:
-                # WARNING: get_hgrid_data can return None if the addon is added but has no credentials.
-                try:
-                    temp = addon.config.get_hgrid_data(addon, self.auth, **self.extra)
-                except Exception:
-                    sentry.log_exception()
-                    rv.append({
-                        KIND: FOLDER,
-                        'unavailable': True,
-                        'iconUrl': addon.config.icon_url,
-                        'provider': addon.config.short_name,
-                        'addonFullname': addon.config.full_name,
-                        'permissions': {'view': False, 'edit': False},
-                        'name': '{} is currently unavailable'.format(addon.config.full_name),
-                    })
-                    continue
-                rv.extend(sort_by_name(temp) or [])
+        for addon in self._get_hgrid_addons(node):
+            try:
+                temp = self._get_hgrid_data(addon)
+            except Exception:
+                sentry.log_exception()
+                rv.append(self._unavailable(addon))
+                continue
+            rv.extend(sort_by_name(temp) or [])
         return rv
 
+    def _collect_deferred_addons(self):
+        """Fetch the HGrid data of every addon in the tree with the shared pool
+        of threads and prepend it to the children of each node. Addons that
+        fail or miss their provider's deadline are shown as unavailable.
+        """
+        jobs = [
+            (children, addon)
+            for node, children in self._deferred
+            for addon in self._get_hgrid_addons(node)
+        ]
+        if not jobs:
+            return
+        pool = _get_hgrid_pool()
+        # Workers that miss their deadline finish in the background
+        results = [
+            pool.apply_async(_in_current_context(self._get_hgrid_data), (addon,))
+            for _, addon in jobs
+        ]
+        start = time.time()
+        collected = {}
+        for (children, addon), result in zip(jobs, results):
+            provider = addon.config.short_name
+            timeout = settings.HGRID_TIMEOUTS.get(provider, settings.HGRID_TIMEOUT)
+            try:
+                data = sort_by_name(result.get(max(0, start + timeout - time.time()))) or []
+            except multiprocessing.TimeoutError:
+                logger.warning('Timed out fetching HGrid data from {0}'.format(provider))
+                data = [self._unavailable(addon)]
+            except Exception:
+                sentry.log_exception()
+                data = [self._unavailable(addon)]
+            collected.setdefault(id(children), (children, []))[1].extend(data)
+        for children, addon_data in collected.values():
+            children[0:0] = addon_data
+
 
 # TODO: these might belong in addons module
 def collect_addon_assets(node):
@@ -519,46 +671,108 @@ def collect_addon_assets(node):
     }
 
 
+# Assets of each addon, by short name and bundle; see `build_addon_asset_manifest`
+_addon_js = {}
+_addon_css = {}
+
+# Names of the addons enabled on each node, by node id
+addon_names_cache = TTLCache(maxsize=settings.ADDON_NAMES_CACHE_SIZE, ttl=settings.ADDON_NAMES_CACHE_TTL)
+
+
+def build_addon_asset_manifest(addons=None):
+    """Precompute the JS and CSS includes of each addon for the bundles used
+    on project pages, so that collecting assets needs no filesystem checks.
+    Assets of other bundles are added on first use.
+    """
+    for addon_config in addons or settings.ADDONS_AVAILABLE:
+        for filename, config_entry in (('files.js', 'files'), ('widget-cfg.js', 'widget')):
+            get_addon_js(addon_config.short_name, filename, config_entry)
+        get_addon_css(addon_config.short_name)
+
+
+def get_addon_js(short_name, filename='files.js', config_entry='files'):
+    """Return the JavaScript includes of an addon: the modules configured in
+    its __init__ file under ``config_entry``, and its webpack bundle
+    ``filename`` if it has one.
+    """
+    key = (short_name, filename, config_entry)
+    try:
+        return _addon_js[key]
+    except KeyError:
+        pass
+    addon_config = settings.ADDONS_AVAILABLE_DICT[short_name]
+    js = set(addon_config.include_js.get(config_entry, []))
+    js_path = paths.resolve_addon_path(addon_config, filename)
+    if js_path:
+        js.add(js_path)
+    _addon_js[key] = frozenset(js)
+    return _addon_js[key]
+
+
+def get_addon_css(short_name):
+    try:
+        return _addon_css[short_name]
+    except KeyError:
+        pass
+    addon_config = settings.ADDONS_AVAILABLE_DICT[short_name]
+    _addon_css[short_name] = frozenset(addon_config.include_css.get('files', []))
+    return _addon_css[short_name]
+
+
+def get_addon_names(node):
+    """Return the short names of the addons enabled on ``node``."""
+    names = addon_names_cache.get(node._id)
+    if names is None:
+        names = frozenset(node.get_addon_names())
+        addon_names_cache.set(node._id, names)
+    return names
+
+
+def forget_addon_names(node_id):
+    addon_names_cache.delete(node_id)
+
+
+def collect_addon_names(node):
+    """Return the short names of the addons enabled on ``node``, its
+    components and linked projects, at any depth. Components are fetched with
+    one query per linked tree using the materialized path.
+    """
+    names = set()
+    visited = set()
+    pending = [node]
+    while pending:
+        current = pending.pop().resolve()
+        if current._id in visited:
+            continue
+        for each in [current] + list(current.get_primary_descendants()):
+            visited.add(each._id)
+            names.update(get_addon_names(each))
+            pending.extend(child for child in each.nodes if not child.primary)
+    return names
+
+
 # TODO: Abstract static collectors
-def collect_addon_js(node, visited=None, filename='files.js', config_entry='files'):
+def collect_addon_js(node, filename='files.js', config_entry='files'):
     """Collect JavaScript includes for all add-ons implementing HGrid views.
 
     :return list: List of JavaScript include paths
 
     """
-    # NOTE: must coerce to list so it is JSON-serializable
-    visited = visited or []
-    visited.append(node._id)
     js = set()
-    for addon in node.get_addons():
-        # JS modules configured in each addon's __init__ file
-        js = js.union(addon.config.include_js.get(config_entry, []))
-        # Webpack bundle
-        js_path = paths.resolve_addon_path(addon.config, filename)
-        if js_path:
-            js.add(js_path)
-    for each in node.nodes:
-        if each._id not in visited:
-            visited.append(each._id)
-            js = js.union(collect_addon_js(each, visited=visited))
+    for short_name in collect_addon_names(node):
+        js.update(get_addon_js(short_name, filename, config_entry))
     return js
 
 
-def collect_addon_css(node, visited=None):
+def collect_addon_css(node):
     """Collect CSS includes for all addons-ons implementing Hgrid views.
 
     :return: List of CSS include paths
     :rtype: list
     """
-    visited = visited or []
-    visited.append(node._id)
     css = set()
-    for addon in node.get_addons():
-        css = css.union(addon.config.include_css.get('files', []))
-    for each in node.nodes:
-        if each._id not in visited:
-            visited.append(each._id)
-            css = css.union(collect_addon_css(each, visited=visited))
+    for short_name in collect_addon_names(node):
+        css.update(get_addon_css(short_name))
     return css
 
 
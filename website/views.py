@@ -13,6 +13,7 @@ from framework import sentry
 from framework.auth.core import User
 from framework.flask import redirect  # VOL-aware redirect
 from framework.routing import proxy_url
+from framework.mongo.handlers import client_pool
 from framework.exceptions import HTTPError
 from framework.auth.forms import SignInForm
 from framework.forms import utils as form_utils
@@ -21,6 +22,7 @@ from framework.auth.forms import ResetPasswordForm
 from framework.auth.forms import ForgotPasswordForm
 from framework.auth.decorators import collect_auth
 from framework.auth.decorators import must_be_logged_in
+from framework.auth.decorators import must_be_signed
 
 from website.models import Guid
 from website.models import Node
@@ -269,15 +271,27 @@ def watched_logs_get(**kwargs):
             message_long='Invalid value for "size".'
         ))
 
-    total = sum(1 for x in user.get_recent_log_ids())
-    paginated_logs, pages = paginate(user.get_recent_log_ids(), total, page, size)
+    # Clients paging through the feed may pass the id of the last log they
+    # saw instead of a page number
+    before = request.args.get('before')
+
+    total = user.get_recent_log_count()
+    if before:
+        paginated_logs = list(user.get_recent_log_ids(before=before, limit=size))
+        pages = math.ceil(total / float(size))
+    else:
+        paginated_logs, pages = paginate(
+            user.get_recent_log_ids(limit=max(page + 1, 0) * size), total, page, size
+        )
+        paginated_logs = list(paginated_logs)
     logs = (model.NodeLog.load(id) for id in paginated_logs)
 
     return {
         "logs": [serialize_log(log) for log in logs],
         "total": total,
         "pages": pages,
-        "page": page
+        "page": page,
+        "next": paginated_logs[-1] if len(paginated_logs) == size else None,
     }
 
 
@@ -371,6 +385,17 @@ def resolve_guid(guid, suffix=None):
     # GUID not found
     raise HTTPError(http.NOT_FOUND)
 
+##### Process status #####
+
+@must_be_signed
+def mongo_pool_status(**kwargs):
+    """Return statistics for this process's pooled MongoDB client. Only
+    requests signed with the internal HMAC secret are answered, as the
+    response reveals the process id and pool configuration.
+    """
+    return client_pool.status()
+
+
 ##### Redirects #####
 
 # Redirect /about/ to OSF wiki page